@@ -4,12 +4,23 @@ Distributed under the MIT License
 (See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
 """
 
-from sc_async_kpm import utils  # noqa: F401
+from sc_async_kpm import import_time, utils  # noqa: F401
 from sc_async_kpm.logging import set_root_config  # noqa: F401
-from sc_async_kpm.sc_agent import ScAgent, ScAgentClassic  # noqa: F401
-from sc_async_kpm.sc_keynodes import ScKeynodes  # noqa: F401
+from sc_async_kpm.sc_action_index import ScActionClassIndex  # noqa: F401
+from sc_async_kpm.sc_agent import ScAgent, ScAgentClassic, ScRegistrationError  # noqa: F401
+from sc_async_kpm.sc_compute import ScComputeMixin, ScComputePool  # noqa: F401
+from sc_async_kpm.sc_dispatcher import OverflowPolicy, ScDispatcher  # noqa: F401
+from sc_async_kpm.sc_event_batch import ScAgentEvent  # noqa: F401
+from sc_async_kpm.sc_http import ScHttpEndpoint  # noqa: F401
+from sc_async_kpm.sc_keynodes import ScKeynodes, ScKeynodesCache  # noqa: F401
+from sc_async_kpm.sc_keynodes_namespace import Keynode, ScKeynodesNamespace  # noqa: F401
+from sc_async_kpm.sc_loop_monitor import ScLoopMonitor  # noqa: F401
 from sc_async_kpm.sc_module import ScModule  # noqa: F401
 from sc_async_kpm.sc_result import ScResult  # noqa: F401
-from sc_async_kpm.sc_server import ScServer  # noqa: F401
+from sc_async_kpm.sc_server import ScKbChangedError, ScServer  # noqa: F401
+from sc_async_kpm.sc_startup import ScStartupProfile  # noqa: F401
+from sc_async_kpm.sc_subscription_hub import ScSubscriptionHub  # noqa: F401
+from sc_async_kpm.sc_supervisor import ScSupervisor  # noqa: F401
 
 set_root_config(__name__)
+import_time.finish_package_import()
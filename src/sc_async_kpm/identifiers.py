@@ -8,7 +8,8 @@ from dataclasses import dataclass
 
 from sc_async_client.constants import sc_type
 
-from sc_async_kpm.sc_keynodes import Idtf, ScKeynodes
+from sc_async_kpm.sc_keynodes import Idtf
+from sc_async_kpm.sc_keynodes_namespace import Keynode, ScKeynodesNamespace
 
 
 @dataclass(frozen=True)
@@ -42,36 +43,45 @@ class ScAlias:
     LINK: str = "_link"
 
 
+class CommonKeynodes(ScKeynodesNamespace):
+    """Common keynodes and action statuses, they are available after ScServer connection"""
+
+    ACTION = Keynode(CommonIdentifiers.ACTION, sc_type.CONST_NODE_CLASS)
+    EXACT_VALUE = Keynode(CommonIdentifiers.EXACT_VALUE, sc_type.CONST_NODE_CLASS)
+    RREL_DYNAMIC_ARGUMENT = Keynode(
+        CommonIdentifiers.RREL_DYNAMIC_ARGUMENT, sc_type.CONST_NODE_ROLE
+    )
+    RREL_ONE = Keynode(CommonIdentifiers.RREL_ONE, sc_type.CONST_NODE_ROLE)
+    RREL_TWO = Keynode(CommonIdentifiers.RREL_TWO, sc_type.CONST_NODE_ROLE)
+    RREL_LAST = Keynode(CommonIdentifiers.RREL_LAST, sc_type.CONST_NODE_ROLE)
+    NREL_BASIC_SEQUENCE = Keynode(
+        CommonIdentifiers.NREL_BASIC_SEQUENCE, sc_type.CONST_NODE_NON_ROLE
+    )
+    NREL_SYSTEM_IDENTIFIER = Keynode(
+        CommonIdentifiers.NREL_SYSTEM_IDENTIFIER, sc_type.CONST_NODE_NON_ROLE
+    )
+    NREL_RESULT = Keynode(CommonIdentifiers.NREL_RESULT, sc_type.CONST_NODE_NON_ROLE)
+    CONCEPT_FILENAME = Keynode(CommonIdentifiers.CONCEPT_FILENAME, sc_type.CONST_NODE_CLASS)
+    ACTION_INITIATED = Keynode(ActionStatus.ACTION_INITIATED, sc_type.CONST_NODE_CLASS)
+    ACTION_FINISHED = Keynode(ActionStatus.ACTION_FINISHED, sc_type.CONST_NODE_CLASS)
+    ACTION_FINISHED_SUCCESSFULLY = Keynode(
+        ActionStatus.ACTION_FINISHED_SUCCESSFULLY, sc_type.CONST_NODE_CLASS
+    )
+    ACTION_FINISHED_UNSUCCESSFULLY = Keynode(
+        ActionStatus.ACTION_FINISHED_UNSUCCESSFULLY, sc_type.CONST_NODE_CLASS
+    )
+
+
 class _IdentifiersResolver:
     """
     Class for resolving common identifiers and action status identifiers.
     It confirms the presence of all of them in the KB.
+    Keynodes of all declared namespaces are resolved with the same request.
     """
 
     is_resolved = False
 
     @classmethod
     async def resolve(cls) -> None:
-        if cls.is_resolved:
-            return
-        types_map = {
-            CommonIdentifiers.ACTION: sc_type.CONST_NODE_CLASS,
-            CommonIdentifiers.EXACT_VALUE: sc_type.CONST_NODE_CLASS,
-            CommonIdentifiers.RREL_DYNAMIC_ARGUMENT: sc_type.CONST_NODE_ROLE,
-            CommonIdentifiers.RREL_ONE: sc_type.CONST_NODE_ROLE,
-            CommonIdentifiers.RREL_TWO: sc_type.CONST_NODE_ROLE,
-            CommonIdentifiers.RREL_LAST: sc_type.CONST_NODE_ROLE,
-            CommonIdentifiers.NREL_BASIC_SEQUENCE: sc_type.CONST_NODE_NON_ROLE,
-            CommonIdentifiers.NREL_SYSTEM_IDENTIFIER: sc_type.CONST_NODE_NON_ROLE,
-            CommonIdentifiers.NREL_RESULT: sc_type.CONST_NODE_NON_ROLE,
-            CommonIdentifiers.CONCEPT_FILENAME: sc_type.CONST_NODE_CLASS,
-            ActionStatus.ACTION_INITIATED: sc_type.CONST_NODE_CLASS,
-            ActionStatus.ACTION_FINISHED: sc_type.CONST_NODE_CLASS,
-            ActionStatus.ACTION_FINISHED_SUCCESSFULLY: sc_type.CONST_NODE_CLASS,
-            ActionStatus.ACTION_FINISHED_UNSUCCESSFULLY: sc_type.CONST_NODE_CLASS,
-        }
-
-        for idtf, type_value in types_map.items():
-            await ScKeynodes.resolve(idtf, type_value)
-
+        await ScKeynodesNamespace.load_all()
         cls.is_resolved = True
@@ -0,0 +1,35 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import importlib
+import time
+from typing import Dict
+
+# The module is imported first by sc_async_kpm/__init__.py, so import of the package starts here
+_started = time.perf_counter()
+_seconds: Dict[str, float] = {}
+
+
+def _measure(package: str, module: str) -> None:
+    start = time.perf_counter()
+    importlib.import_module(module)
+    _seconds[package] = time.perf_counter() - start
+
+
+def finish_package_import() -> None:
+    """Record import time of sc_async_kpm, called at the end of its __init__"""
+    _seconds.setdefault("sc_async_kpm", time.perf_counter() - _started)
+
+
+def get_import_times() -> Dict[str, float]:
+    """
+    Get seconds spent importing sc_async_kpm and sc_async_client, the package time includes
+    the client one. The client time is close to 0 if it was imported before sc_async_kpm
+    """
+    return dict(_seconds)
+
+
+_measure("sc_async_client", "sc_async_client.client")
@@ -0,0 +1,201 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
+
+from sc_async_kpm.sc_result import ScResult
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+HistogramSnapshot = Dict[str, Union[int, float, Dict[str, int]]]
+
+
+class Histogram:
+    """Histogram with fixed upper bounds of buckets. Values above the last bound get to +Inf"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self._bounds: Tuple[float, ...] = tuple(sorted(buckets))
+        self._counts: List[int] = [0] * (len(self._bounds) + 1)
+        self._sum: float = 0
+        self._count: int = 0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(count={self._count}, sum={self._sum})"
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def observe(self, value: float) -> None:
+        """Add value to the bucket with the least upper bound that isn't less than value"""
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._sum += value
+        self._count += 1
+
+    def quantile(self, q: float) -> float:
+        """Get upper bound of the bucket that contains q-quantile, 0 if histogram is empty"""
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be in [0, 1]")
+        if not self._count:
+            return 0
+        rank = q * self._count
+        cumulative = 0
+        for bound, count in zip(self._bounds, self._counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> HistogramSnapshot:
+        """Get count, sum and cumulative bucket counts keyed by upper bound like in Prometheus"""
+        buckets: Dict[str, int] = {}
+        cumulative = 0
+        for bound, count in zip(self._bounds, self._counts):
+            cumulative += count
+            buckets[format_bound(bound)] = cumulative
+        buckets["+Inf"] = self._count
+        return {"count": self._count, "sum": self._sum, "buckets": buckets}
+
+    def reset(self) -> None:
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0
+        self._count = 0
+
+
+def format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    """Format labels of a sample in Prometheus text exposition format"""
+    if not labels:
+        return ""
+    escaped = (
+        f'{name}="{_escape_label_value(value)}"' for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+Sample = Tuple[Dict[str, str], Union[int, float]]
+
+
+def metric_lines(name: str, kind: str, description: str, samples: Iterable[Sample]) -> List[str]:
+    """Format samples of a gauge or a counter with their HELP and TYPE in Prometheus format"""
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{format_labels(labels)} {value}" for labels, value in samples)
+    return lines
+
+
+def histogram_lines(name: str, labels: Dict[str, str], snapshot: HistogramSnapshot) -> List[str]:
+    """Format histogram snapshot as samples in Prometheus text exposition format"""
+    buckets: Dict[str, int] = snapshot["buckets"]  # type: ignore[assignment]
+    lines = [
+        f"{name}_bucket{format_labels({**labels, 'le': bound})} {count}"
+        for bound, count in buckets.items()
+    ]
+    lines.append(f"{name}_sum{format_labels(labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{format_labels(labels)} {snapshot['count']}")
+    return lines
+
+
+class ScAgentMetrics:
+    """
+    Callback latency histograms and counters of ScResult codes keyed by agent repr.
+    Exported as dict snapshot or in Prometheus text exposition format.
+    """
+
+    enabled: bool = True
+    _latency: Dict[str, Histogram] = {}
+    _results: Dict[str, Dict[ScResult, int]] = {}
+
+    def __init__(self) -> None:
+        raise TypeError(f"Use {self.__class__.__name__} without initialization")
+
+    @classmethod
+    def observe(cls, agent: str, result: ScResult, seconds: float) -> None:
+        """Record a finished callback of the agent"""
+        if not cls.enabled:
+            return
+        histogram = cls._latency.get(agent)
+        if histogram is None:
+            histogram = cls._latency[agent] = Histogram()
+            cls._results[agent] = {}
+        histogram.observe(seconds)
+        results = cls._results[agent]
+        results[result] = results.get(result, 0) + 1
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Dict[str, Any]]:
+        """Get latency in seconds, count of each result and SKIP rate of each agent"""
+        snapshot: Dict[str, Dict[str, Any]] = {}
+        for agent, histogram in cls._latency.items():
+            results = cls._results[agent]
+            count = histogram.count
+            snapshot[agent] = {
+                "latency": histogram.snapshot(),
+                "p50": histogram.quantile(0.5),
+                "p99": histogram.quantile(0.99),
+                "results": {result.name: n for result, n in results.items()},
+                "skip_rate": results.get(ScResult.SKIP, 0) / count if count else 0.0,
+            }
+        return snapshot
+
+    @classmethod
+    def to_prometheus(cls) -> str:
+        """Get metrics of all agents in Prometheus text exposition format"""
+        latency = [
+            "# HELP sc_agent_callback_seconds Duration of agent callbacks in seconds",
+            "# TYPE sc_agent_callback_seconds histogram",
+        ]
+        results = [
+            "# HELP sc_agent_results_total Count of agent callbacks by result",
+            "# TYPE sc_agent_results_total counter",
+        ]
+        skip_rates = [
+            "# HELP sc_agent_skip_ratio Share of agent callbacks finished with SKIP",
+            "# TYPE sc_agent_skip_ratio gauge",
+        ]
+        for agent, snapshot in cls.snapshot().items():
+            labels = {"agent": agent}
+            latency.extend(
+                histogram_lines("sc_agent_callback_seconds", labels, snapshot["latency"])
+            )
+            results.extend(
+                f"sc_agent_results_total{format_labels({**labels, 'result': result})} {count}"
+                for result, count in snapshot["results"].items()
+            )
+            skip_rates.append(
+                f"sc_agent_skip_ratio{format_labels(labels)} {snapshot['skip_rate']}"
+            )
+        return "\n".join(latency + results + skip_rates) + "\n"
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._latency.clear()
+        cls._results.clear()
@@ -0,0 +1,193 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import asyncio
+from collections import OrderedDict
+from logging import Logger, getLogger
+from typing import Dict, FrozenSet, List, Optional, Set
+
+from sc_async_client import client
+from sc_async_client.constants import sc_type
+from sc_async_client.constants.common import ScEventType
+from sc_async_client.models import (
+    ScAddr,
+    ScEventSubscription,
+    ScEventSubscriptionParams,
+    ScTemplate,
+)
+
+from sc_async_kpm.identifiers import CommonKeynodes
+from sc_async_kpm.sc_result import ScResult
+from sc_async_kpm.tracing import traced_call
+
+
+class ScActionClassIndex:
+    """
+    In-process index of action node -> action classes for registered ScAgentClassic.
+
+    Each tracked class has one subscription shared by all agents of the class,
+    it fills the index when an action is added to the class.
+    An action whose events of both classes have come is accepted by a dict probe.
+    Events of different classes may come in any order, so only entries filled by a search
+    are trusted to answer that an action doesn't belong to a class: other actions are looked up
+    with one search of all their classes shared by all agents checking the action.
+    """
+
+    _refs: Dict[ScAddr, int] = {}
+    _subscriptions: Dict[ScAddr, ScEventSubscription] = {}
+    _members: OrderedDict[ScAddr, Set[ScAddr]] = OrderedDict()
+    _complete: Set[ScAddr] = set()  # Actions whose classes were searched
+    _lookups: Dict[ScAddr, asyncio.Future] = {}
+    _max_size: int = 8192
+    _logger: Logger = getLogger(f"{__name__}.ScActionClassIndex")
+
+    def __init__(self) -> None:
+        raise TypeError(f"Use {self.__class__.__name__} without initialization")
+
+    @classmethod
+    def is_tracked(cls, action_class: ScAddr) -> bool:
+        """Check the class has a subscription filling the index"""
+        return action_class in cls._refs
+
+    @classmethod
+    async def track(cls, action_class: ScAddr) -> None:
+        """Start tracking the class, the subscription is created for the first tracker only"""
+        refs = cls._refs.get(action_class, 0)
+        cls._refs[action_class] = refs + 1
+        if refs:
+            return
+        classes = [
+            addr
+            for addr in (CommonKeynodes.ACTION, action_class)
+            if addr not in cls._subscriptions
+        ]
+        params = [
+            ScEventSubscriptionParams(addr, ScEventType.AFTER_GENERATE_OUTGOING_ARC, cls._on_member)
+            for addr in classes
+        ]
+        try:
+            events = await traced_call(client.create_elementary_event_subscriptions, *params)
+        except BaseException:
+            await cls.untrack(action_class)
+            raise
+        cls._subscriptions.update(zip(classes, events))
+        # Actions seen before the subscription may miss the class, so they are looked up again
+        cls._forget_all()
+        cls._logger.debug("Tracking action class %s", repr(action_class))
+
+    @classmethod
+    async def untrack(cls, action_class: ScAddr) -> None:
+        """Stop tracking the class, the subscription is destroyed after the last tracker"""
+        if action_class not in cls._refs:
+            return
+        refs = cls._refs[action_class] - 1
+        if refs > 0:
+            cls._refs[action_class] = refs
+            return
+        cls._refs.pop(action_class, None)
+        addrs = [action_class]
+        if not cls._refs:
+            addrs.append(CommonKeynodes.ACTION)
+        events = [cls._subscriptions.pop(addr) for addr in addrs if addr in cls._subscriptions]
+        if events:
+            await traced_call(client.destroy_elementary_event_subscriptions, *events)
+        if not cls._refs:
+            cls._forget_all()
+        cls._logger.debug("Stopped tracking action class %s", repr(action_class))
+
+    @classmethod
+    async def resubscribe(cls) -> None:
+        """Create subscriptions of tracked classes again, old ones are lost on reconnection"""
+        # Actions added while disconnected aren't in the index, so everything is looked up again
+        cls._forget_all()
+        addrs = list(cls._subscriptions)
+        if not addrs:
+            return
+        params = [
+            ScEventSubscriptionParams(addr, ScEventType.AFTER_GENERATE_OUTGOING_ARC, cls._on_member)
+            for addr in addrs
+        ]
+        events = await traced_call(client.create_elementary_event_subscriptions, *params)
+        cls._subscriptions.update(zip(addrs, events))
+        cls._logger.debug("Resubscribed to %d action classes", len(addrs))
+
+    @classmethod
+    def forget(cls) -> None:
+        """Drop tracked classes and their subscriptions without requests, e.g. the KB is changed"""
+        cls._refs.clear()
+        cls._subscriptions.clear()
+        cls._forget_all()
+
+    @classmethod
+    async def contains(cls, action_class: ScAddr, action_node: ScAddr) -> bool:
+        """Check the action belongs to the tracked class and to the action class"""
+        action = CommonKeynodes.ACTION
+        classes = cls._members.get(action_node)
+        if classes is not None and action_class in classes and action in classes:
+            return True
+        if classes is None or action_node not in cls._complete:
+            # Events of the missing classes may be still on the way
+            classes = await cls._lookup(action_node)
+        return action_class in classes and action in classes
+
+    @classmethod
+    def set_max_size(cls, max_size: int) -> None:
+        """Set max count of remembered actions. It is 8192 by default"""
+        if max_size < 1:
+            raise ValueError("Size of action class index must be positive")
+        cls._max_size = max_size
+        cls._truncate()
+
+    @classmethod
+    async def _lookup(cls, action_node: ScAddr) -> FrozenSet[ScAddr]:
+        future = cls._lookups.get(action_node)
+        if future is None:
+            future = asyncio.ensure_future(cls._search_classes(action_node))
+            cls._lookups[action_node] = future
+            future.add_done_callback(lambda _: cls._lookups.pop(action_node, None))
+        return await asyncio.shield(future)
+
+    @classmethod
+    async def _search_classes(cls, action_node: ScAddr) -> FrozenSet[ScAddr]:
+        templ = ScTemplate()
+        templ.triple(sc_type.VAR_NODE, sc_type.VAR_PERM_POS_ARC, action_node)
+        results: List = await traced_call(client.search_by_template, templ)
+        classes = {result[0] for result in results if result[0] in cls._subscriptions}
+        cls._remember(action_node, *classes)
+        members = cls._members.get(action_node)
+        if members is None:
+            return frozenset(classes)
+        cls._complete.add(action_node)
+        # Classes added by events during the search are kept
+        return frozenset(members)
+
+    @classmethod
+    async def _on_member(
+        cls, action_class: ScAddr, connector: ScAddr, action_node: ScAddr
+    ) -> ScResult:
+        # pylint: disable=unused-argument
+        cls._remember(action_node, action_class)
+        return ScResult.OK
+
+    @classmethod
+    def _remember(cls, action_node: ScAddr, *classes: ScAddr) -> None:
+        members: Optional[Set[ScAddr]] = cls._members.get(action_node)
+        if members is None:
+            members = cls._members[action_node] = set()
+        members.update(classes)
+        cls._members.move_to_end(action_node)
+        cls._truncate()
+
+    @classmethod
+    def _truncate(cls) -> None:
+        while len(cls._members) > cls._max_size:
+            action_node, _ = cls._members.popitem(last=False)
+            cls._complete.discard(action_node)
+
+    @classmethod
+    def _forget_all(cls) -> None:
+        cls._members.clear()
+        cls._complete.clear()
@@ -4,9 +4,11 @@ Distributed under the MIT License
 (See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
 """
 
+import asyncio
+import time
 from abc import ABC, abstractmethod
 from logging import getLogger
-from typing import Optional, Union
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
 
 from sc_async_client import client
 from sc_async_client.constants import sc_type
@@ -19,33 +21,89 @@ from sc_async_client.models import (
 )
 
 from sc_async_kpm.identifiers import ActionStatus
+from sc_async_kpm.metrics import ScAgentMetrics
+from sc_async_kpm.sc_action_index import ScActionClassIndex
+from sc_async_kpm.sc_dispatcher import ScDispatcher
+from sc_async_kpm.sc_event_batch import EventBatcher, ScAgentEvent
 from sc_async_kpm.sc_keynodes import Idtf, ScKeynodes
 from sc_async_kpm.sc_result import ScResult
+from sc_async_kpm.sc_startup import in_startup_phase, startup_phase
+from sc_async_kpm.sc_subscription_hub import ScSubscriptionHub
+from sc_async_kpm.tracing import ScTracer, traced_call
 from sc_async_kpm.utils.action_utils import check_action_class
 
 
 class ScAgentAbstract(ABC):
+    max_batch_size: int = 1  # Events are handled by on_event_batch if it is more than 1
+    max_batch_wait: float = 0.01  # Max seconds to wait for the batch to fill
+
     def __init__(self, event_element: ScAddr, event_type: ScEventType) -> None:
         self._event_element = event_element
         self._event_type = event_type
         self._event: Optional[ScEventSubscription] = None
+        self._dispatcher: Optional[ScDispatcher] = None
+        self._subscription_hub: Optional[ScSubscriptionHub] = None
+        self._event_hub: Optional[ScSubscriptionHub] = None
+        self._batcher: Optional[EventBatcher] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._is_draining = False
+        self._rejected: int = 0
         self.logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
 
     @abstractmethod
     def __repr__(self) -> str:
         pass
 
+    @property
+    def dispatcher(self) -> Optional[ScDispatcher]:
+        """Dispatcher limiting concurrency of callbacks, None if they aren't limited"""
+        return self._dispatcher
+
+    def set_dispatcher(self, dispatcher: Optional[ScDispatcher]) -> None:
+        """Run callbacks with the dispatcher. None runs every event at once"""
+        self._dispatcher = dispatcher
+
+    @property
+    def subscription_hub(self) -> Optional[ScSubscriptionHub]:
+        """Hub sharing the subscription with other agents, None if the agent has its own one"""
+        return self._subscription_hub
+
+    def set_subscription_hub(self, hub: Optional[ScSubscriptionHub]) -> None:
+        """Subscribe with the hub on next registration. None creates own subscription"""
+        self._subscription_hub = hub
+
+    @property
+    def is_registered(self) -> bool:
+        return self._event is not None
+
+    @property
+    def in_flight(self) -> int:
+        """Count of events being handled now, including ones waiting for the dispatcher"""
+        return len(self._tasks)
+
+    def _subscription_params(self) -> ScEventSubscriptionParams:
+        return ScEventSubscriptionParams(self._event_element, self._event_type, self._dispatch)
+
     async def _register(self) -> None:
         if self._event is not None:
             self.logger.warning("Almost registered")
             return
-        event_params = ScEventSubscriptionParams(
-            self._event_element, self._event_type, self._callback
-        )
-        event_subscriptions = await client.create_elementary_event_subscriptions(
-            event_params
-        )
-        self._event = event_subscriptions[0]
+        if self._subscription_hub is not None:
+            event = await self._subscription_hub.subscribe(
+                self._event_element, self._event_type, self._dispatch
+            )
+            self._event_hub = self._subscription_hub
+        else:
+            event_subscriptions = await traced_call(
+                client.create_elementary_event_subscriptions,
+                self._subscription_params(),
+            )
+            event = event_subscriptions[0]
+        await self._on_registered(event)
+
+    async def _on_registered(self, event: ScEventSubscription) -> None:
+        self._event = event
+        self._is_draining = False
         self.logger.info(
             "Registered with ScEvent: %s - %s",
             repr(self._event_element),
@@ -56,18 +114,75 @@ class ScAgentAbstract(ABC):
         if self._event is None:
             self.logger.warning("ScEvent was already destroyed or not registered")
             return
-        await client.destroy_elementary_event_subscriptions(self._event)
+        if self._event_hub is not None:
+            await self._event_hub.unsubscribe(
+                self._event_element, self._event_type, self._dispatch
+            )
+        else:
+            await traced_call(client.destroy_elementary_event_subscriptions, self._event)
+        await self._on_unregistered()
+
+    async def _on_unregistered(self) -> None:
         self._event = None
+        self._event_hub = None
         self.logger.info(
             "Unregistered ScEvent: %s - %s",
             repr(self._event_element),
             repr(self._event_type),
         )
 
+    async def _dispatch(
+        self, event_element: ScAddr, event_connector: ScAddr, action_element: ScAddr
+    ) -> ScResult:
+        if self._is_draining:
+            self._rejected += 1
+            self.logger.warning("Draining, rejected the event")
+            return ScResult.ERROR_INVALID_STATE
+        if self._dispatcher is None:
+            handling = self._observed_callback(event_element, event_connector, action_element)
+        else:
+            handling = self._dispatcher.dispatch(
+                self._observed_callback, event_element, event_connector, action_element
+            )
+        # Own task can be cancelled by drain without cancelling the caller
+        task = asyncio.ensure_future(handling)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        await asyncio.wait({task})
+        if task.cancelled():
+            self.logger.warning("Callback was cancelled")
+            return ScResult.ERROR
+        return task.result()
+
+    async def _observed_callback(
+        self, event_element: ScAddr, event_connector: ScAddr, action_element: ScAddr
+    ) -> ScResult:
+        start = time.perf_counter()
+        result = ScResult.ERROR
+        try:
+            with ScTracer.span(repr(self)):
+                result = await self._callback(event_element, event_connector, action_element)
+            return result
+        finally:
+            ScAgentMetrics.observe(repr(self), result, time.perf_counter() - start)
+
     async def _callback(
         self, event_element: ScAddr, event_connector: ScAddr, action_element: ScAddr
     ) -> ScResult:
-        return await self.on_event(event_element, event_connector, action_element)
+        return await self._handle_event(event_element, event_connector, action_element)
+
+    async def _handle_event(
+        self, event_element: ScAddr, event_connector: ScAddr, action_element: ScAddr
+    ) -> ScResult:
+        if self.max_batch_size <= 1:
+            return await self.on_event(event_element, event_connector, action_element)
+        if self._batcher is None:
+            self._batcher = EventBatcher(
+                self.on_event_batch, self.max_batch_size, self.max_batch_wait, self.logger
+            )
+        return await self._batcher.submit(
+            ScAgentEvent(event_element, event_connector, action_element)
+        )
 
     @abstractmethod
     async def on_event(
@@ -75,6 +190,10 @@ class ScAgentAbstract(ABC):
     ) -> ScResult:
         pass
 
+    async def on_event_batch(self, events: List[ScAgentEvent]) -> List[ScResult]:
+        """Handle events collected while max_batch_size > 1, return result of each event"""
+        return list(await asyncio.gather(*(self.on_event(*event) for event in events)))
+
 
 class ScAgent(ScAgentAbstract, ABC):
     def __init__(self, event_element: ScAddr, event_type: ScEventType) -> None:
@@ -91,9 +210,10 @@ class ScAgent(ScAgentAbstract, ABC):
         cls, event_element: Union[Idtf, ScAddr], event_type: ScEventType
     ) -> "ScAgent":
         if isinstance(event_element, Idtf):
-            event_element = await ScKeynodes.resolve(
-                event_element, sc_type.CONST_NODE_CLASS
-            )
+            with startup_phase(f"create {cls.__name__}"):
+                event_element = await ScKeynodes.resolve(
+                    event_element, sc_type.CONST_NODE_CLASS
+                )
         if not event_element.is_valid():
             raise InvalidValueError(
                 f"event_class of {cls.__class__.__name__} is invalid"
@@ -129,13 +249,14 @@ class ScAgentClassic(ScAgent, ABC):
         event_element: Union[Idtf, ScAddr] = ActionStatus.ACTION_INITIATED,
         event_type: ScEventType = ScEventType.AFTER_GENERATE_OUTGOING_ARC,
     ) -> "ScAgentClassic":
-        actionc_class = await ScKeynodes.resolve(
-            action_class_name, sc_type.CONST_NODE_CLASS
-        )
+        identifiers = {action_class_name: sc_type.CONST_NODE_CLASS}
         if isinstance(event_element, Idtf):
-            event_element = await ScKeynodes.resolve(
-                event_element, sc_type.CONST_NODE_CLASS
-            )
+            identifiers[event_element] = sc_type.CONST_NODE_CLASS
+        with startup_phase(f"create {cls.__name__}({repr(action_class_name)})"):
+            keynodes = await ScKeynodes.resolve_many(identifiers)
+        actionc_class = keynodes[action_class_name]
+        if isinstance(event_element, Idtf):
+            event_element = keynodes[event_element]
         if not event_element.is_valid():
             raise InvalidValueError(
                 f"event_class of {cls.__class__.__name__} is invalid"
@@ -150,10 +271,173 @@ class ScAgentClassic(ScAgent, ABC):
             description = f"{description}, event_type={repr(self._event_type)}"
         return description + ")"
 
+    async def _on_registered(self, event: ScEventSubscription) -> None:
+        await super()._on_registered(event)
+        await ScActionClassIndex.track(self._action_class)
+
+    async def _on_unregistered(self) -> None:
+        await super()._on_unregistered()
+        await ScActionClassIndex.untrack(self._action_class)
+
     async def _callback(
         self, event_element: ScAddr, event_connector: ScAddr, action_element: ScAddr
     ) -> ScResult:
-        if not await check_action_class(self._action_class, action_element):
+        if ScActionClassIndex.is_tracked(self._action_class):
+            is_action_class = await ScActionClassIndex.contains(self._action_class, action_element)
+        else:
+            is_action_class = await check_action_class(self._action_class, action_element)
+        if not is_action_class:
             return ScResult.SKIP
         self.logger.info("Confirmed action class")
-        return await self.on_event(event_element, event_connector, action_element)
+        return await self._handle_event(event_element, event_connector, action_element)
+
+
+class ScRegistrationError(Exception):
+    """Some agents or modules failed to register or unregister, errors are keyed by them"""
+
+    def __init__(self, failures: Dict[Any, BaseException]) -> None:
+        super().__init__(
+            ", ".join(f"{repr(key)}: {repr(error)}" for key, error in failures.items())
+        )
+        self.failures = failures
+
+
+_logger = getLogger(__name__)
+
+
+async def register_agents(*agents: ScAgentAbstract) -> Dict[ScAgentAbstract, BaseException]:
+    """
+    Register agents concurrently, agents with own subscriptions are subscribed with one request.
+    Return errors of failed agents, the other agents stay registered.
+    """
+    own, others = _split(agents, lambda agent: not agent.is_registered)
+    calls: List[Tuple[ScAgentAbstract, Awaitable[None]]] = []
+    if own:
+        params = [agent._subscription_params() for agent in own]
+        try:
+            with startup_phase(f"subscribe {len(own)} agents"):
+                events = await traced_call(client.create_elementary_event_subscriptions, *params)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            _logger.warning(
+                "Failed to subscribe %d agents at once, subscribing one by one: %s",
+                len(own),
+                repr(error),
+            )
+            others.extend(own)
+        else:
+            calls.extend(
+                (agent, in_startup_phase(repr(agent), agent._on_registered(event)))
+                for agent, event in zip(own, events)
+            )
+    calls.extend((agent, in_startup_phase(repr(agent), agent._register())) for agent in others)
+    return await _gather_failures(calls, "register")
+
+
+async def unregister_agents(*agents: ScAgentAbstract) -> Dict[ScAgentAbstract, BaseException]:
+    """
+    Unregister agents concurrently, own subscriptions of agents are destroyed with one request.
+    Return errors of failed agents.
+    """
+    own, others = _split(agents, lambda agent: agent.is_registered and agent._event_hub is None)
+    calls: List[Tuple[ScAgentAbstract, Awaitable[None]]] = []
+    if own:
+        try:
+            await traced_call(
+                client.destroy_elementary_event_subscriptions, *(agent._event for agent in own)
+            )
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            _logger.warning(
+                "Failed to unsubscribe %d agents at once, unsubscribing one by one: %s",
+                len(own),
+                repr(error),
+            )
+            others.extend(own)
+        else:
+            calls.extend((agent, agent._on_unregistered()) for agent in own)
+    calls.extend((agent, agent._unregister()) for agent in others)
+    return await _gather_failures(calls, "unregister")
+
+
+async def resubscribe_agents(*agents: ScAgentAbstract) -> None:
+    """
+    Create subscriptions of registered agents again, subscriptions are lost on reconnection.
+    Own subscriptions are created with one request, shared ones are created by their hubs.
+    """
+    own = [agent for agent in agents if agent.is_registered and agent._event_hub is None]
+    hubs = {
+        agent._event_hub
+        for agent in agents
+        if agent.is_registered and agent._event_hub is not None
+    }
+    if own:
+        events = await traced_call(
+            client.create_elementary_event_subscriptions,
+            *(agent._subscription_params() for agent in own),
+        )
+        for agent, event in zip(own, events):
+            agent._event = event
+    await asyncio.gather(*(hub.resubscribe() for hub in hubs))
+
+
+async def forget_agents(*agents: ScAgentAbstract) -> None:
+    """
+    Mark agents unregistered without requests, their subscriptions were lost with the connection
+    and they keep addresses of the old KB. Agents have to be created again.
+    """
+    registered = [agent for agent in agents if agent.is_registered]
+    for hub in {agent._event_hub for agent in registered if agent._event_hub is not None}:
+        hub.forget()
+    await asyncio.gather(*(agent._on_unregistered() for agent in registered))
+
+
+async def drain_agents(*agents: ScAgentAbstract, timeout: Optional[float]) -> Dict[str, float]:
+    """
+    Stop dispatching new events to agents, wait for callbacks being handled
+    and cancel ones left after timeout seconds. Return statistics of the drain.
+    Agents accept events again after next registration.
+    """
+    start = time.perf_counter()
+    for agent in agents:
+        agent._is_draining = True
+        agent._rejected = 0
+    tasks = {task for agent in agents for task in agent._tasks}
+    done: Set[asyncio.Task] = set()
+    pending: Set[asyncio.Task] = set()
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    return {
+        "finished": len(done),
+        "cancelled": len(pending),
+        "rejected": sum(agent._rejected for agent in agents),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _split(
+    agents: Tuple[ScAgentAbstract, ...], is_ready: Callable[[ScAgentAbstract], bool]
+) -> Tuple[List[ScAgentAbstract], List[ScAgentAbstract]]:
+    """Split agents into ones with own subscriptions ready for one request and the others"""
+    own: List[ScAgentAbstract] = []
+    others: List[ScAgentAbstract] = []
+    for agent in agents:
+        if agent.subscription_hub is None and is_ready(agent):
+            own.append(agent)
+        else:
+            others.append(agent)
+    return own, others
+
+
+async def _gather_failures(
+    calls: List[Tuple[ScAgentAbstract, Awaitable[None]]], action: str
+) -> Dict[ScAgentAbstract, BaseException]:
+    results = await asyncio.gather(*(call for _, call in calls), return_exceptions=True)
+    failures: Dict[ScAgentAbstract, BaseException] = {}
+    for (agent, _), result in zip(calls, results):
+        if isinstance(result, BaseException):
+            _logger.error("Failed to %s %s: %s", action, repr(agent), repr(result))
+            failures[agent] = result
+    return failures
@@ -0,0 +1,109 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from logging import Logger, getLogger
+from typing import Any, Callable, Optional, TypeVar
+
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm.sc_result import ScResult
+
+T = TypeVar("T")
+
+
+def pack(data: Any) -> Any:
+    """Replace ScAddr with int values in data to send it to another process compactly"""
+    if isinstance(data, ScAddr):
+        return data.value
+    if isinstance(data, (list, tuple, set, frozenset)):
+        return type(data)(pack(item) for item in data)
+    if isinstance(data, dict):
+        return {pack(key): pack(value) for key, value in data.items()}
+    return data
+
+
+class ScComputePool:
+    """
+    Pool of processes for pure CPU-bound functions, so they don't block the event loop.
+    Arguments are packed: ScAddr is sent as int value.
+    Process of a timed out task isn't interrupted, it gets next task after finishing.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None) -> None:
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("Count of workers must be positive")
+        if timeout is not None and timeout <= 0:
+            raise ValueError("Timeout must be positive")
+        self._max_workers = max_workers
+        self._timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._logger: Logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(max_workers={self._max_workers}, timeout={self._timeout})"
+        )
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run picklable function with packed arguments, raise asyncio.TimeoutError on timeout"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+            self._logger.info("Started %s", repr(self))
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, func, *pack(args))
+        try:
+            return await asyncio.wait_for(future, self._timeout)
+        except asyncio.TimeoutError:
+            self._logger.error("%s timed out after %s seconds", func.__qualname__, self._timeout)
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop processes of the pool, the pool is started again on next run"""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+            self._logger.info("Stopped %s", repr(self))
+
+
+class ScComputeMixin(ABC):
+    """
+    Mixin for agents doing CPU-bound work in three stages:
+    `prepare` reads the KB on the event loop, `compute` runs in compute_pool process
+    with ScAddr packed as int, `apply` writes the result to the KB on the event loop.
+
+    class MyAgent(ScComputeMixin, ScAgentClassic):
+        compute_pool = ScComputePool(max_workers=4, timeout=30)
+    """
+
+    compute_pool: ScComputePool = ScComputePool()
+
+    async def on_event(
+        self, event_element: ScAddr, event_connector: ScAddr, action_element: ScAddr
+    ) -> ScResult:
+        data = await self.prepare(event_element, event_connector, action_element)
+        try:
+            result = await self.compute_pool.run(type(self).compute, data)
+        except asyncio.TimeoutError:
+            return ScResult.ERROR
+        return await self.apply(action_element, result)
+
+    @abstractmethod
+    async def prepare(
+        self, event_element: ScAddr, event_connector: ScAddr, action_element: ScAddr
+    ) -> Any:
+        """Read data for compute from the KB"""
+
+    @staticmethod
+    @abstractmethod
+    def compute(data: Any) -> Any:
+        """Pure function of packed data, it runs in another process"""
+
+    @abstractmethod
+    async def apply(self, action_element: ScAddr, result: Any) -> ScResult:
+        """Write result of compute to the KB"""
@@ -0,0 +1,147 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import asyncio
+from collections import deque
+from enum import Enum
+from logging import Logger, getLogger
+from typing import Awaitable, Callable, Deque, Dict
+
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm.sc_result import ScResult
+
+AgentCallback = Callable[[ScAddr, ScAddr, ScAddr], Awaitable[ScResult]]
+
+
+class OverflowPolicy(Enum):
+    """What to do with an event when the queue of the dispatcher is full"""
+
+    BLOCK = "block"  # wait until the queue has space, up to max_blocked events
+    DROP_OLDEST = "drop_oldest"  # drop the oldest queued event and queue the new one
+    REJECT = "reject"  # don't process the new event
+
+
+class ScDispatcher:
+    """
+    Limits count of agent callbacks running at the same time.
+    Events above the limit wait in the bounded queue, overflow of the queue is handled by policy.
+    Dropped and rejected events get ScResult.ERROR_INVALID_STATE.
+    Events are pushed by the server and each one is already a task, so BLOCK only delays
+    admission of the event: blocked events are limited by max_blocked, extra ones are rejected.
+    One dispatcher can be shared by several agents, e.g. by all agents of ScModule.
+    """
+
+    def __init__(
+        self,
+        workers: int = 16,
+        queue_size: int = 1024,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+        max_blocked: int = 8192,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("Count of workers must be positive")
+        if queue_size < 0:
+            raise ValueError("Size of queue cannot be negative")
+        if max_blocked < 0:
+            raise ValueError("Count of blocked events cannot be negative")
+        self._workers = workers
+        self._queue_size = queue_size
+        self._overflow = overflow
+        self._max_blocked = max_blocked
+        self._queue: Deque[asyncio.Future] = deque()
+        self._blocked: Deque[asyncio.Future] = deque()
+        self._in_flight: int = 0
+        self._dropped: int = 0
+        self._rejected: int = 0
+        self._logger: Logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(workers={self._workers}, "
+            f"queue_size={self._queue_size}, overflow={self._overflow})"
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Count of callbacks running now"""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Count of events waiting for a worker, including blocked ones"""
+        return len(self._queue) + len(self._blocked)
+
+    def stats(self) -> Dict[str, int]:
+        """Get live gauges and counters of the dispatcher"""
+        return {
+            "workers": self._workers,
+            "in_flight": self._in_flight,
+            "queued": len(self._queue),
+            "blocked": len(self._blocked),
+            "dropped": self._dropped,
+            "rejected": self._rejected,
+        }
+
+    async def dispatch(
+        self,
+        callback: AgentCallback,
+        event_element: ScAddr,
+        event_connector: ScAddr,
+        action_element: ScAddr,
+    ) -> ScResult:
+        """Run callback when a worker is free"""
+        if not await self._acquire():
+            return ScResult.ERROR_INVALID_STATE
+        try:
+            return await callback(event_element, event_connector, action_element)
+        finally:
+            self._release()
+
+    async def _acquire(self) -> bool:
+        if self._in_flight < self._workers and not self._queue:
+            self._in_flight += 1
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        if len(self._queue) < self._queue_size and not self._blocked:
+            self._queue.append(waiter)
+        elif self._overflow is OverflowPolicy.BLOCK and len(self._blocked) < self._max_blocked:
+            self._blocked.append(waiter)
+        elif self._overflow is OverflowPolicy.DROP_OLDEST and self._queue:
+            self._queue.popleft().set_result(False)
+            self._dropped += 1
+            self._logger.warning("Queue is full, dropped the oldest event")
+            self._queue.append(waiter)
+        else:
+            self._rejected += 1
+            self._logger.warning("Queue is full, rejected the event")
+            return False
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                self._release()
+            else:
+                self._discard(waiter)
+            raise
+
+    def _release(self) -> None:
+        while self._queue:
+            waiter = self._queue.popleft()
+            if self._blocked:
+                self._queue.append(self._blocked.popleft())
+            if not waiter.done():
+                waiter.set_result(True)  # The worker is passed to the waiter
+                return
+        self._in_flight -= 1
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        for waiters in (self._queue, self._blocked):
+            try:
+                waiters.remove(waiter)
+                return
+            except ValueError:
+                pass
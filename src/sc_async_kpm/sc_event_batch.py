@@ -0,0 +1,80 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import asyncio
+from logging import Logger
+from typing import Awaitable, Callable, List, NamedTuple, Optional, Set, Tuple
+
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm.sc_result import ScResult
+
+
+class ScAgentEvent(NamedTuple):
+    event_element: ScAddr
+    event_connector: ScAddr
+    action_element: ScAddr
+
+
+BatchHandler = Callable[[List[ScAgentEvent]], Awaitable[List[ScResult]]]
+
+
+class EventBatcher:
+    """Collects events until max_size of them or max_wait seconds and handles them at once"""
+
+    def __init__(
+        self, handler: BatchHandler, max_size: int, max_wait: float, logger: Logger
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("Size of batch must be positive")
+        if max_wait < 0:
+            raise ValueError("Wait time of batch cannot be negative")
+        self._handler = handler
+        self._max_size = max_size
+        self._max_wait = max_wait
+        self._logger = logger
+        self._pending: List[Tuple[ScAgentEvent, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, event: ScAgentEvent) -> ScResult:
+        """Add event to the batch and get its result after handling the batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((event, future))
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._handle(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, batch: List[Tuple[ScAgentEvent, asyncio.Future]]) -> None:
+        events = [event for event, _ in batch]
+        try:
+            results = await self._handler(events)
+            if len(results) != len(events):
+                raise ValueError(f"Got {len(results)} results of {len(events)} events")
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self._logger.error("Failed to handle batch of %d events: %s", len(events), repr(error))
+            results = [ScResult.ERROR] * len(events)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,239 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import asyncio.base_events
+import json
+from http import HTTPStatus
+from logging import Logger, getLogger
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from sc_async_kpm.metrics import ScAgentMetrics, histogram_lines, metric_lines
+from sc_async_kpm.sc_keynodes import ScKeynodes
+from sc_async_kpm.sc_loop_monitor import ScLoopMonitor
+from sc_async_kpm.sc_module import ScModule
+
+if TYPE_CHECKING:
+    from sc_async_kpm.sc_server import ScServer
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+JSON_CONTENT_TYPE = "application/json"
+
+_KEYNODES_COUNTERS = ("hits", "misses", "negative_hits", "coalesced", "network_calls")
+
+
+class ScHttpEndpoint:
+    """
+    Minimal HTTP server on asyncio streams for probes and scraping of one ScServer:
+    /health returns state of the server as JSON, /ready answers 200 when agents accept events
+    and 503 otherwise, /metrics returns metrics in Prometheus text exposition format.
+    """
+
+    read_timeout: float = 5.0  # Seconds to wait for the request head
+    lag_interval: float = 1.0  # Seconds between samples of the event loop lag
+
+    def __init__(self, server: ScServer, host: str = "0.0.0.0", port: int = 8080) -> None:
+        self._server = server
+        self._host = host
+        self._port = port
+        self._listener: Optional[asyncio.base_events.Server] = None
+        self._own_monitor: Optional[ScLoopMonitor] = None
+        self._logger: Logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(host={repr(self._host)}, port={self._port})"
+
+    @property
+    def port(self) -> int:
+        """Listened port, the actual one if the endpoint was created with port 0"""
+        if self._listener is not None and self._listener.sockets:
+            return self._listener.sockets[0].getsockname()[1]
+        return self._port
+
+    async def start(self) -> None:
+        if self._listener is not None:
+            return
+        self._listener = await asyncio.start_server(self._handle, self._host, self._port)
+        if self._server.loop_monitor is None:
+            # Lag is exported even if the server doesn't monitor the loop itself
+            self._own_monitor = ScLoopMonitor(self.lag_interval, threshold=None)
+            await self._own_monitor.start()
+        self._logger.info("Listening on %s:%d", self._host, self.port)
+
+    async def stop(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        monitor, self._own_monitor = self._own_monitor, None
+        if monitor is not None:
+            await monitor.stop()
+        listener.close()
+        await listener.wait_closed()
+        self._logger.info("Stopped listening on %s", self._host)
+
+    async def __aenter__(self) -> ScHttpEndpoint:
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.stop()
+
+    def metrics(self) -> str:
+        """Get metrics of agents, modules, keynodes and the connection in Prometheus format"""
+        lines: List[str] = []
+        connection = self._server.connection_stats()
+        lines += metric_lines(
+            "sc_server_connected",
+            "gauge",
+            "Whether the server is connected",
+            [({}, int(connection["connected"]))],
+        )
+        lines += metric_lines(
+            "sc_server_registered",
+            "gauge",
+            "Whether modules of the server are registered",
+            [({}, int(self._server.is_registered))],
+        )
+        lines += metric_lines(
+            "sc_server_reconnects_total",
+            "counter",
+            "Count of restored connections",
+            [({}, connection["reconnects"])],
+        )
+        lines += metric_lines(
+            "sc_server_seconds_without_subscriptions_total",
+            "counter",
+            "Seconds spent without connection since the first connection",
+            [({}, connection["seconds_without_subscriptions"])],
+        )
+        lines += self._loop_lines()
+        lines += self._module_lines()
+        lines += self._keynodes_lines()
+        return "\n".join(lines) + "\n" + ScAgentMetrics.to_prometheus()
+
+    def _loop_lines(self) -> List[str]:
+        monitor = self._server.loop_monitor or self._own_monitor
+        if monitor is None:
+            return []
+        stats = monitor.stats()
+        lines = [
+            "# HELP sc_event_loop_lag_seconds Delay of scheduled wake ups of the event loop",
+            "# TYPE sc_event_loop_lag_seconds histogram",
+        ]
+        lines += histogram_lines("sc_event_loop_lag_seconds", {}, stats["lag"])
+        lines += metric_lines(
+            "sc_event_loop_stalls_total",
+            "counter",
+            "Count of wake ups of the event loop delayed more than the threshold by agent",
+            [({"agent": agent}, count) for agent, count in stats["stalls"].items()],
+        )
+        return lines
+
+    def _module_lines(self) -> List[str]:
+        agents = []
+        dispatchers = []
+        for module in sorted(self._server.modules, key=repr):
+            if not isinstance(module, ScModule):
+                continue
+            labels = {"module": repr(module)}
+            agents.append((labels, len(module.agents)))
+            if module.dispatcher is not None:
+                dispatchers.append((labels, module.dispatcher.stats()))
+        lines = metric_lines("sc_module_agents", "gauge", "Count of agents of the module", agents)
+        lines += metric_lines(
+            "sc_dispatcher_in_flight",
+            "gauge",
+            "Count of callbacks running in the dispatcher of the module",
+            [(labels, stats["in_flight"]) for labels, stats in dispatchers],
+        )
+        lines += metric_lines(
+            "sc_dispatcher_queue_depth",
+            "gauge",
+            "Count of events waiting for a worker of the dispatcher of the module",
+            [(labels, stats["queued"] + stats["blocked"]) for labels, stats in dispatchers],
+        )
+        for counter in ("dropped", "rejected"):
+            lines += metric_lines(
+                f"sc_dispatcher_{counter}_total",
+                "counter",
+                f"Count of events {counter} by the dispatcher of the module",
+                [(labels, stats[counter]) for labels, stats in dispatchers],
+            )
+        return lines
+
+    @staticmethod
+    def _keynodes_lines() -> List[str]:
+        stats = ScKeynodes.stats()
+        lines: List[str] = []
+        for counter in _KEYNODES_COUNTERS:
+            lines += metric_lines(
+                f"sc_keynodes_{counter}_total",
+                "counter",
+                f"Count of {counter.replace('_', ' ')} of the keynodes cache",
+                [({}, stats[counter])],
+            )
+        lines += metric_lines(
+            "sc_keynodes_entries",
+            "gauge",
+            "Count of keynodes in the cache",
+            [({}, stats["entries"])],
+        )
+        lines += [
+            "# HELP sc_keynodes_resolve_seconds Duration of requests resolving keynodes",
+            "# TYPE sc_keynodes_resolve_seconds histogram",
+        ]
+        lines += histogram_lines("sc_keynodes_resolve_seconds", {}, stats["resolve_latency"])
+        return lines
+
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path = await asyncio.wait_for(self._read_request(reader), self.read_timeout)
+            except (asyncio.TimeoutError, ValueError, asyncio.IncompleteReadError):
+                status, content_type, body = HTTPStatus.BAD_REQUEST, JSON_CONTENT_TYPE, b""
+                method = "GET"
+            else:
+                status, content_type, body = self._route(method, path)
+            head = (
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(head.encode("latin-1") + (b"" if method == "HEAD" else body))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self._logger.error("Failed to handle request: %s", repr(error))
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str]:
+        request_line = (await reader.readuntil(b"\r\n")).decode("latin-1")
+        method, target, _ = request_line.split(" ", 2)
+        # Headers and body aren't used
+        while (await reader.readuntil(b"\r\n")) != b"\r\n":
+            pass
+        return method, target.split("?", 1)[0]
+
+    def _route(self, method: str, path: str) -> Tuple[HTTPStatus, str, bytes]:
+        if method not in ("GET", "HEAD"):
+            return HTTPStatus.METHOD_NOT_ALLOWED, JSON_CONTENT_TYPE, b""
+        if path == "/health":
+            body = json.dumps(self._server.health()).encode()
+            return HTTPStatus.OK, JSON_CONTENT_TYPE, body
+        if path == "/ready":
+            ready = self._server.is_ready
+            status = HTTPStatus.OK if ready else HTTPStatus.SERVICE_UNAVAILABLE
+            return status, JSON_CONTENT_TYPE, json.dumps({"ready": ready}).encode()
+        if path == "/metrics":
+            return HTTPStatus.OK, PROMETHEUS_CONTENT_TYPE, self.metrics().encode()
+        return HTTPStatus.NOT_FOUND, JSON_CONTENT_TYPE, b""
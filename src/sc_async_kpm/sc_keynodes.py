@@ -4,16 +4,111 @@ Distributed under the MIT License
 (See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
 """
 
+import asyncio
+import time
+from collections import OrderedDict
 from logging import Logger, getLogger
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple, cast
 
 from sc_async_client import client
 from sc_async_client.client import erase_elements
+from sc_async_client.constants.common import ScEventType
 from sc_async_client.constants.exceptions import InvalidValueError
 from sc_async_client.constants.sc_type import CONST_NODE_ROLE, ScType
-from sc_async_client.models import ScAddr, ScIdtfResolveParams
+from sc_async_client.models import (
+    ScAddr,
+    ScEventSubscription,
+    ScEventSubscriptionParams,
+    ScIdtfResolveParams,
+)
+
+from sc_async_kpm.metrics import Histogram
+from sc_async_kpm.sc_result import ScResult
+from sc_async_kpm.tracing import traced_call
 
 Idtf = str
+_ResolveKey = Tuple[Idtf, Optional[int]]
+
+
+class ScKeynodesCache:
+    """Cached keynodes of the KB of the only connection of sc_async_client"""
+
+    def __init__(self) -> None:
+        self.keynodes: Dict[Idtf, ScAddr] = {}
+        self.keynode_idtfs: Dict[ScAddr, Idtf] = {}
+        self.idtfs: OrderedDict[ScAddr, Idtf] = OrderedDict()
+        self.negative: OrderedDict[Idtf, float] = OrderedDict()
+        self.rrel_table: List[Optional[ScAddr]] = []
+        self.rrel_ordinals: Dict[ScAddr, int] = {}
+        self.namespaces: Dict[type, Dict[str, ScAddr]] = {}
+        self.in_flight: Dict[_ResolveKey, asyncio.Future] = {}
+        self.batch: Dict[_ResolveKey, Optional[ScType]] = {}
+        self.is_invalidation_enabled: bool = False
+        self.watched: Dict[ScAddr, ScEventSubscription] = {}
+        self._logger: Logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(keynodes={len(self.keynodes)})"
+
+    def store(self, identifier: Idtf, addr: ScAddr) -> None:
+        self.keynodes[identifier] = addr
+        self.keynode_idtfs[addr] = identifier
+        self.idtfs.pop(addr, None)
+        self.negative.pop(identifier, None)
+
+    def evict(self, identifier: Idtf) -> Optional[ScEventSubscription]:
+        """Forget keynode, return its subscription to erasing to destroy it if it's watched"""
+        addr = self.keynodes.pop(identifier, None)
+        if addr is None:
+            return None
+        self.keynode_idtfs.pop(addr, None)
+        self.idtfs.pop(addr, None)
+        index = self.rrel_ordinals.pop(addr, None)
+        if index is not None:
+            self.rrel_table[index] = None
+        return self.watched.pop(addr, None)
+
+    def clear(self) -> None:
+        """Forget all keynodes, e.g. when the server has got another KB"""
+        self.keynodes.clear()
+        self.keynode_idtfs.clear()
+        self.idtfs.clear()
+        self.negative.clear()
+        self.rrel_table.clear()
+        self.rrel_ordinals.clear()
+        self.namespaces.clear()
+        self.watched.clear()
+        self.is_invalidation_enabled = False
+
+    def store_rrel(self, index: int, addr: ScAddr) -> None:
+        if index >= len(self.rrel_table):
+            self.rrel_table.extend([None] * (index + 1 - len(self.rrel_table)))
+        self.rrel_table[index] = addr
+        self.rrel_ordinals[addr] = index
+
+    def truncate_rrel(self, max_index: int) -> None:
+        for addr in self.rrel_table[max_index + 1 :]:
+            if addr is not None:
+                del self.rrel_ordinals[addr]
+        del self.rrel_table[max_index + 1 :]
+
+    def truncate_idtfs(self, max_size: int) -> None:
+        while len(self.idtfs) > max_size:
+            self.idtfs.popitem(last=False)
+
+    async def on_erase(
+        self, erased_element: ScAddr, event_connector: ScAddr, other_element: ScAddr
+    ) -> ScResult:
+        """Callback of erasing of a watched keynode: evict it from the cache"""
+        # pylint: disable=unused-argument
+        # Subscription of the erased element is destroyed with it
+        self.watched.pop(erased_element, None)
+        self.idtfs.pop(erased_element, None)
+        identifier = self.keynode_idtfs.get(erased_element)
+        if identifier is not None:
+            self.evict(identifier)
+            self._logger.debug("Evicted erased keynode %s", repr(identifier))
+        return ScResult.OK
 
 
 class ScKeynodesMeta(type):
@@ -21,14 +116,32 @@ class ScKeynodesMeta(type):
 
     def __init__(cls, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
-        cls._dict: Dict[Idtf, ScAddr] = {}
         cls._logger: Logger = getLogger(f"{__name__}.{cls.__name__}")
+        cls._cache = ScKeynodesCache()
         cls._min_rrel_index: int = 1
         cls._max_rrel_index: int = 10
+        cls._idtfs_max_size: int = 0
+        cls._negative_ttl: float = 0
+        cls._negative_max_size: int = 1024
+        cls._negative_hits: int = 0
+        cls._saved_requests: int = 0
+        cls._hits: int = 0
+        cls._misses: int = 0
+        cls._coalesced: int = 0
+        cls._network_calls: int = 0
+        cls._resolve_latency = Histogram()
+        cls._batch_tasks: Set[asyncio.Task] = set()
 
     def __call__(cls, *args, **kwargs) -> None:
         raise TypeError(f"Use {cls.__name__} without initialization")
 
+    def cache(cls) -> ScKeynodesCache:
+        """
+        Get the cache of keynodes. sc_async_client has one connection per process,
+        so keynodes of one KB are cached, ScServer clears them on connection to another url
+        """
+        return cls._cache
+
     async def get_by_idtf(cls, identifier: Idtf) -> ScAddr:
         """Get keynode, cannot be invalid ScAddr(0)"""
         addr = await cls.get(identifier)
@@ -42,8 +155,9 @@ class ScKeynodesMeta(type):
     async def erase(cls, identifier: Idtf) -> bool:
         """Erase keynode from the kb and memory and return boolean status"""
         addr = await cls.get_by_idtf(identifier)
-        del cls._dict[identifier]
-        return await erase_elements(addr)
+        # Subscription to erasing is destroyed with the element
+        cls.cache().evict(identifier)
+        return await traced_call(erase_elements, addr)
 
     async def get(cls, identifier: Idtf) -> ScAddr:
         """Get keynode, can be ScAddr(0)"""
@@ -51,30 +165,377 @@ class ScKeynodesMeta(type):
 
     async def resolve(cls, identifier: Idtf, sc_type: Optional[ScType]) -> ScAddr:
         """Get keynode. If sc_type is valid, an element will be created in the KB"""
-        addr = cls._dict.get(identifier)
-        if addr is None:
-            params = ScIdtfResolveParams(idtf=identifier, type=sc_type)
-            res = await client.resolve_keynodes(params)
-            addr = res[0]
+        addrs = await cls.resolve_many({identifier: sc_type})
+        return addrs[identifier]
+
+    async def get_many(cls, *identifiers: Idtf) -> Dict[Idtf, ScAddr]:
+        """Get several keynodes with one request, they can be ScAddr(0)"""
+        return await cls.resolve_many(dict.fromkeys(identifiers))
+
+    async def resolve_many(
+        cls, identifiers: Dict[Idtf, Optional[ScType]]
+    ) -> Dict[Idtf, ScAddr]:
+        """
+        Get several keynodes. All identifiers missing in the cache are resolved with one request.
+        If sc_type of an identifier is valid, an element will be created in the KB
+        """
+        cache = cls.cache()
+        misses: Dict[Idtf, Optional[ScType]] = {}
+        negative_hits = 0
+        for idtf, type_ in identifiers.items():
+            if idtf in cache.keynodes:
+                cls._hits += 1
+                continue
+            if type_ is None and cls._is_negative(cache, idtf):
+                negative_hits += 1
+                continue
+            misses[idtf] = type_
+        if negative_hits:
+            cls._negative_hits += negative_hits
+            if not misses:
+                cls._saved_requests += 1
+        resolved: Dict[Idtf, ScAddr] = {}
+        if misses:
+            cls._misses += len(misses)
+            futures = [cls._request(cache, idtf, type_) for idtf, type_ in misses.items()]
+            addrs = await asyncio.gather(*map(asyncio.shield, futures))
+            resolved = dict(zip(misses, addrs))
+        return {
+            idtf: resolved[idtf] if idtf in resolved else cache.keynodes.get(idtf, ScAddr(0))
+            for idtf in identifiers
+        }
+
+    def _request(
+        cls, cache: ScKeynodesCache, identifier: Idtf, sc_type: Optional[ScType]
+    ) -> asyncio.Future:
+        """
+        Get future of resolving an identifier.
+        Concurrent requests of the same identifier share one future,
+        requests made within one event loop iteration are sent with one batch.
+        """
+        key = (identifier, None if sc_type is None else sc_type.value)
+        future = cache.in_flight.get(key)
+        if future is not None:
+            cls._coalesced += 1
+            return future
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not cache.batch:
+            loop.call_soon(cls._flush_batch, cache)
+        cache.batch[key] = sc_type
+        cache.in_flight[key] = future
+        return future
+
+    def _flush_batch(cls, cache: ScKeynodesCache) -> None:
+        batch, cache.batch = cache.batch, {}
+        task = asyncio.get_running_loop().create_task(cls._send_batch(cache, batch))
+        cls._batch_tasks.add(task)
+        task.add_done_callback(cls._batch_tasks.discard)
+
+    async def _send_batch(
+        cls, cache: ScKeynodesCache, batch: Dict[_ResolveKey, Optional[ScType]]
+    ) -> None:
+        futures = {key: cache.in_flight[key] for key in batch}
+        params = [ScIdtfResolveParams(idtf=idtf, type=type_) for (idtf, _), type_ in batch.items()]
+        try:
+            addrs = await cls._resolve_keynodes(params)
+            if len(addrs) != len(batch):
+                raise InvalidValueError(
+                    f"Server returned {len(addrs)} ScAddrs for {len(batch)} identifiers"
+                )
+            for (key, type_), addr in zip(batch.items(), addrs):
+                idtf = key[0]
+                if addr.is_valid():
+                    cache.store(idtf, addr)
+                elif type_ is None:
+                    cls._remember_negative(cache, idtf)
+                cls._logger.debug(
+                    "Resolved %s identifier with type %s: %s",
+                    repr(idtf),
+                    repr(type_),
+                    repr(addr),
+                )
+                futures[key].set_result(addr)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            cls._logger.error("Failed to resolve %d identifiers: %s", len(batch), repr(error))
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+        finally:
+            # Waiters of a left pending future would hang, e.g. when the request is cancelled
+            for key, future in futures.items():
+                if cache.in_flight.get(key) is future:
+                    del cache.in_flight[key]
+                if not future.done():
+                    future.cancel()
+        if cache.is_invalidation_enabled:
+            await cls._watch(cache, *(idtf for idtf, _ in batch))
+
+    async def _resolve_keynodes(cls, params: List[ScIdtfResolveParams]) -> List[ScAddr]:
+        cls._network_calls += 1
+        start = time.perf_counter()
+        try:
+            return await traced_call(client.resolve_keynodes, *params)
+        finally:
+            cls._resolve_latency.observe(time.perf_counter() - start)
+
+    def stats(cls) -> Dict[str, Any]:
+        """
+        Get snapshot of cache statistics: hits, misses, negative hits, coalesced requests,
+        network calls, resolve latency histogram in seconds and count of entries of the cache
+        """
+        cache = cls.cache()
+        lookups = cls._hits + cls._misses + cls._negative_hits
+        return {
+            "hits": cls._hits,
+            "misses": cls._misses,
+            "negative_hits": cls._negative_hits,
+            "coalesced": cls._coalesced,
+            "network_calls": cls._network_calls,
+            "hit_rate": (cls._hits + cls._negative_hits) / lookups if lookups else 0.0,
+            "resolve_latency": cls._resolve_latency.snapshot(),
+            "entries": len(cache.keynodes),
+            "negative_entries": len(cache.negative),
+        }
+
+    def reset_stats(cls) -> None:
+        """Reset counters and latency histogram, cached keynodes are kept"""
+        cls._hits = 0
+        cls._misses = 0
+        cls._negative_hits = 0
+        cls._saved_requests = 0
+        cls._coalesced = 0
+        cls._network_calls = 0
+        cls._resolve_latency.reset()
+
+    def set_negative_cache(cls, ttl: float, max_size: int = 1024) -> None:
+        """
+        Remember identifiers that don't exist in the KB for ttl seconds.
+        Zero ttl disables negative caching. Resolving with sc_type invalidates an entry.
+        """
+        if ttl < 0:
+            raise ValueError("TTL of negative cache cannot be negative")
+        if max_size < 1:
+            raise ValueError("Size of negative cache must be positive")
+        cls._negative_ttl = ttl
+        cls._negative_max_size = max_size
+        cls._cache.negative.clear()
+
+    def negative_cache_info(cls) -> Dict[str, int]:
+        """Get size of negative cache, count of its hits and count of saved requests"""
+        return {
+            "size": len(cls.cache().negative),
+            "hits": cls._negative_hits,
+            "saved_requests": cls._saved_requests,
+        }
+
+    def _is_negative(cls, cache: ScKeynodesCache, identifier: Idtf) -> bool:
+        expires_at = cache.negative.get(identifier)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del cache.negative[identifier]
+            return False
+        return True
+
+    def _remember_negative(cls, cache: ScKeynodesCache, identifier: Idtf) -> None:
+        if cls._negative_ttl <= 0:
+            return
+        cache.negative[identifier] = time.monotonic() + cls._negative_ttl
+        cache.negative.move_to_end(identifier)
+        while len(cache.negative) > cls._negative_max_size:
+            cache.negative.popitem(last=False)
+
+    def get_cached_idtf(cls, addr: ScAddr) -> Optional[Idtf]:
+        """Get system identifier of a cached keynode or an element remembered earlier"""
+        cache = cls.cache()
+        identifier = cache.keynode_idtfs.get(addr)
+        if identifier is not None:
+            return identifier
+        identifier = cache.idtfs.get(addr)
+        if identifier is not None:
+            cache.idtfs.move_to_end(addr)
+        return identifier
+
+    def remember_idtf(cls, addr: ScAddr, identifier: Idtf) -> None:
+        """Remember system identifier of an element in the bounded LRU cache if it's enabled"""
+        cache = cls.cache()
+        if cls._idtfs_max_size == 0 or addr in cache.keynode_idtfs:
+            return
+        cache.idtfs[addr] = identifier
+        cache.idtfs.move_to_end(addr)
+        cache.truncate_idtfs(cls._idtfs_max_size)
+
+    def set_idtf_cache_size(cls, max_size: int) -> None:
+        """
+        Set max count of remembered system identifiers of non-keynode elements, 0 disables it.
+        Entries aren't invalidated: erased elements keep identifiers until they are pushed out.
+        """
+        if max_size < 0:
+            raise ValueError("Size of identifiers cache must not be negative")
+        cls._idtfs_max_size = max_size
+        cls._cache.truncate_idtfs(max_size)
+
+    def snapshot(cls) -> Dict[Idtf, ScAddr]:
+        """Get a copy of all cached keynodes"""
+        return dict(cls.cache().keynodes)
+
+    def warm_up(cls, keynodes: Dict[Idtf, ScAddr]) -> None:
+        """Fill the cache with keynodes resolved earlier, e.g. loaded from a snapshot"""
+        cache = cls.cache()
+        for idtf, addr in keynodes.items():
+            if addr.is_valid():
+                cache.store(idtf, addr)
+        cls._logger.debug("Warmed up with %d keynodes", len(keynodes))
+
+    async def revalidate(cls, *identifiers: Idtf) -> Dict[Idtf, ScAddr]:
+        """
+        Resolve cached keynodes again with one request bypassing the cache.
+        Erased keynodes are removed from the cache, changed ones are updated.
+        Return the keynodes whose ScAddr has changed.
+        """
+        cache = cls.cache()
+        keynodes = cache.keynodes
+        identifiers = tuple(idtf for idtf in identifiers or keynodes if idtf in keynodes)
+        if not identifiers:
+            return {}
+        params = [ScIdtfResolveParams(idtf=idtf, type=None) for idtf in identifiers]
+        addrs = await cls._resolve_keynodes(params)
+        changed: Dict[Idtf, ScAddr] = {}
+        unwatched: List[ScEventSubscription] = []
+        for idtf, addr in zip(identifiers, addrs):
+            if keynodes.get(idtf) == addr:
+                continue
+            changed[idtf] = addr
+            event = cache.evict(idtf)
+            if event is not None:
+                unwatched.append(event)
             if addr.is_valid():
-                cls._dict[identifier] = addr
-            cls._logger.debug(
-                "Resolved %s identifier with type %s: %s",
-                repr(identifier),
-                repr(sc_type),
-                repr(addr),
+                cache.store(idtf, addr)
+        cls._logger.debug(
+            "Revalidated %d keynodes, %d of them changed", len(identifiers), len(changed)
+        )
+        await cls._unwatch(*unwatched)
+        if cache.is_invalidation_enabled:
+            await cls._watch(cache, *changed)
+        return changed
+
+    async def enable_invalidation(cls) -> None:
+        """
+        Subscribe to erasing of cached keynodes and evict them when other processes erase them.
+        All keynodes are subscribed with one request, the same callback is used for all of them.
+        Keynodes resolved later are subscribed automatically.
+        """
+        cache = cls.cache()
+        cache.is_invalidation_enabled = True
+        await cls._watch(cache, *cache.keynodes)
+        cls._logger.info("Enabled invalidation of %d keynodes", len(cache.watched))
+
+    async def disable_invalidation(cls) -> None:
+        """Destroy subscriptions to erasing of cached keynodes with one request"""
+        cache = cls.cache()
+        cache.is_invalidation_enabled = False
+        events = list(cache.watched.values())
+        cache.watched.clear()
+        if events:
+            await traced_call(client.destroy_elementary_event_subscriptions, *events)
+        cls._logger.info("Disabled invalidation of %d keynodes", len(events))
+
+    async def resubscribe(cls) -> None:
+        """Subscribe to erasing of cached keynodes again, subscriptions are lost on reconnection"""
+        cache = cls.cache()
+        cache.watched.clear()
+        if cache.is_invalidation_enabled:
+            await cls._watch(cache, *cache.keynodes)
+
+    async def _unwatch(cls, *events: ScEventSubscription) -> None:
+        """Destroy subscriptions to erasing of evicted keynodes with one request"""
+        if not events:
+            return
+        try:
+            await traced_call(client.destroy_elementary_event_subscriptions, *events)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            # Subscriptions of erased elements are destroyed by the server already
+            cls._logger.warning(
+                "Failed to unsubscribe from erasing of %d keynodes: %s", len(events), repr(error)
             )
-        return addr
 
-    async def rrel_index(cls, index: int) -> ScAddr:
-        """Get rrel_i node. Max rrel index is 10. Min rrel is 1."""
+    async def _watch(cls, cache: ScKeynodesCache, *identifiers: Idtf) -> None:
+        keynodes = cache.keynodes
+        cached = {keynodes[idtf] for idtf in identifiers if idtf in keynodes}
+        addrs = [addr for addr in cached if addr not in cache.watched]
+        if not addrs:
+            return
+        params = [
+            ScEventSubscriptionParams(addr, ScEventType.BEFORE_ERASE_ELEMENT, cache.on_erase)
+            for addr in addrs
+        ]
+        try:
+            events = await traced_call(client.create_elementary_event_subscriptions, *params)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            cls._logger.error("Failed to subscribe to erasing of keynodes: %s", repr(error))
+            return
+        cache.watched.update(zip(addrs, events))
+
+    @property
+    def max_rrel_index(cls) -> int:
+        """Max index of rrel_i node"""
+        return cls._max_rrel_index
+
+    def set_max_rrel_index(cls, index: int) -> None:
+        """Set max index of cached rrel_i node. It is 10 by default"""
+        if not isinstance(index, int):
+            raise TypeError("Index of rrel node must be int")
+        if index < cls._min_rrel_index:
+            raise ValueError(f"Max rrel index cannot be less than {cls._min_rrel_index}")
+        cls._max_rrel_index = index
+        cls._cache.truncate_rrel(index)
+
+    async def rrel_index(cls, index: int, generate: bool = True) -> ScAddr:
+        """
+        Get rrel_i node. Min rrel is 1. Nodes up to max rrel index (10 by default) are cached
+        in the table, nodes above it are resolved as other keynodes.
+        If generate is False, ScAddr(0) is returned when the node doesn't exist.
+        """
+        addrs = await cls.prefetch_rrel(index, index, generate)
+        return addrs[0]
+
+    async def prefetch_rrel(cls, first: int, last: int, generate: bool = True) -> List[ScAddr]:
+        """
+        Get rrel_i nodes from first to last index inclusive. Missing ones are resolved at once.
+        If generate is False, missing nodes aren't generated and they are ScAddr(0).
+        """
+        cls._check_rrel_index(first)
+        cls._check_rrel_index(last)
+        cache = cls.cache()
+        table = cache.rrel_table
+        addrs: List[Optional[ScAddr]] = [
+            table[index] if index < len(table) else None for index in range(first, last + 1)
+        ]
+        sc_type = CONST_NODE_ROLE if generate else None
+        missing = {f"rrel_{first + i}": sc_type for i, addr in enumerate(addrs) if addr is None}
+        if missing:
+            resolved = await cls.resolve_many(missing)
+            for i, addr in enumerate(addrs):
+                if addr is None:
+                    addrs[i] = resolved[f"rrel_{first + i}"]
+                    cls._store_rrel(cache, first + i, cast(ScAddr, addrs[i]))
+        return cast(List[ScAddr], addrs)
+
+    def rrel_ordinal(cls, addr: ScAddr) -> Optional[int]:
+        """Get index of cached rrel_i node by its ScAddr"""
+        return cls.cache().rrel_ordinals.get(addr)
+
+    def _check_rrel_index(cls, index: int) -> None:
         if not isinstance(index, int):
             raise TypeError("Index of rrel node must be int")
-        if index > cls._max_rrel_index:
-            raise KeyError(f"You cannot use rrel more than {cls._max_rrel_index}")
         if index < cls._min_rrel_index:
             raise KeyError(f"You cannot use rrel less than {cls._min_rrel_index}")
-        return await cls.resolve(f"rrel_{index}", CONST_NODE_ROLE)
+
+    def _store_rrel(cls, cache: ScKeynodesCache, index: int, addr: ScAddr) -> None:
+        if addr.is_valid() and index <= cls._max_rrel_index:
+            cache.store_rrel(index, addr)
 
 
 class ScKeynodes(metaclass=ScKeynodesMeta):
@@ -0,0 +1,138 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+from logging import Logger, getLogger
+from typing import Dict, List, Optional, Type
+
+from sc_async_client.constants.exceptions import InvalidValueError
+from sc_async_client.constants.sc_type import ScType
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm.sc_keynodes import Idtf, ScKeynodes
+
+
+class Keynode:
+    """Declaration of keynode in ScKeynodesNamespace: identifier and type to resolve it"""
+
+    def __init__(self, idtf: Idtf, sc_type: Optional[ScType] = None) -> None:
+        self.idtf = idtf
+        self.sc_type = sc_type
+        self._name = idtf
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._name = name
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({repr(self.idtf)}, {repr(self.sc_type)})"
+
+    def __get__(self, instance: object, owner: Type["ScKeynodesNamespace"]) -> ScAddr:
+        addr = owner._get_addrs().get(self._name)  # pylint: disable=protected-access
+        if addr is None:
+            raise RuntimeError(
+                f"Keynode {owner.__name__}.{self._name} ({repr(self.idtf)}) is not loaded: "
+                "connect ScServer or call ScKeynodesNamespace.load_all() before using it, "
+                f"or await {owner.__name__}.get({repr(self._name)})"
+            )
+        return addr
+
+
+class ScKeynodesNamespace:
+    """
+    Base class for declaring keynodes as class attributes:
+
+    class MyKeynodes(ScKeynodesNamespace):
+        MY_CLASS = Keynode("my_class", sc_type.CONST_NODE_CLASS)
+        NREL_MY_RELATION = Keynode("nrel_my_relation")
+
+    Keynodes of all namespaces are resolved with one request on ScServer connection.
+    After that they are available as ScAddr attributes without awaiting.
+    `await MyKeynodes.get("MY_CLASS")` also works before loading, it resolves the keynode alone.
+    ScAddrs are stored in the ScKeynodes cache, so they are loaded again after it's cleared.
+    """
+
+    _namespaces: List[Type["ScKeynodesNamespace"]] = []
+    _keynodes: Dict[str, Keynode] = {}
+    _names: Dict[Idtf, str] = {}
+    _logger: Logger = getLogger(f"{__name__}.ScKeynodesNamespace")
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._keynodes = {}
+        for klass in reversed(cls.__mro__):
+            cls._keynodes.update(
+                (name, value) for name, value in vars(klass).items() if isinstance(value, Keynode)
+            )
+        cls._names = {keynode.idtf: name for name, keynode in cls._keynodes.items()}
+        ScKeynodesNamespace._namespaces.append(cls)
+
+    def __init__(self) -> None:
+        raise TypeError(f"Use {self.__class__.__name__} without initialization")
+
+    @classmethod
+    def is_loaded(cls) -> bool:
+        """Check all keynodes of the namespace are resolved"""
+        return cls._get_addrs().keys() == cls._keynodes.keys()
+
+    @classmethod
+    def find(cls, identifier: Idtf) -> Optional[ScAddr]:
+        """Get loaded keynode by system identifier, None if it isn't declared or loaded"""
+        name = cls._names.get(identifier)
+        return None if name is None else cls._get_addrs().get(name)
+
+    @classmethod
+    async def get(cls, name: str) -> ScAddr:
+        """Get keynode by attribute name, resolve it with ScKeynodes if it isn't loaded"""
+        addr = cls._get_addrs().get(name)
+        if addr is not None:
+            return addr
+        keynode = cls._keynodes.get(name)
+        if keynode is None:
+            raise AttributeError(f"{cls.__name__} has no keynode {name}")
+        return await ScKeynodes.resolve(keynode.idtf, keynode.sc_type)
+
+    @classmethod
+    async def load(cls) -> None:
+        """Resolve keynodes of the namespace with one request"""
+        await ScKeynodesNamespace._load_namespaces(cls)
+
+    @staticmethod
+    async def load_all(reload: bool = False) -> None:
+        """Resolve keynodes of all declared namespaces with one request"""
+        namespaces = [
+            namespace
+            for namespace in ScKeynodesNamespace._namespaces
+            if reload or not namespace.is_loaded()
+        ]
+        await ScKeynodesNamespace._load_namespaces(*namespaces)
+
+    @classmethod
+    def _get_addrs(cls) -> Dict[str, ScAddr]:
+        return ScKeynodes.cache().namespaces.get(cls, {})
+
+    @staticmethod
+    async def _load_namespaces(*namespaces: Type["ScKeynodesNamespace"]) -> None:
+        identifiers: Dict[Idtf, Optional[ScType]] = {}
+        for namespace in namespaces:
+            for keynode in namespace._keynodes.values():
+                if identifiers.get(keynode.idtf) is None:
+                    identifiers[keynode.idtf] = keynode.sc_type
+        if not identifiers:
+            return
+        addrs = await ScKeynodes.resolve_many(identifiers)
+        invalid = [idtf for idtf, addr in addrs.items() if not addr.is_valid()]
+        if invalid:
+            ScKeynodesNamespace._logger.error(
+                "Failed to load keynodes: %s", ", ".join(map(repr, invalid))
+            )
+            raise InvalidValueError(f"ScAddrs of {', '.join(invalid)} are invalid")
+        cache = ScKeynodes.cache()
+        for namespace in namespaces:
+            cache.namespaces[namespace] = {
+                name: addrs[keynode.idtf] for name, keynode in namespace._keynodes.items()
+            }
+        ScKeynodesNamespace._logger.debug(
+            "Loaded %s", ", ".join(namespace.__name__ for namespace in namespaces)
+        )
@@ -0,0 +1,104 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import json
+import os
+import tempfile
+from logging import Logger, getLogger
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from sc_async_client import client
+from sc_async_client.models import ScAddr, ScIdtfResolveParams
+
+from sc_async_kpm.identifiers import CommonIdentifiers
+from sc_async_kpm.sc_keynodes import Idtf, ScKeynodes
+from sc_async_kpm.tracing import traced_call
+
+
+class ScKeynodesSnapshot:
+    """
+    On-disk snapshot of the ScKeynodes cache for warm process restarts.
+
+    Snapshot is keyed by the server url and the KB fingerprint,
+    so keynodes of another KB instance are never loaded.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self._path = Path(path)
+        self._fingerprint: Optional[int] = None
+        self._loaded: Dict[Idtf, ScAddr] = {}
+        self._logger: Logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({repr(str(self._path))})"
+
+    async def load(self, url: str) -> int:
+        """Fill ScKeynodes cache from the snapshot and return count of loaded keynodes"""
+        self._fingerprint = await self._get_fingerprint()
+        self._loaded = {}
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            self._logger.info("Snapshot %s doesn't exist yet", repr(str(self._path)))
+            return 0
+        except (OSError, ValueError) as error:
+            self._logger.warning("Failed to read snapshot %s: %s", repr(str(self._path)), error)
+            return 0
+        if data.get("url") != url or data.get("fingerprint") != self._fingerprint:
+            self._logger.info("Snapshot %s belongs to another KB, skipped", repr(str(self._path)))
+            return 0
+        self._loaded = {idtf: ScAddr(value) for idtf, value in data.get("keynodes", {}).items()}
+        ScKeynodes.warm_up(self._loaded)
+        self._logger.info("Loaded %d keynodes from snapshot", len(self._loaded))
+        return len(self._loaded)
+
+    async def revalidate(self) -> Dict[Idtf, ScAddr]:
+        """Check keynodes loaded from the snapshot with one request and return changed ones"""
+        if not self._loaded:
+            return {}
+        changed = await ScKeynodes.revalidate(*self._loaded)
+        if changed:
+            self._logger.warning(
+                "Snapshot keynodes are outdated: %s", ", ".join(map(repr, changed))
+            )
+        self._loaded = {}
+        return changed
+
+    def save(self, url: str) -> None:
+        """Atomically rewrite the snapshot with the current ScKeynodes cache"""
+        if self._fingerprint is None:
+            self._logger.warning("Snapshot wasn't loaded, nothing to save")
+            return
+        data = {
+            "url": url,
+            "fingerprint": self._fingerprint,
+            "keynodes": {idtf: addr.value for idtf, addr in ScKeynodes.snapshot().items()},
+        }
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self._path.parent, prefix=f".{self._path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._logger.info("Saved %d keynodes to snapshot", len(data["keynodes"]))
+
+    async def _get_fingerprint(self) -> int:
+        return await get_kb_fingerprint()
+
+
+async def get_kb_fingerprint() -> int:
+    """Get value identifying the KB instance: addr of a keynode existing in every KB"""
+    params = ScIdtfResolveParams(idtf=CommonIdentifiers.NREL_SYSTEM_IDENTIFIER, type=None)
+    addrs = await traced_call(client.resolve_keynodes, params)
+    return addrs[0].value
@@ -0,0 +1,169 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import asyncio
+import sys
+import threading
+import traceback
+from collections import deque
+from logging import Logger, getLogger
+from types import FrameType
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+from sc_async_kpm.metrics import Histogram
+from sc_async_kpm.sc_agent import ScAgentAbstract
+
+
+class ScLoopStall(NamedTuple):
+    """Wake up of the event loop delayed more than the threshold"""
+
+    lag: float
+    agent: Optional[str]  # Logger name of the agent found in the blocking stack
+    task: Optional[str]
+    stack: Optional[str]  # Stack of the event loop thread while it was blocked
+
+
+class ScLoopMonitor:
+    """
+    Samples lag of the event loop: delay between scheduled and actual wake up of a sleeping task.
+    With threshold a watchdog thread captures the stack of the blocked event loop thread,
+    so a callback blocking the loop is named by the logger of its agent.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        threshold: Optional[float] = 0.1,
+        max_stalls: int = 100,
+    ) -> None:
+        """Without threshold only the histogram of lag is kept"""
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        if threshold is not None and threshold <= 0:
+            raise ValueError("Threshold must be positive")
+        if max_stalls < 1:
+            raise ValueError("Count of kept stalls must be positive")
+        self._interval = interval
+        self._threshold = threshold
+        self._lag = Histogram()
+        self._stalls: Deque[ScLoopStall] = deque(maxlen=max_stalls)
+        self._stall_counts: Dict[str, int] = {}
+        self._sampler: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: int = 0
+        self._deadline: float = 0  # Scheduled wake up of the sampler by the clock of the loop
+        self._captured: Optional[ScLoopStall] = None
+        self._logger: Logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(interval={self._interval}, threshold={self._threshold})"
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self._sampler is not None
+
+    async def start(self) -> None:
+        if self._sampler is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._deadline = self._loop.time() + self._interval
+        self._sampler = asyncio.create_task(self._sample())
+        if self._threshold is not None:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(
+                target=self._watch, name="sc-loop-monitor", daemon=True
+            )
+            self._watchdog.start()
+        self._logger.info("Started %s", repr(self))
+
+    async def stop(self) -> None:
+        sampler, self._sampler = self._sampler, None
+        if sampler is None:
+            return
+        sampler.cancel()
+        await asyncio.wait({sampler})
+        watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            self._stopped.set()
+            watchdog.join()
+        self._logger.info("Stopped %s", repr(self))
+
+    def stalls(self) -> List[ScLoopStall]:
+        """Get the last stalls from the oldest one"""
+        return list(self._stalls)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get histogram of lag in seconds, its 99th percentile and count of stalls by agent"""
+        return {
+            "lag": self._lag.snapshot(),
+            "p99": self._lag.quantile(0.99),
+            "stalls": dict(self._stall_counts),
+        }
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._deadline = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            lag = max(loop.time() - self._deadline, 0)
+            self._lag.observe(lag)
+            captured, self._captured = self._captured, None
+            if self._threshold is not None and lag >= self._threshold:
+                self._report(lag, captured)
+
+    def _report(self, lag: float, captured: Optional[ScLoopStall]) -> None:
+        stall = ScLoopStall(lag, None, None, None)
+        if captured is not None:
+            stall = captured._replace(lag=lag)
+        self._stalls.append(stall)
+        agent = stall.agent or "unknown"
+        self._stall_counts[agent] = self._stall_counts.get(agent, 0) + 1
+        if stall.stack is None:
+            self._logger.warning("Event loop was blocked for %.3f seconds", lag)
+            return
+        self._logger.warning(
+            "Event loop was blocked for %.3f seconds by %s in %s:\n%s",
+            lag,
+            stall.agent or "unknown code",
+            stall.task,
+            stall.stack,
+        )
+
+    def _watch(self) -> None:
+        # Started only with threshold after the loop is set
+        threshold, loop = self._threshold, self._loop
+        if threshold is None or loop is None:
+            return
+        # Checks are twice as frequent as the threshold to catch the loop while it's blocked
+        while not self._stopped.wait(threshold / 2):
+            deadline = self._deadline
+            if self._captured is not None or loop.time() - deadline < threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)  # pylint: disable=protected-access
+            if frame is None or self._deadline != deadline:
+                continue
+            task = asyncio.current_task(loop)
+            self._captured = ScLoopStall(
+                0,
+                _find_agent(frame),
+                None if task is None else task.get_name(),
+                "".join(traceback.format_stack(frame)),
+            )
+
+
+def _find_agent(frame: Optional[FrameType]) -> Optional[str]:
+    """Get logger name of the innermost agent whose method is in the stack"""
+    while frame is not None:
+        owner = frame.f_locals.get("self")
+        if isinstance(owner, ScAgentAbstract):
+            return owner.logger.name
+        frame = frame.f_back
+    return None
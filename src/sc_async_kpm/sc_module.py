@@ -6,9 +6,19 @@ Distributed under the MIT License
 
 from abc import ABC, abstractmethod
 from logging import getLogger
-from typing import Set
+from typing import Dict, FrozenSet, Optional, Set
 
-from sc_async_kpm.sc_agent import ScAgentAbstract
+from sc_async_kpm.sc_agent import (
+    ScAgentAbstract,
+    ScRegistrationError,
+    drain_agents,
+    forget_agents,
+    register_agents,
+    resubscribe_agents,
+    unregister_agents,
+)
+from sc_async_kpm.sc_dispatcher import ScDispatcher
+from sc_async_kpm.sc_subscription_hub import ScSubscriptionHub
 
 
 class ScModuleAbstract(ABC):
@@ -37,17 +47,50 @@ class ScModuleAbstract(ABC):
     async def _unregister(self) -> None:
         """Unregister all agents from the module"""
 
+    async def _drain(self, timeout: Optional[float]) -> Dict[str, float]:
+        """Stop dispatching new events to agents and wait for callbacks being handled"""
+        return {}
+
+    async def _resubscribe(self) -> None:
+        """Create subscriptions of registered agents again after reconnection"""
+
+    async def _forget(self) -> None:
+        """Mark agents unregistered without requests after the server has got another KB"""
+
 
 class ScModule(ScModuleAbstract):
-    def __init__(self, *agents: ScAgentAbstract) -> None:
+    def __init__(
+        self,
+        *agents: ScAgentAbstract,
+        dispatcher: Optional[ScDispatcher] = None,
+        subscription_hub: Optional[ScSubscriptionHub] = None,
+    ) -> None:
+        """Dispatcher and subscription hub are shared by agents that don't have their own ones"""
         self._agents: Set[ScAgentAbstract] = {*agents}
         self._is_registered: bool = False
+        self._dispatcher = dispatcher
+        self._subscription_hub = subscription_hub
         self.logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
+        for agent in self._agents:
+            self._share(agent)
 
     def __repr__(self) -> str:
-        return f"{self.__class__.__name__}({', '.join(map(repr, self._agents))})"
+        return f"{self.__class__.__name__}({', '.join(sorted(map(repr, self._agents)))})"
+
+    @property
+    def agents(self) -> FrozenSet[ScAgentAbstract]:
+        return frozenset(self._agents)
+
+    @property
+    def dispatcher(self) -> Optional[ScDispatcher]:
+        return self._dispatcher
+
+    @property
+    def subscription_hub(self) -> Optional[ScSubscriptionHub]:
+        return self._subscription_hub
 
     async def add_agent(self, agent: ScAgentAbstract) -> None:
+        self._share(agent)
         if self._is_registered:
             await agent._register()
         self._agents.add(agent)
@@ -56,6 +99,16 @@ class ScModule(ScModuleAbstract):
         if self._is_registered:
             await agent._unregister()
         self._agents.remove(agent)
+        if self._dispatcher is not None and agent.dispatcher is self._dispatcher:
+            agent.set_dispatcher(None)
+        if self._subscription_hub is not None and agent.subscription_hub is self._subscription_hub:
+            agent.set_subscription_hub(None)
+
+    def _share(self, agent: ScAgentAbstract) -> None:
+        if self._dispatcher is not None and agent.dispatcher is None:
+            agent.set_dispatcher(self._dispatcher)
+        if self._subscription_hub is not None and agent.subscription_hub is None:
+            agent.set_subscription_hub(self._subscription_hub)
 
     async def _register(self) -> None:
         if self._is_registered:
@@ -63,13 +116,25 @@ class ScModule(ScModuleAbstract):
             return
         if not self._agents:
             self.logger.warning("No agents to register")
-        for agent in self._agents:
-            await agent._register()
+        failures = await register_agents(*self._agents)
         self._is_registered = True
+        if failures:
+            raise ScRegistrationError(failures)
         self.logger.info("Registered")
 
     async def _unregister(self) -> None:
-        for agent in self._agents:
-            await agent._unregister()
+        failures = await unregister_agents(*self._agents)
         self._is_registered = False
+        if failures:
+            raise ScRegistrationError(failures)
         self.logger.info("Unregistered")
+
+    async def _drain(self, timeout: Optional[float]) -> Dict[str, float]:
+        return await drain_agents(*self._agents, timeout=timeout)
+
+    async def _resubscribe(self) -> None:
+        await resubscribe_agents(*self._agents)
+
+    async def _forget(self) -> None:
+        await forget_agents(*self._agents)
+        self._is_registered = False
@@ -7,15 +7,35 @@ Distributed under the MIT License
 from __future__ import annotations
 
 import asyncio
+import functools
+import os
+import random
 import signal
+import time
 from abc import ABC, abstractmethod
 from logging import Logger, getLogger
-from typing import Callable, Awaitable
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any, Callable, Awaitable, Dict, FrozenSet, Iterable, List, Optional, Union
 
 from sc_async_client import client
+from sc_async_client.models import ScAddr
 
 from sc_async_kpm.identifiers import _IdentifiersResolver
-from sc_async_kpm.sc_module import ScModuleAbstract
+from sc_async_kpm.sc_action_index import ScActionClassIndex
+from sc_async_kpm.sc_agent import ScRegistrationError
+from sc_async_kpm.sc_http import ScHttpEndpoint
+from sc_async_kpm.sc_keynodes import Idtf, ScKeynodes
+from sc_async_kpm.sc_keynodes_snapshot import ScKeynodesSnapshot, get_kb_fingerprint
+from sc_async_kpm.sc_loop_monitor import ScLoopMonitor
+from sc_async_kpm.sc_module import ScModule, ScModuleAbstract
+from sc_async_kpm.sc_startup import ScStartupProfile, in_startup_phase, startup_phase
+from sc_async_kpm.sc_supervisor import ScSupervisor
+from sc_async_kpm.tracing import traced_call
+
+
+class ScKbChangedError(RuntimeError):
+    """Server has got another KB on reconnection, addresses kept by agents are stale"""
 
 
 class ScServerAbstract(ABC):
@@ -68,23 +88,143 @@ class ScServerAbstract(ABC):
 
 
 class ScServer(ScServerAbstract):
-    def __init__(self, sc_server_url: str) -> None:
+    connection_check_interval: float = 1.0  # Seconds between checks of the connection to reconnect
+    # sc_async_client has one connection per process, so servers can't connect to different urls
+    _connected_url: Optional[str] = None
+    _keynodes_url: Optional[str] = None  # Url of the KB whose keynodes are cached
+
+    def __init__(
+        self,
+        sc_server_url: str,
+        keynodes_snapshot_path: Optional[Union[str, Path]] = None,
+        keynodes_invalidation: bool = False,
+        drain: bool = False,
+        drain_timeout: Optional[float] = 30.0,
+        reconnect: bool = False,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+        loop_monitor: Optional[ScLoopMonitor] = None,
+        on_failure: Optional[Callable[[BaseException], None]] = None,
+    ) -> None:
+        """
+        With drain stop waits drain_timeout seconds for running callbacks, None waits for all.
+        With reconnect the lost connection is restored with jittered exponential backoff
+        from reconnect_delay to max_reconnect_delay seconds and subscriptions are created again.
+        If the server has got another KB, on_failure is called with ScKbChangedError.
+        Loop monitor samples lag of the event loop while the server is connected.
+        """
         self._url: str = sc_server_url
         self._modules: set[ScModuleAbstract] = set()
+        self._keynodes_snapshot: Optional[ScKeynodesSnapshot] = (
+            ScKeynodesSnapshot(keynodes_snapshot_path) if keynodes_snapshot_path else None
+        )
+        self._revalidation_task: Optional[asyncio.Task] = None
+        self._keynodes_invalidation = keynodes_invalidation
+        self._drain = drain
+        self._drain_timeout = drain_timeout
+        self._reconnect = reconnect
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._watchdog: Optional[asyncio.Task] = None
+        self._on_failure = on_failure
+        self._failure: Optional[BaseException] = None
+        self._fingerprint: Optional[int] = None
+        self._reconnects: int = 0
+        self._seconds_without_subscriptions: float = 0
+        self._lost_at: Optional[float] = None
+        self.loop_monitor = loop_monitor
+        self.startup_profile: Optional[ScStartupProfile] = None
+        self._is_draining = False
         self.is_registered = False
+        self.supervisor: Optional[ScSupervisor] = None
         self.logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({', '.join(map(repr, self._modules))})"
 
+    @property
+    def modules(self) -> FrozenSet[ScModuleAbstract]:
+        return frozenset(self._modules)
+
+    @property
+    def failure(self) -> Optional[BaseException]:
+        """Error which stopped the reconnection watchdog, e.g. ScKbChangedError"""
+        return self._failure
+
+    @property
+    def is_ready(self) -> bool:
+        """Check agents are registered and accept events"""
+        return client.is_connected() and self.is_registered and not self._is_draining
+
+    def health(self) -> Dict[str, Any]:
+        """Get state of the server and count of agents of each module"""
+        return {
+            "connected": client.is_connected(),
+            "registered": self.is_registered,
+            "ready": self.is_ready,
+            "modules": {
+                repr(module): len(module.agents) if isinstance(module, ScModule) else None
+                for module in self._modules
+            },
+        }
+
     async def connect(self) -> _Finisher:
-        await client.connect(self._url)
+        """Connect to server, the startup is profiled from here to registration of modules"""
+        connected_url = ScServer._connected_url
+        if connected_url not in (None, self._url) and client.is_connected():
+            raise RuntimeError(
+                f"Client is connected to {repr(connected_url)}, "
+                f"disconnect it before connecting to {repr(self._url)}"
+            )
+        if ScServer._keynodes_url not in (None, self._url):
+            # Only keynodes of one KB are cached
+            ScKeynodes.cache().clear()
+        ScServer._keynodes_url = self._url
+        if self.loop_monitor is not None:
+            await self.loop_monitor.start()
+        profile = self.startup_profile
+        if not self.is_registered and (profile is None or not profile.is_recording):
+            self.startup_profile = ScStartupProfile()
+            self.startup_profile.begin()
+        with startup_phase("connect"):
+            await traced_call(client.connect, self._url)
+        ScServer._connected_url = self._url
         self.logger.info("Connected by url: %s", repr(self._url))
-        await _IdentifiersResolver.resolve()
+        if self._keynodes_snapshot is not None:
+            with startup_phase("load keynodes snapshot"):
+                await self._keynodes_snapshot.load(self._url)
+        with startup_phase("resolve identifiers"):
+            await _IdentifiersResolver.resolve()
+        if self._keynodes_invalidation:
+            with startup_phase("enable keynodes invalidation"):
+                await ScKeynodes.enable_invalidation()
+        if self._keynodes_snapshot is not None:
+            self._revalidation_task = asyncio.create_task(self._keynodes_snapshot.revalidate())
+        if self._reconnect:
+            with startup_phase("get KB fingerprint"):
+                self._fingerprint = await get_kb_fingerprint()
+            self._failure = None
+            self._watchdog = asyncio.create_task(self._watch_connection())
         return _Finisher(self.disconnect, self.logger)
 
     async def disconnect(self) -> None:
-        await client.disconnect()
+        watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            watchdog.cancel()
+            await asyncio.wait({watchdog})
+        if self._keynodes_snapshot is not None:
+            await self._finish_revalidation()
+            self._keynodes_snapshot.save(self._url)
+        if self._keynodes_invalidation:
+            await ScKeynodes.disable_invalidation()
+        if self.startup_profile is not None:
+            # Modules weren't registered since connection
+            self.startup_profile.finish()
+        await traced_call(client.disconnect)
+        if ScServer._connected_url == self._url:
+            ScServer._connected_url = None
+        if self.loop_monitor is not None:
+            await self.loop_monitor.stop()
         self.logger.info("Disconnected from url: %s", repr(self._url))
 
     async def add_modules(self, *modules: ScModuleAbstract) -> None:
@@ -109,9 +249,12 @@ class ScServer(ScServerAbstract):
         if self.is_registered:
             self.logger.warning("Modules are already registered")
         else:
-            await self._register(*self._modules)
+            with startup_phase("register modules"):
+                await self._register(*self._modules)
             self.is_registered = True
+            self._is_draining = False
             self.logger.info("Registered modules successfully")
+            self._finish_startup_profile()
         return _Finisher(self.unregister_modules, self.logger)
 
     async def unregister_modules(self) -> None:
@@ -127,10 +270,141 @@ class ScServer(ScServerAbstract):
         await self.register_modules()
         return _Finisher(self.stop, self.logger)
 
+    def _finish_startup_profile(self) -> None:
+        profile = self.startup_profile
+        if profile is None or not profile.is_recording:
+            return
+        profile.finish()
+        self.logger.info("Startup profile:\n%s", profile.format())
+
     async def stop(self) -> None:
+        if self._drain and self.is_registered:
+            await self.drain(self._drain_timeout)
         await self.unregister_modules()
         await self.disconnect()
 
+    async def drain(self, timeout: Optional[float] = None) -> Dict[str, float]:
+        """
+        Stop dispatching new events to agents of all modules, wait for callbacks being handled
+        and cancel ones left after timeout seconds. Return statistics of the drain.
+        """
+        self._is_draining = True
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                module._drain(timeout)  # pylint: disable=protected-access
+                for module in self._modules
+            )
+        )
+        stats: Dict[str, float] = {"finished": 0, "cancelled": 0, "rejected": 0}
+        for result in results:
+            for key, value in result.items():
+                if key in stats:
+                    stats[key] += value
+        stats["seconds"] = time.perf_counter() - start
+        log = self.logger.warning if stats["cancelled"] else self.logger.info
+        log(
+            "Drained in %.3f seconds: %d callbacks finished, %d cancelled, %d events rejected",
+            stats["seconds"],
+            stats["finished"],
+            stats["cancelled"],
+            stats["rejected"],
+        )
+        return stats
+
+    def connection_stats(self) -> Dict[str, Any]:
+        """Get count of reconnections and total seconds spent without subscriptions"""
+        seconds = self._seconds_without_subscriptions
+        if self._lost_at is not None:
+            seconds += time.monotonic() - self._lost_at
+        return {
+            "connected": client.is_connected(),
+            "reconnects": self._reconnects,
+            "seconds_without_subscriptions": seconds,
+        }
+
+    async def _watch_connection(self) -> None:
+        while True:
+            await asyncio.sleep(self.connection_check_interval)
+            if client.is_connected():
+                continue
+            self._lost_at = time.monotonic()
+            self.logger.warning("Connection to %s lost, reconnecting", repr(self._url))
+            try:
+                await self._recover()
+            except ScKbChangedError as error:
+                self.logger.error("%s, agents must be created again", error)
+                await self._forget_kb()
+                await traced_call(client.disconnect)
+                self._fail(error)
+                return
+            seconds = time.monotonic() - self._lost_at
+            self._seconds_without_subscriptions += seconds
+            self._lost_at = None
+            self._reconnects += 1
+            self.logger.info("Reconnected to %s in %.3f seconds", repr(self._url), seconds)
+
+    async def _forget_kb(self) -> None:
+        """Drop state keeping addresses of the old KB, its subscriptions were lost already"""
+        ScKeynodes.cache().clear()
+        ScActionClassIndex.forget()
+        await asyncio.gather(
+            *(module._forget() for module in self._modules)  # pylint: disable=protected-access
+        )
+        self.is_registered = False
+
+    def _fail(self, error: BaseException) -> None:
+        self._failure = error
+        if self._on_failure is None:
+            return
+        try:
+            self._on_failure(error)
+        except Exception as callback_error:  # pylint: disable=broad-exception-caught
+            self.logger.error("Failure callback raised %s", repr(callback_error))
+
+    async def _recover(self) -> None:
+        delay = self._reconnect_delay
+        while True:
+            try:
+                await traced_call(client.connect, self._url)
+                if client.is_connected():
+                    await self._restore()
+                    return
+            except ScKbChangedError:
+                raise
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self.logger.warning("Failed to reconnect to %s: %s", repr(self._url), repr(error))
+                if client.is_connected():
+                    # Subscriptions are restored from scratch with the next connection
+                    await traced_call(client.disconnect)
+            await asyncio.sleep(random.uniform(0, delay))
+            delay = min(delay * 2, self._max_reconnect_delay)
+
+    async def _restore(self) -> None:
+        """Create subscriptions lost with the connection if the server has the same KB"""
+        if await get_kb_fingerprint() != self._fingerprint:
+            # Agents, their hubs and the action class index keep addresses of the old KB
+            raise ScKbChangedError(f"Server {repr(self._url)} has another KB")
+        await ScKeynodes.resubscribe()
+        await ScKeynodes.revalidate()
+        if self.is_registered:
+            await ScActionClassIndex.resubscribe()
+            await asyncio.gather(
+                *(
+                    module._resubscribe()  # pylint: disable=protected-access
+                    for module in self._modules
+                )
+            )
+
+    async def _finish_revalidation(self) -> None:
+        task, self._revalidation_task = self._revalidation_task, None
+        if task is None:
+            return
+        try:
+            await task
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self.logger.error("Failed to revalidate keynodes snapshot: %s", repr(error))
+
     async def _register(self, *modules: ScModuleAbstract) -> None:
         if not client.is_connected():
             self.logger.error("Failed to register: connection lost")
@@ -141,7 +415,16 @@ class ScServer(ScServerAbstract):
                     "Failed to register: type of %s is not ScModule", repr(module)
                 )
                 raise TypeError(f"{repr(module)} is not ScModule")
-            await module._register()  # pylint: disable=protected-access
+        start = time.perf_counter()
+        failures = await self._gather_failures(modules, "_register")
+        if failures:
+            # Modules are registered all or nothing
+            await self._gather_failures(modules, "_unregister")
+            self.logger.error("Failed to register %d modules", len(modules))
+            raise ScRegistrationError(failures)
+        self.logger.info(
+            "Registered %d modules in %.3f seconds", len(modules), time.perf_counter() - start
+        )
 
     async def _unregister(self, *modules: ScModuleAbstract) -> None:
         if not client.is_connected():
@@ -149,10 +432,61 @@ class ScServer(ScServerAbstract):
                 "Failed to unregister: connection to %s lost", repr(self._url)
             )
             raise ConnectionError(f"Connection to {repr(self._url)} lost")
-        for module in modules:
-            await module._unregister()  # pylint: disable=protected-access
+        start = time.perf_counter()
+        failures = await self._gather_failures(modules, "_unregister")
+        if failures:
+            raise ScRegistrationError(failures)
+        self.logger.info(
+            "Unregistered %d modules in %.3f seconds", len(modules), time.perf_counter() - start
+        )
+
+    @staticmethod
+    async def _gather_failures(
+        modules: Iterable[ScModuleAbstract],
+        method: str,
+    ) -> Dict[Any, BaseException]:
+        """Call method of modules concurrently and collect errors of their agents or modules"""
+        modules = list(modules)
+        results = await asyncio.gather(
+            *(
+                in_startup_phase(f"{method.strip('_')} {repr(module)}", getattr(module, method)())
+                for module in modules
+            ),
+            return_exceptions=True,
+        )
+        failures: Dict[Any, BaseException] = {}
+        for module, result in zip(modules, results):
+            if isinstance(result, ScRegistrationError):
+                failures.update(result.failures)
+            elif isinstance(result, BaseException):
+                failures[module] = result
+        return failures
+
+    async def serve(
+        self,
+        workers: int = 1,
+        report_interval: float = 5.0,
+        http_port: Optional[int] = None,
+        http_host: str = "0.0.0.0",
+    ) -> None:
+        """
+        Wait for SIGINT or SIGTERM, raise ScKbChangedError if the server has got another KB
+        on reconnection.
+        With several workers the server must be disconnected: it resolves keynodes once and forks
+        worker processes, each of them connects and registers its shard of modules.
+        With http_port /health, /ready and /metrics are served while waiting,
+        the worker with index i listens on http_port + i.
+        """
+        if workers > 1:
+            await self._supervise(workers, report_interval, http_port, http_host)
+            return
+        if http_port is not None:
+            async with ScHttpEndpoint(self, http_host, http_port):
+                await self._wait_for_signal()
+            return
+        await self._wait_for_signal()
 
-    async def serve(self) -> None:
+    async def _wait_for_signal(self) -> None:
         loop = asyncio.get_running_loop()
         stop_event = asyncio.Event()
 
@@ -160,8 +494,104 @@ class ScServer(ScServerAbstract):
             self.logger.info("^C SIGINT was interrupted")
             stop_event.set()
 
+        def handle_sigterm():
+            self.logger.info("SIGTERM was received")
+            stop_event.set()
+
         loop.add_signal_handler(signal.SIGINT, handle_sigint)
-        await stop_event.wait()
+        loop.add_signal_handler(signal.SIGTERM, handle_sigterm)
+        stop_waiter = asyncio.create_task(stop_event.wait())
+        watchdog = self._watchdog
+        try:
+            await asyncio.wait(
+                {stop_waiter} if watchdog is None else {stop_waiter, watchdog},
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            stop_waiter.cancel()
+            loop.remove_signal_handler(signal.SIGINT)
+            loop.remove_signal_handler(signal.SIGTERM)
+        if self._failure is not None:
+            raise self._failure
+
+    def shard(self, index: int, count: int) -> List[ScModuleAbstract]:
+        """Get modules of the worker with the index, modules are split by their repr"""
+        return sorted(self._modules, key=repr)[index::count]
+
+    async def _supervise(
+        self,
+        workers: int,
+        report_interval: float,
+        http_port: Optional[int],
+        http_host: str,
+    ) -> None:
+        if self.is_registered or client.is_connected():
+            raise RuntimeError("Server must be disconnected to serve with several workers")
+        if not self._modules:
+            raise ValueError("No modules to serve")
+        if workers > len(self._modules):
+            self.logger.warning(
+                "Only %d modules for %d workers, extra workers aren't started",
+                len(self._modules),
+                workers,
+            )
+            workers = len(self._modules)
+        await self.connect()
+        try:
+            keynodes = ScKeynodes.snapshot()
+        finally:
+            await self.disconnect()
+        target = functools.partial(
+            self._run_worker, keynodes, report_interval, http_port, http_host
+        )
+        self.supervisor = ScSupervisor(target, workers, report_interval)
+        try:
+            await self.supervisor.run()
+        finally:
+            self.supervisor = None
+
+    def _run_worker(
+        self,
+        keynodes: Dict[Idtf, ScAddr],
+        report_interval: float,
+        http_port: Optional[int],
+        http_host: str,
+        index: int,
+        count: int,
+        reports: Connection,
+    ) -> None:
+        self._modules = set(self.shard(index, count))
+        if http_port is not None:
+            http_port += index
+        asyncio.run(self._serve_worker(keynodes, report_interval, reports, http_port, http_host))
+
+    async def _serve_worker(
+        self,
+        keynodes: Dict[Idtf, ScAddr],
+        report_interval: float,
+        reports: Connection,
+        http_port: Optional[int] = None,
+        http_host: str = "0.0.0.0",
+    ) -> None:
+        ScKeynodes.warm_up(keynodes)
+        async with await self.start():
+            reporter = asyncio.create_task(self._report(reports, report_interval))
+            try:
+                await self.serve(http_port=http_port, http_host=http_host)
+            finally:
+                reporter.cancel()
+
+    async def _report(self, reports: Connection, interval: float) -> None:
+        while True:
+            reports.send(
+                {
+                    "pid": os.getpid(),
+                    "modules": len(self._modules),
+                    "connected": client.is_connected(),
+                    "registered": self.is_registered,
+                }
+            )
+            await asyncio.sleep(interval)
 
 
 class _Finisher:
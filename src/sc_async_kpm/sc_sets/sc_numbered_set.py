@@ -1,11 +1,13 @@
-from typing import AsyncIterator, List
+from typing import AsyncIterator, Dict, List
 
 from sc_async_client.client import generate_by_template, search_by_template
 from sc_async_client.constants import sc_type
 from sc_async_client.models import ScAddr, ScTemplate
 
-from sc_async_kpm.sc_keynodes import ScKeynodes
+from sc_async_kpm.sc_keynodes import Idtf, ScKeynodes
 from sc_async_kpm.sc_sets.sc_set import ScSet
+from sc_async_kpm.tracing import traced_call
+from sc_async_kpm.utils.common_utils import get_elements_system_identifiers
 
 
 class ScNumberedSet(ScSet):
@@ -21,15 +23,19 @@ class ScNumberedSet(ScSet):
         if elements:
             template = ScTemplate()
             elements_list = await self.get_elements_list()
-            for index, element in enumerate(elements, len(elements_list) + 1):
+            first_index = len(elements_list) + 1
+            rrel_nodes = await ScKeynodes.prefetch_rrel(
+                first_index, first_index + len(elements) - 1
+            )
+            for element, rrel_node in zip(elements, rrel_nodes):
                 template.quintuple(
                     self._set_node,
                     sc_type.VAR_PERM_POS_ARC,
                     element,
                     sc_type.VAR_PERM_POS_ARC,
-                    await ScKeynodes.rrel_index(index),
+                    rrel_node,
                 )
-            await generate_by_template(template)
+            await traced_call(generate_by_template, template)
 
     async def __aiter__(self) -> AsyncIterator[ScAddr]:
         elements = await self.get_elements_set()
@@ -46,23 +52,43 @@ class ScNumberedSet(ScSet):
             sc_type.VAR_PERM_POS_ARC,
             sc_type.VAR_NODE_ROLE,
         )
-        results = await search_by_template(templ)
-        sorted_results = sorted(
-            (result for result in results), key=lambda res: res[4].value
+        results = await traced_call(search_by_template, templ)
+        if not results:
+            return []
+        # Reading doesn't generate rrel nodes, the found ones exist
+        await ScKeynodes.prefetch_rrel(
+            1, min(len(results), ScKeynodes.max_rrel_index), generate=False
         )
-        # Sort rrel elements addrs
+        ordinals: Dict[ScAddr, int] = {}
+        uncached: List[ScAddr] = []
+        for result in results:
+            ordinal = ScKeynodes.rrel_ordinal(result[4])
+            if ordinal is None:
+                uncached.append(result[4])
+            else:
+                ordinals[result[4]] = ordinal
+        if uncached:
+            # Nodes above max rrel index aren't cached, their indexes are got from identifiers
+            idtfs = await get_elements_system_identifiers(*uncached)
+            for addr, idtf in zip(uncached, idtfs):
+                ordinals[addr] = _parse_rrel_index(addr, idtf)
+        # Sort elements by indexes of their rrel nodes
+        sorted_results = sorted(results, key=lambda res: ordinals[res[4]])
         return [result[2] for result in sorted_results]
 
     async def get_by_index(self, i: int) -> ScAddr:
+        rrel_node = await ScKeynodes.rrel_index(i + 1, generate=False)
+        if not rrel_node.is_valid():
+            raise KeyError("No element by index")
         templ = ScTemplate()
         templ.quintuple(
             self._set_node,
             sc_type.VAR_PERM_POS_ARC,
             sc_type.UNKNOWN,
             sc_type.VAR_PERM_POS_ARC,
-            await ScKeynodes.rrel_index(i + 1),
+            rrel_node,
         )
-        results = await search_by_template(templ)
+        results = await traced_call(search_by_template, templ)
         if not results:
             raise KeyError("No element by index")
         return results[0][2]
@@ -73,3 +99,10 @@ class ScNumberedSet(ScSet):
         elements_new = [element async for element in self if element not in elements]
         await self.clear()
         await self.add(*elements_new)
+
+
+def _parse_rrel_index(addr: ScAddr, idtf: Idtf) -> int:
+    prefix, _, index = idtf.partition("_")
+    if prefix != "rrel" or not index.isdigit():
+        raise ValueError(f"Role relation {addr} of numbered set is not rrel_i node: {repr(idtf)}")
+    return int(index)
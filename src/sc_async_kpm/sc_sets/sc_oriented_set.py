@@ -8,9 +8,9 @@ from sc_async_client.client import (
 from sc_async_client.constants import sc_type
 from sc_async_client.models import ScAddr, ScTemplate, ScTemplateResult
 
-from sc_async_kpm.identifiers import CommonIdentifiers, ScAlias
-from sc_async_kpm.sc_keynodes import ScKeynodes
+from sc_async_kpm.identifiers import CommonKeynodes, ScAlias
 from sc_async_kpm.sc_sets.sc_set import ScSet
+from sc_async_kpm.tracing import traced_call
 from sc_async_kpm.utils.common_utils import (
     generate_connector,
     generate_role_relation,
@@ -45,7 +45,7 @@ class ScOrientedSet(ScSet):
     async def __aiter__(self) -> AsyncIterator[ScAddr]:
         """Iterate by ScOrientedSet elements"""
         start_template = await search_role_relation_template(
-            self._set_node, await ScKeynodes.get_by_idtf(CommonIdentifiers.RREL_ONE)
+            self._set_node, CommonKeynodes.RREL_ONE
         )
         if not start_template:
             return
@@ -77,7 +77,7 @@ class ScOrientedSet(ScSet):
         return await generate_role_relation(
             self._set_node,
             element,
-            await ScKeynodes.get_by_idtf(CommonIdentifiers.RREL_ONE),
+            CommonKeynodes.RREL_ONE,
         )
 
     async def _get_last_arc_and_erase_rrel_last(self) -> Optional[ScAddr]:
@@ -89,19 +89,18 @@ class ScOrientedSet(ScSet):
             sc_type.VAR_PERM_POS_ARC >> ScAlias.MEMBERSHIP_ARC,
             sc_type.UNKNOWN,
             sc_type.VAR_PERM_POS_ARC >> ScAlias.RELATION_ARC,
-            await ScKeynodes.get_by_idtf(CommonIdentifiers.RREL_LAST),
+            CommonKeynodes.RREL_LAST,
         )
-        last_elem_templates = await search_by_template(template)
+        last_elem_templates = await traced_call(search_by_template, template)
         if last_elem_templates:
             last_elem_template = last_elem_templates[0]
-            await erase_elements(
-                last_elem_template.get(ScAlias.RELATION_ARC)
-            )  # Erase arc between rrel_last and arc
+            # Erase arc between rrel_last and arc
+            await traced_call(erase_elements, last_elem_template.get(ScAlias.RELATION_ARC))
             return last_elem_template.get(ScAlias.MEMBERSHIP_ARC)
 
         # Search unmarked last arc
         next_elem_result = await search_role_relation_template(
-            self._set_node, await ScKeynodes.get_by_idtf(CommonIdentifiers.RREL_ONE)
+            self._set_node, CommonKeynodes.RREL_ONE
         )
         while True:
             next_arc = next_elem_result.get(  # type: ignore[reportOptionalMemberAccess]
@@ -124,16 +123,16 @@ class ScOrientedSet(ScSet):
             sc_type.VAR_COMMON_ARC,
             ScAlias.MEMBERSHIP_ARC,
             sc_type.VAR_PERM_POS_ARC,
-            await ScKeynodes.get_by_idtf(CommonIdentifiers.NREL_BASIC_SEQUENCE),
+            CommonKeynodes.NREL_BASIC_SEQUENCE,
         )
-        generate_result = await generate_by_template(template)
+        generate_result = await traced_call(generate_by_template, template)
         return generate_result.get(ScAlias.MEMBERSHIP_ARC)
 
     @staticmethod
     async def _mark_arc_with_rrel_last(last_arc: ScAddr) -> None:
         await generate_connector(
             sc_type.CONST_PERM_POS_ARC,
-            await ScKeynodes.get_by_idtf(CommonIdentifiers.RREL_LAST),
+            CommonKeynodes.RREL_LAST,
             last_arc,
         )
 
@@ -146,10 +145,10 @@ class ScOrientedSet(ScSet):
             sc_type.VAR_COMMON_ARC,
             sc_type.VAR_PERM_POS_ARC >> ScAlias.RELATION_ARC,
             sc_type.VAR_PERM_POS_ARC,
-            await ScKeynodes.get_by_idtf(CommonIdentifiers.NREL_BASIC_SEQUENCE),
+            CommonKeynodes.NREL_BASIC_SEQUENCE,
         )
         templ.triple(
             self._set_node, ScAlias.RELATION_ARC, sc_type.UNKNOWN >> ScAlias.ELEMENT
         )
-        search_results = await search_by_template(templ)
+        search_results = await traced_call(search_by_template, templ)
         return search_results[0] if search_results else None
@@ -6,6 +6,7 @@ from sc_async_client.client import erase_elements, generate_elements, search_by_
 from sc_async_client.constants import ScType, sc_type
 from sc_async_client.models import ScAddr, ScConstruction, ScTemplate, ScTemplateResult
 
+from sc_async_kpm.tracing import traced_call
 from sc_async_kpm.utils.common_utils import generate_node
 
 
@@ -62,7 +63,7 @@ class ScSet:
                 construction.generate_connector(
                     sc_type.CONST_PERM_POS_ARC, self._set_node, element
                 )
-            await generate_elements(construction)
+            await traced_call(generate_elements, construction)
 
     @property
     def set_node(self) -> ScAddr:
@@ -110,16 +111,16 @@ class ScSet:
         templ = ScTemplate()
         for element in elements:
             templ.triple(self._set_node, sc_type.VAR_PERM_POS_ARC, element)
-        template_results = await search_by_template(templ)
-        await erase_elements(*(res[1] for res in template_results))
+        template_results = await traced_call(search_by_template, templ)
+        await traced_call(erase_elements, *(res[1] for res in template_results))
 
     async def clear(self) -> None:
         """Erase the arcs between set_node and all elements"""
         template_results = await self._elements_search_results()
-        await erase_elements(*(res[1] for res in template_results))
+        await traced_call(erase_elements, *(res[1] for res in template_results))
 
     async def _elements_search_results(self) -> list[ScTemplateResult]:
         """Template search of all elements"""
         templ = ScTemplate()
         templ.triple(self._set_node, sc_type.VAR_PERM_POS_ARC, sc_type.UNKNOWN)
-        return await search_by_template(templ)
+        return await traced_call(search_by_template, templ)
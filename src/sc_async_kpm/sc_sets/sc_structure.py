@@ -4,6 +4,7 @@ from sc_async_client.constants.exceptions import InvalidTypeError
 from sc_async_client.models import ScAddr
 
 from sc_async_kpm.sc_sets.sc_set import ScSet
+from sc_async_kpm.tracing import traced_call
 from sc_async_kpm.utils.common_utils import generate_node
 
 from typing import Optional
@@ -36,7 +37,7 @@ class ScStructure(ScSet):
             set_node_type = sc_type.CONST_NODE_STRUCTURE
 
         if set_node is not None:
-            types = await get_elements_types(set_node)
+            types = await traced_call(get_elements_types, set_node)
             set_node_type = types[0]
         else:
             set_node = await generate_node(set_node_type)
@@ -0,0 +1,145 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Dict, Iterator, List, Optional, TypeVar
+
+from sc_async_kpm.import_time import get_import_times
+
+T = TypeVar("T")
+
+
+class ScStartupPhase:
+    """Timed part of the startup, round trips to the server include ones of nested phases"""
+
+    def __init__(self, name: str, parent: Optional["ScStartupPhase"] = None) -> None:
+        self.name = name
+        self.parent = parent
+        self.seconds: float = 0
+        self.round_trips: int = 0
+        self.phases: List[ScStartupPhase] = []
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({repr(self.name)}, seconds={self.seconds:.3f}, "
+            f"round_trips={self.round_trips})"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "round_trips": self.round_trips,
+            "phases": [phase.to_dict() for phase in self.phases],
+        }
+
+
+_current_phase: ContextVar[Optional[ScStartupPhase]] = ContextVar(
+    "sc_startup_phase", default=None
+)
+
+
+class ScStartupProfile:
+    """
+    Phases of the startup recorded between begin and finish with their duration and count of
+    round trips to the server, and import time of sc_async_kpm and sc_async_client.
+    Phases are recorded in the task that began the profile and tasks created by it.
+    """
+
+    def __init__(self) -> None:
+        self.imports: Dict[str, float] = get_import_times()
+        self._root = ScStartupPhase("startup")
+        self._token: Optional[Token] = None
+        self._start: float = 0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(seconds={self._root.seconds:.3f})"
+
+    @property
+    def is_recording(self) -> bool:
+        return self._token is not None
+
+    @property
+    def phases(self) -> List[ScStartupPhase]:
+        return list(self._root.phases)
+
+    def begin(self) -> None:
+        if self._token is not None:
+            return
+        self._token = _current_phase.set(self._root)
+        self._start = time.perf_counter()
+
+    def finish(self) -> None:
+        token, self._token = self._token, None
+        if token is None:
+            return
+        self._root.seconds = time.perf_counter() - self._start
+        try:
+            _current_phase.reset(token)
+        except ValueError:
+            # Finished in another context than began
+            _current_phase.set(None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seconds": self._root.seconds,
+            "round_trips": self._root.round_trips,
+            "imports": dict(self.imports),
+            "phases": [phase.to_dict() for phase in self._root.phases],
+        }
+
+    def format(self) -> str:
+        """Get the profile as indented lines of phases"""
+        imports = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.imports.items())
+        lines = [
+            f"Started in {self._root.seconds:.3f}s with {self._root.round_trips} round trips, "
+            f"imports: {imports or 'unknown'}"
+        ]
+
+        def add(phase: ScStartupPhase, depth: int) -> None:
+            lines.append(
+                f"{'  ' * depth}{phase.name}: {phase.seconds:.3f}s, {phase.round_trips} round trips"
+            )
+            for child in phase.phases:
+                add(child, depth + 1)
+
+        for phase in self._root.phases:
+            add(phase, 1)
+        return "\n".join(lines)
+
+
+@contextmanager
+def startup_phase(name: str) -> Iterator[Optional[ScStartupPhase]]:
+    """Record the block as a phase of the startup, nothing is recorded outside of it"""
+    parent = _current_phase.get()
+    if parent is None:
+        yield None
+        return
+    phase = ScStartupPhase(name, parent)
+    parent.phases.append(phase)
+    token = _current_phase.set(phase)
+    start = time.perf_counter()
+    try:
+        yield phase
+    finally:
+        phase.seconds = time.perf_counter() - start
+        _current_phase.reset(token)
+
+
+async def in_startup_phase(name: str, awaitable: Awaitable[T]) -> T:
+    """Await as a phase of the startup, for awaitables run concurrently by asyncio.gather"""
+    with startup_phase(name):
+        return await awaitable
+
+
+def count_round_trip() -> None:
+    """Count a request to the server in the current phase of the startup and its parents"""
+    phase = _current_phase.get()
+    while phase is not None:
+        phase.round_trips += 1
+        phase = phase.parent
@@ -0,0 +1,172 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import asyncio
+from logging import Logger, getLogger
+from typing import Dict, List, Set, Tuple
+
+from sc_async_client import client
+from sc_async_client.constants.common import ScEventType
+from sc_async_client.models import ScAddr, ScEventSubscription, ScEventSubscriptionParams
+
+from sc_async_kpm.sc_dispatcher import AgentCallback
+from sc_async_kpm.sc_result import ScResult
+from sc_async_kpm.tracing import traced_call
+
+_ChannelKey = Tuple[ScAddr, ScEventType]
+
+
+class _Channel:
+    """One server-side subscription and callbacks of agents listening to it"""
+
+    def __init__(self, subscription: "asyncio.Future[ScEventSubscription]") -> None:
+        self.subscription = subscription
+        self.listeners: List[AgentCallback] = []
+
+
+class ScSubscriptionHub:
+    """
+    Keeps one server-side subscription per distinct pair of sc-element and event type
+    and fans its events out to all agents listening to the pair.
+    The subscription is created for the first listener and destroyed after the last one.
+    """
+
+    def __init__(self) -> None:
+        self._channels: Dict[_ChannelKey, _Channel] = {}
+        self._orphans: Set[asyncio.Future] = set()
+        self._logger: Logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(subscriptions={len(self._channels)})"
+
+    def stats(self) -> Dict[str, int]:
+        """Get count of server-side subscriptions and count of agents listening to them"""
+        return {
+            "subscriptions": len(self._channels),
+            "listeners": sum(len(channel.listeners) for channel in self._channels.values()),
+        }
+
+    async def subscribe(
+        self, event_element: ScAddr, event_type: ScEventType, callback: AgentCallback
+    ) -> ScEventSubscription:
+        """Add listener of the pair and get the shared subscription"""
+        key = (event_element, event_type)
+        channel = self._channels.get(key)
+        if channel is None:
+            subscription = asyncio.ensure_future(self._create_subscription(key))
+            channel = self._channels[key] = _Channel(subscription)
+        channel.listeners.append(callback)
+        try:
+            return await asyncio.shield(channel.subscription)
+        except BaseException:
+            if self._remove_listener(key, channel, callback):
+                channel.subscription.add_done_callback(self._destroy_orphan)
+            raise
+
+    async def unsubscribe(
+        self, event_element: ScAddr, event_type: ScEventType, callback: AgentCallback
+    ) -> None:
+        """Remove listener of the pair, the subscription is destroyed after the last listener"""
+        key = (event_element, event_type)
+        channel = self._channels.get(key)
+        if channel is None or callback not in channel.listeners:
+            self._logger.warning("%s isn't subscribed to %s", repr(callback), repr(key))
+            return
+        if self._remove_listener(key, channel, callback):
+            await traced_call(
+                client.destroy_elementary_event_subscriptions, await channel.subscription
+            )
+            self._logger.debug("Destroyed shared subscription %s", repr(key))
+
+    async def resubscribe(self) -> None:
+        """Create shared subscriptions again with one request, old ones are lost on reconnection"""
+        # Subscriptions being created now are created with the new connection
+        channels = [
+            (key, channel)
+            for key, channel in self._channels.items()
+            if channel.subscription.done()
+            and not channel.subscription.cancelled()
+            and channel.subscription.exception() is None
+        ]
+        if not channels:
+            return
+        events = await traced_call(
+            client.create_elementary_event_subscriptions,
+            *(self._subscription_params(key) for key, _ in channels),
+        )
+        loop = asyncio.get_running_loop()
+        for (_, channel), event in zip(channels, events):
+            channel.subscription = loop.create_future()
+            channel.subscription.set_result(event)
+        self._logger.debug("Resubscribed %d shared subscriptions", len(channels))
+
+    def forget(self) -> None:
+        """Drop all subscriptions without destroying them, e.g. they were lost with the old KB"""
+        self._channels.clear()
+
+    async def _create_subscription(self, key: _ChannelKey) -> ScEventSubscription:
+        subscriptions = await traced_call(
+            client.create_elementary_event_subscriptions,
+            self._subscription_params(key),
+        )
+        self._logger.debug("Created shared subscription %s", repr(key))
+        return subscriptions[0]
+
+    def _subscription_params(self, key: _ChannelKey) -> ScEventSubscriptionParams:
+        event_element, event_type = key
+
+        async def fan_out(
+            element: ScAddr, event_connector: ScAddr, other_element: ScAddr
+        ) -> ScResult:
+            return await self._fan_out(key, element, event_connector, other_element)
+
+        return ScEventSubscriptionParams(event_element, event_type, fan_out)
+
+    async def _fan_out(
+        self, key: _ChannelKey, element: ScAddr, event_connector: ScAddr, other_element: ScAddr
+    ) -> ScResult:
+        channel = self._channels.get(key)
+        if channel is None:
+            return ScResult.SKIP
+        results = await asyncio.gather(
+            *(
+                listener(element, event_connector, other_element)
+                for listener in list(channel.listeners)
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                self._logger.error("Listener of %s raised %s", repr(key), repr(result))
+        if ScResult.OK in results:
+            return ScResult.OK
+        for result in results:
+            if isinstance(result, BaseException):
+                return ScResult.ERROR
+            if result != ScResult.SKIP:
+                return result
+        return ScResult.SKIP
+
+    def _destroy_orphan(self, subscription: "asyncio.Future[ScEventSubscription]") -> None:
+        """Destroy subscription created after its only listener was cancelled"""
+        if subscription.cancelled() or subscription.exception() is not None:
+            return
+        task = asyncio.ensure_future(
+            traced_call(client.destroy_elementary_event_subscriptions, subscription.result())
+        )
+        self._orphans.add(task)
+        task.add_done_callback(self._orphans.discard)
+
+    def _remove_listener(
+        self, key: _ChannelKey, channel: _Channel, callback: AgentCallback
+    ) -> bool:
+        """Remove listener and return True if it was the last one of the channel"""
+        if callback in channel.listeners:
+            channel.listeners.remove(callback)
+        if channel.listeners or self._channels.get(key) is not channel:
+            return False
+        del self._channels[key]
+        return True
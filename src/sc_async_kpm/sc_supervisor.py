@@ -0,0 +1,204 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import asyncio
+import multiprocessing
+import multiprocessing.process
+import signal
+import time
+from logging import Logger, getLogger
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional
+
+WorkerTarget = Callable[[int, int, Connection], None]
+"""Main function of a worker process: index of the worker, count of workers, pipe for reports"""
+
+
+class _Worker:
+    def __init__(
+        self, index: int, process: multiprocessing.process.BaseProcess, reports: Connection
+    ) -> None:
+        self.index = index
+        self.process = process
+        self.reports = reports
+        self.reported_at: Optional[float] = None
+        self.report: Dict[str, Any] = {}
+        self.is_stale = False
+
+
+class ScSupervisor:
+    """
+    Forks worker processes and watches them until all of them exit.
+    Workers send dict reports through the pipe, a worker without reports for
+    three report intervals is logged as stale. SIGINT and SIGTERM are forwarded to workers
+    as SIGTERM, workers that don't exit within shutdown_timeout are killed.
+    If a worker fails, the others are stopped too. Available on POSIX systems only.
+    """
+
+    def __init__(
+        self,
+        target: WorkerTarget,
+        workers: int,
+        report_interval: float = 5.0,
+        shutdown_timeout: float = 30.0,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("Count of workers must be positive")
+        self._target = target
+        self._count = workers
+        self._report_interval = report_interval
+        self._shutdown_timeout = shutdown_timeout
+        self._workers: List[_Worker] = []
+        self._is_stopping = False
+        self._failed: List[int] = []
+        self._exited: Optional[asyncio.Event] = None
+        self._kill_timer: Optional[asyncio.TimerHandle] = None
+        self._logger: Logger = getLogger(f"{self.__module__}.{self.__class__.__name__}")
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(workers={self._count})"
+
+    def health(self) -> Dict[int, Dict[str, Any]]:
+        """Get state and the last report of each worker"""
+        now = time.monotonic()
+        return {
+            worker.index: {
+                "pid": worker.process.pid,
+                "alive": worker.process.is_alive(),
+                "exitcode": worker.process.exitcode,
+                "stale": worker.is_stale,
+                "last_report": None if worker.reported_at is None else now - worker.reported_at,
+                "report": worker.report,
+            }
+            for worker in self._workers
+        }
+
+    async def run(self) -> None:
+        """Start workers and wait for their exit, raise ChildProcessError if any of them failed"""
+        loop = asyncio.get_running_loop()
+        self._exited = asyncio.Event()
+        context = multiprocessing.get_context("fork")
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self._on_signal, signum)
+        try:
+            for index in range(self._count):
+                reader, writer = context.Pipe(duplex=False)
+                process = context.Process(
+                    target=_run_worker,
+                    args=(self._target, index, self._count, writer),
+                    name=f"sc-worker-{index}",
+                )
+                process.start()
+                writer.close()
+                worker = _Worker(index, process, reader)
+                self._workers.append(worker)
+                loop.add_reader(reader.fileno(), self._on_report, worker)
+                loop.add_reader(process.sentinel, self._on_exit, worker)
+                self._logger.info("Started worker %d with pid %d", index, process.pid)
+            checker = asyncio.ensure_future(self._check_reports())
+            try:
+                await self._exited.wait()
+            finally:
+                checker.cancel()
+        finally:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(signum)
+            self.stop()
+            for worker in self._workers:
+                self._forget(worker)
+            if self._kill_timer is not None and not self._has_alive():
+                self._kill_timer.cancel()
+        if self._failed:
+            raise ChildProcessError(f"Workers {self._failed} failed")
+        self._logger.info("All workers exited")
+
+    def stop(self) -> None:
+        """Ask alive workers to finish with SIGTERM"""
+        if self._is_stopping:
+            return
+        self._is_stopping = True
+        alive = [worker for worker in self._workers if worker.process.is_alive()]
+        for worker in alive:
+            worker.process.terminate()
+        if alive:
+            self._logger.info("Stopping %d workers", len(alive))
+            self._kill_timer = asyncio.get_running_loop().call_later(
+                self._shutdown_timeout, self._kill
+            )
+
+    def _kill(self) -> None:
+        for worker in self._workers:
+            if worker.process.is_alive():
+                self._logger.error(
+                    "Worker %d didn't stop in %s seconds, killing it",
+                    worker.index,
+                    self._shutdown_timeout,
+                )
+                worker.process.kill()
+
+    def _on_signal(self, signum: int) -> None:
+        self._logger.info("Received %s, forwarding to workers", signal.Signals(signum).name)
+        self.stop()
+
+    def _on_report(self, worker: _Worker) -> None:
+        try:
+            worker.report = worker.reports.recv()
+        except (EOFError, OSError):
+            asyncio.get_running_loop().remove_reader(worker.reports.fileno())
+            return
+        if worker.reported_at is None:
+            self._logger.info("Worker %d is ready: %s", worker.index, worker.report)
+        worker.reported_at = time.monotonic()
+        worker.is_stale = False
+
+    def _on_exit(self, worker: _Worker) -> None:
+        self._forget(worker)
+        worker.process.join()
+        exitcode = worker.process.exitcode
+        if exitcode == 0 or self._is_stopping:
+            self._logger.info("Worker %d exited with code %s", worker.index, exitcode)
+        else:
+            self._logger.error("Worker %d failed with code %s", worker.index, exitcode)
+            self._failed.append(worker.index)
+            self.stop()
+        exited = self._exited  # Created by run before workers are started
+        if exited is not None and len(self._workers) == self._count and not self._has_alive():
+            exited.set()
+
+    def _has_alive(self) -> bool:
+        return any(worker.process.is_alive() for worker in self._workers)
+
+    def _forget(self, worker: _Worker) -> None:
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(worker.process.sentinel)
+        if not worker.reports.closed:
+            loop.remove_reader(worker.reports.fileno())
+            worker.reports.close()
+
+    async def _check_reports(self) -> None:
+        while True:
+            await asyncio.sleep(self._report_interval)
+            now = time.monotonic()
+            for worker in self._workers:
+                if worker.reported_at is None or not worker.process.is_alive():
+                    continue
+                silence = now - worker.reported_at
+                if silence > 3 * self._report_interval and not worker.is_stale:
+                    worker.is_stale = True
+                    self._logger.warning(
+                        "Worker %d hasn't reported for %.1f seconds", worker.index, silence
+                    )
+
+
+def _run_worker(target: WorkerTarget, index: int, count: int, reports: Connection) -> None:
+    # Signals must not wake up the event loop of the supervisor inherited by fork
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        target(index, count, reports)
+    finally:
+        reports.close()
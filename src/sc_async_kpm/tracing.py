@@ -0,0 +1,177 @@
+"""
+This source file is part of an OSTIS project. For the latest info, see https://github.com/ostis-ai
+Distributed under the MIT License
+(See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
+"""
+
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging import Logger, getLogger
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+from sc_async_kpm.sc_startup import count_round_trip
+
+T = TypeVar("T")
+
+
+class ScTraceCall(NamedTuple):
+    operation: str
+    items: int  # Count of arguments, sized arguments count their items
+    seconds: float
+
+
+class ScTraceSpan:
+    """Calls of sc_async_client made by one agent callback"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.started_at = time.time()
+        self.seconds: float = 0
+        self.calls: List[ScTraceCall] = []
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({repr(self.name)}, round_trips={len(self.calls)})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "round_trips": len(self.calls),
+            "client_seconds": sum(call.seconds for call in self.calls),
+            "calls": [call._asdict() for call in self.calls],
+        }
+
+
+class ScTracer:
+    """
+    Tracing of sc_async_client calls made by sc_async_kpm inside agent callbacks.
+    Each callback of an agent is a span, calls are recorded by traced_call.
+    The current span is kept in a context variable, so tasks created by a callback share its span.
+    """
+
+    _current_span: ContextVar[Optional[ScTraceSpan]] = ContextVar("sc_trace_span", default=None)
+    _spans: Deque[ScTraceSpan] = deque(maxlen=1000)
+    _max_round_trips: Optional[int] = None
+    _is_enabled: bool = False
+    _logger: Logger = getLogger(f"{__name__}.ScTracer")
+
+    def __init__(self) -> None:
+        raise TypeError(f"Use {self.__class__.__name__} without initialization")
+
+    @classmethod
+    def is_enabled(cls) -> bool:
+        return cls._is_enabled
+
+    @classmethod
+    def enable(cls, max_round_trips: Optional[int] = None, max_spans: int = 1000) -> None:
+        """
+        Start tracing, keep last max_spans finished spans.
+        Warn about callbacks making more than max_round_trips calls.
+        """
+        if max_spans < 1:
+            raise ValueError("Count of kept spans must be positive")
+        cls._max_round_trips = max_round_trips
+        cls._spans = deque(cls._spans, maxlen=max_spans)
+        if cls._is_enabled:
+            return
+        cls._is_enabled = True
+        cls._logger.info("Enabled tracing of client functions")
+
+    @classmethod
+    def disable(cls) -> None:
+        """Stop tracing, finished spans are kept"""
+        if not cls._is_enabled:
+            return
+        cls._is_enabled = False
+        cls._logger.info("Disabled tracing")
+
+    @classmethod
+    @contextmanager
+    def span(cls, name: str) -> Iterator[Optional[ScTraceSpan]]:
+        """Record client calls made inside the block, nothing is recorded if tracing is disabled"""
+        if not cls._is_enabled:
+            yield None
+            return
+        span = ScTraceSpan(name)
+        token = cls._current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - start
+            cls._current_span.reset(token)
+            cls._spans.append(span)
+            if cls._max_round_trips is not None and len(span.calls) > cls._max_round_trips:
+                cls._logger.warning(
+                    "%s made %d round trips to the server, more than %d",
+                    name,
+                    len(span.calls),
+                    cls._max_round_trips,
+                )
+
+    @classmethod
+    def current_span(cls) -> Optional[ScTraceSpan]:
+        return cls._current_span.get()
+
+    @classmethod
+    def spans(cls) -> List[ScTraceSpan]:
+        """Get finished spans from the oldest one"""
+        return list(cls._spans)
+
+    @classmethod
+    def dump(cls, file: Union[str, Path, IO[str]], clear: bool = True) -> int:
+        """Write finished spans as JSON lines and return their count"""
+        spans = list(cls._spans)
+        if clear:
+            cls._spans.clear()
+        lines = "".join(json.dumps(span.to_dict()) + "\n" for span in spans)
+        if isinstance(file, (str, Path)):
+            with open(file, "a", encoding="utf-8") as output:
+                output.write(lines)
+        else:
+            file.write(lines)
+        return len(spans)
+
+
+async def traced_call(func: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+    """Call function of sc_async_client, record the call in the current span and startup phase"""
+    count_round_trip()
+    span = ScTracer.current_span()
+    if span is None:
+        return await func(*args, **kwargs)
+    start = time.perf_counter()
+    try:
+        return await func(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        operation = getattr(func, "__name__", repr(func))
+        span.calls.append(ScTraceCall(operation, _count_items(args), seconds))
+
+
+def _count_items(args: tuple) -> int:
+    """Count of arguments, sized arguments count their items"""
+    size = 0
+    for arg in args:
+        if isinstance(arg, (list, tuple, set, dict)):
+            size += len(arg)
+        else:
+            size += 1
+    return size
@@ -18,6 +18,7 @@ from sc_async_kpm.utils.common_utils import (  # noqa: F401
     generate_non_role_relation,
     generate_role_relation,
     get_element_system_identifier,
+    get_elements_system_identifiers,
     get_link_content_data,
     search_connector,
     search_connectors,
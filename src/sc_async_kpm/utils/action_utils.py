@@ -21,10 +21,11 @@ from sc_async_client.models import (
     ScTemplate,
 )
 
-from sc_async_kpm.identifiers import ActionStatus, CommonIdentifiers, ScAlias
+from sc_async_kpm.identifiers import ActionStatus, CommonKeynodes, ScAlias
 from sc_async_kpm.sc_keynodes import Idtf, ScKeynodes
 from sc_async_kpm.sc_result import ScResult
 from sc_async_kpm.sc_sets.sc_structure import ScStructure
+from sc_async_kpm.tracing import traced_call
 from sc_async_kpm.utils.common_utils import (
     check_connector,
     generate_connector,
@@ -37,29 +38,30 @@ from sc_async_kpm.utils.common_utils import (
 COMMON_WAIT_TIME: float = 5
 
 
+async def _get_keynode(identifier: Idtf) -> ScAddr:
+    """Get loaded common keynode without a request, search other identifiers with ScKeynodes"""
+    addr = CommonKeynodes.find(identifier)
+    if addr is None:
+        return await ScKeynodes.get_by_idtf(identifier)
+    return addr
+
+
 async def check_action_class(
     action_class: Union[ScAddr, Idtf], action_node: ScAddr
 ) -> bool:
-    action_class = (
-        await ScKeynodes.get_by_idtf(action_class)
-        if isinstance(action_class, Idtf)
-        else action_class
-    )
+    if isinstance(action_class, Idtf):
+        action_class = await _get_keynode(action_class)
     templ = ScTemplate()
     templ.triple(action_class, sc_type.VAR_PERM_POS_ARC, action_node)
-    templ.triple(
-        await ScKeynodes.get_by_idtf(CommonIdentifiers.ACTION),
-        sc_type.VAR_PERM_POS_ARC,
-        action_node,
-    )
-    search_results = await client.search_by_template(templ)
+    templ.triple(CommonKeynodes.ACTION, sc_type.VAR_PERM_POS_ARC, action_node)
+    search_results = await traced_call(client.search_by_template, templ)
     return len(search_results) > 0
 
 
 async def get_action_arguments(action_node: ScAddr, count: int) -> List[ScAddr]:
     arguments = []
-    for index in range(1, count + 1):
-        rrel_index = await ScKeynodes.rrel_index(index)
+    rrel_nodes = await ScKeynodes.prefetch_rrel(1, count) if count else []
+    for rrel_index in rrel_nodes:
         argument = await search_element_by_role_relation(action_node, rrel_index)
         arguments.append(argument)
     return arguments
@@ -69,9 +71,7 @@ async def generate_action_result(action_node: ScAddr, *elements: ScAddr) -> None
     struct = await ScStructure.create(*elements)
     result_struct_node = struct.set_node
     await generate_non_role_relation(
-        action_node,
-        result_struct_node,
-        await ScKeynodes.get_by_idtf(CommonIdentifiers.NREL_RESULT),
+        action_node, result_struct_node, CommonKeynodes.NREL_RESULT
     )
 
 
@@ -82,9 +82,9 @@ async def get_action_result(action_node: ScAddr) -> ScAddr:
         sc_type.VAR_COMMON_ARC >> ScAlias.RELATION_ARC,
         sc_type.VAR_NODE_STRUCTURE >> ScAlias.ELEMENT,
         sc_type.VAR_PERM_POS_ARC,
-        await ScKeynodes.get_by_idtf(CommonIdentifiers.NREL_RESULT),
+        CommonKeynodes.NREL_RESULT,
     )
-    search_results = await client.search_by_template(templ)
+    search_results = await traced_call(client.search_by_template, templ)
     if search_results:
         return search_results[0].get(ScAlias.ELEMENT)
     return ScAddr(0)
@@ -103,7 +103,7 @@ async def execute_agent(
     action = await call_agent(arguments, concepts, initiation)
     await wait_agent(wait_time, action)
     result = await check_connector(
-        sc_type.VAR_PERM_POS_ARC, await ScKeynodes.get_by_idtf(reaction), action
+        sc_type.VAR_PERM_POS_ARC, await _get_keynode(reaction), action
     )
     return action, result
 
@@ -129,7 +129,7 @@ async def generate_action(*concepts: Idtf) -> ScAddr:
             concept_addr,
             ScAlias.ACTION_NODE,
         )
-    generate_results = await client.generate_elements(construction)
+    generate_results = await traced_call(client.generate_elements, construction)
     action_node = generate_results[0]
     return action_node
 
@@ -137,13 +137,11 @@ async def generate_action(*concepts: Idtf) -> ScAddr:
 async def add_action_arguments(
     action_node: ScAddr, arguments: Dict[ScAddr, IsDynamic]
 ) -> None:
-    rrel_dynamic_arg = await ScKeynodes.get_by_idtf(
-        CommonIdentifiers.RREL_DYNAMIC_ARGUMENT
-    )
+    rrel_dynamic_arg = CommonKeynodes.RREL_DYNAMIC_ARGUMENT
+    rrel_nodes = await ScKeynodes.prefetch_rrel(1, len(arguments)) if arguments else []
     argument: ScAddr
-    for index, (argument, is_dynamic) in enumerate(arguments.items(), 1):
+    for rrel_i, (argument, is_dynamic) in zip(rrel_nodes, arguments.items()):
         if argument.is_valid():
-            rrel_i = await ScKeynodes.rrel_index(index)
             if is_dynamic:
                 dynamic_node = await generate_node(sc_type.CONST_NODE)
                 await generate_role_relation(
@@ -165,7 +163,7 @@ async def execute_action(
     await call_action(action_node, initiation)
     await wait_agent(wait_time, action_node)
     result = await check_connector(
-        sc_type.VAR_PERM_POS_ARC, await ScKeynodes.get_by_idtf(reaction), action_node
+        sc_type.VAR_PERM_POS_ARC, await _get_keynode(reaction), action_node
     )
     return result
 
@@ -180,9 +178,7 @@ async def call_action(
 async def wait_agent(
     seconds: float, action_node: ScAddr, reaction_node: Optional[ScAddr] = None
 ) -> None:
-    reaction_node = reaction_node or await ScKeynodes.get_by_idtf(
-        ActionStatus.ACTION_FINISHED
-    )
+    reaction_node = reaction_node or CommonKeynodes.ACTION_FINISHED
     finish_event = asyncio.Event()
 
     async def event_callback(_: ScAddr, __: ScAddr, trg: ScAddr) -> ScResult:
@@ -194,7 +190,7 @@ async def wait_agent(
     event_params = ScEventSubscriptionParams(
         action_node, ScEventType.AFTER_GENERATE_INCOMING_ARC, event_callback
     )
-    sc_events = await create_elementary_event_subscriptions(event_params)
+    sc_events = await traced_call(create_elementary_event_subscriptions, event_params)
     sc_event = sc_events[0]
 
     if not await check_connector(
@@ -205,14 +201,14 @@ async def wait_agent(
         except asyncio.TimeoutError:
             pass
 
-    await destroy_elementary_event_subscriptions(sc_event)
+    await traced_call(destroy_elementary_event_subscriptions, sc_event)
 
 
 async def finish_action(
     action_node: ScAddr, status: Idtf = ActionStatus.ACTION_FINISHED
 ) -> ScAddr:
     return await generate_connector(
-        sc_type.CONST_PERM_POS_ARC, await ScKeynodes.get_by_idtf(status), action_node
+        sc_type.CONST_PERM_POS_ARC, await _get_keynode(status), action_node
     )
 
 
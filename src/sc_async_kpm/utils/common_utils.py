@@ -4,7 +4,8 @@ Distributed under the MIT License
 (See an accompanying file LICENSE or a copy at https://opensource.org/licenses/MIT)
 """
 
-from typing import List, Optional, Union
+import asyncio
+from typing import Dict, List, Optional, Union
 
 from sc_async_client import client
 from sc_async_client.constants import sc_type
@@ -19,15 +20,16 @@ from sc_async_client.models import (
 )
 from sc_async_client.models.sc_construction import ScLinkContentData
 
-from sc_async_kpm.identifiers import CommonIdentifiers, ScAlias
+from sc_async_kpm.identifiers import CommonKeynodes, ScAlias
 from sc_async_kpm.sc_keynodes import Idtf, ScKeynodes
+from sc_async_kpm.tracing import traced_call
 
 
 async def generate_nodes(*node_types: ScType) -> List[ScAddr]:
     construction = ScConstruction()
     for node_type in node_types:
         construction.generate_node(node_type)
-    return await client.generate_elements(construction)
+    return await traced_call(client.generate_elements, construction)
 
 
 async def generate_node(node_type: ScType) -> ScAddr:
@@ -44,7 +46,7 @@ async def generate_links(
     for content in contents:
         link_content = ScLinkContent(content, content_type)
         construction.generate_link(link_type, link_content)
-    return await client.generate_elements(construction)
+    return await traced_call(client.generate_elements, construction)
 
 
 async def generate_link(
@@ -71,7 +73,7 @@ async def generate_connectors(
     construction = ScConstruction()
     for trg in targets:
         construction.generate_connector(connector_type, src, trg)
-    return await client.generate_elements(construction)
+    return await traced_call(client.generate_elements, construction)
 
 
 async def generate_binary_relation(
@@ -83,7 +85,7 @@ async def generate_binary_relation(
         construction.generate_connector(
             sc_type.CONST_PERM_POS_ARC, relation, ScAlias.RELATION_ARC
         )
-    elements = await client.generate_elements(construction)
+    elements = await traced_call(client.generate_elements, construction)
     return elements[0]
 
 
@@ -124,29 +126,65 @@ async def search_connectors(
     for connector_type in connector_types:
         templ = ScTemplate()
         templ.triple(source, connector_type, target)
-        results = await client.search_by_template(templ)
+        results = await traced_call(client.search_by_template, templ)
         result_connectors.extend(result[1] for result in results)
     return result_connectors
 
 
 async def get_element_system_identifier(addr: ScAddr) -> Idtf:
-    nrel_system_idtf = await ScKeynodes.get_by_idtf(
-        CommonIdentifiers.NREL_SYSTEM_IDENTIFIER
-    )
-
+    idtfs = await get_elements_system_identifiers(addr)
+    return idtfs[0]
+
+
+async def get_elements_system_identifiers(*addrs: ScAddr) -> List[Idtf]:
+    idtfs: Dict[ScAddr, Idtf] = {}
+    misses: List[ScAddr] = []
+    for addr in addrs:
+        idtf = ScKeynodes.get_cached_idtf(addr)
+        if idtf is not None:
+            idtfs[addr] = idtf
+        elif addr not in misses:
+            misses.append(addr)
+    if misses:
+        links = await _search_system_identifier_links(misses)
+        if links:
+            contents = await traced_call(client.get_link_content, *links.values())
+            for addr, content in zip(links, contents):
+                idtfs[addr] = str(content.data)
+                ScKeynodes.remember_idtf(addr, idtfs[addr])
+    return [idtfs.get(addr, "") for addr in addrs]
+
+
+def _system_identifier_template(*addrs: ScAddr) -> ScTemplate:
     templ = ScTemplate()
-    templ.quintuple(
-        addr,
-        sc_type.VAR_COMMON_ARC,
-        sc_type.VAR_NODE_LINK >> ScAlias.LINK,
-        sc_type.VAR_PERM_POS_ARC,
-        nrel_system_idtf,
+    for index, addr in enumerate(addrs):
+        templ.quintuple(
+            addr,
+            sc_type.VAR_COMMON_ARC,
+            sc_type.VAR_NODE_LINK >> f"{ScAlias.LINK}_{index}",
+            sc_type.VAR_PERM_POS_ARC,
+            CommonKeynodes.NREL_SYSTEM_IDENTIFIER,
+        )
+    return templ
+
+
+async def _search_system_identifier_links(addrs: List[ScAddr]) -> Dict[ScAddr, ScAddr]:
+    """Search links with system identifiers of all elements with one template"""
+    results = await traced_call(client.search_by_template, _system_identifier_template(*addrs))
+    if results:
+        return {addr: results[0].get(f"{ScAlias.LINK}_{i}") for i, addr in enumerate(addrs)}
+    if len(addrs) == 1:
+        return {}
+    # Some element has no system identifier, the joint template can't be found
+    results = await asyncio.gather(
+        *(
+            traced_call(client.search_by_template, _system_identifier_template(addr))
+            for addr in addrs
+        )
     )
-    result = await client.search_by_template(templ)
-    if result:
-        content_data = await get_link_content_data(result[0].get(ScAlias.LINK))
-        return str(content_data)
-    return ""
+    return {
+        addr: result[0].get(f"{ScAlias.LINK}_0") for addr, result in zip(addrs, results) if result
+    }
 
 
 async def _search_relation_template(
@@ -160,7 +198,7 @@ async def _search_relation_template(
         sc_type.VAR_PERM_POS_ARC,
         rel_node,
     )
-    result = await client.search_by_template(template)
+    result = await traced_call(client.search_by_template, template)
     return result[0] if result else None
 
 
@@ -187,7 +225,7 @@ async def search_element_by_non_role_relation(src: ScAddr, nrel_node: ScAddr) ->
 
 
 async def get_link_content_data(link: ScAddr) -> ScLinkContentData:
-    content_part = await client.get_link_content(link)
+    content_part = await traced_call(client.get_link_content, link)
     return content_part[0].data
 
 
@@ -195,4 +233,4 @@ async def erase_connectors(
     source: ScAddr, target: ScAddr, *connector_types: ScType
 ) -> bool:
     connectors = await search_connectors(source, target, *connector_types)
-    return await client.erase_elements(*connectors)
+    return await traced_call(client.erase_elements, *connectors)
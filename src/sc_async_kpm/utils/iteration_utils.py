@@ -4,6 +4,8 @@ from sc_async_client.client import get_link_content
 from sc_async_client.models import ScAddr
 from sc_async_client.models.sc_construction import ScLinkContent, ScLinkContentData
 
+from sc_async_kpm.tracing import traced_call
+
 
 def iter_link_contents_data(
     contents: Iterable[ScLinkContent],
@@ -15,5 +17,5 @@ def iter_link_contents_data(
 
 async def iter_links_data(links: Iterable[ScAddr]) -> Iterator[ScLinkContentData]:
     """Iterate by contents data in links"""
-    contents = await get_link_content(*links)
+    contents = await traced_call(get_link_content, *links)
     return iter_link_contents_data(contents)
@@ -3,6 +3,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 from sc_async_client.models import ScAddr
 
+from sc_async_kpm.sc_keynodes import ScKeynodes
 from sc_async_kpm.sc_sets.sc_numbered_set import ScNumberedSet
 
 
@@ -37,28 +38,98 @@ class ScNumberedSetTest(IsolatedAsyncioTestCase):
         _: AsyncMock,
     ):
         search_mock.return_value = []
-        keynodes_mock.rrel_index = AsyncMock(side_effect=[ScAddr(101), ScAddr(102)])
+        keynodes_mock.prefetch_rrel = AsyncMock(return_value=[ScAddr(101), ScAddr(102)])
         sc_set = ScNumberedSet(self.set_node)
         await sc_set.add(self.el1, self.el2)
         generate_mock.assert_awaited_once()
-        self.assertEqual(keynodes_mock.rrel_index.call_count, 2)
+        keynodes_mock.prefetch_rrel.assert_awaited_once_with(1, 2)
 
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    @patch(
+        "sc_async_kpm.sc_sets.sc_numbered_set.generate_by_template",
+        new_callable=AsyncMock,
+    )
     @patch(
         "sc_async_kpm.sc_sets.sc_numbered_set.search_by_template",
         new_callable=AsyncMock,
     )
-    async def test_get_elements_list(self, search_mock: AsyncMock, _: AsyncMock):
+    async def test_add_above_max_rrel(
+        self,
+        search_mock: AsyncMock,
+        generate_mock: AsyncMock,
+        resolve_mock: AsyncMock,
+        _: AsyncMock,
+    ):
+        self.addCleanup(ScKeynodes.cache().clear)
+        search_mock.return_value = []
+        resolve_mock.side_effect = lambda *params: [
+            ScAddr(4000 + int(param.idtf[len("rrel_") :])) for param in params
+        ]
+        elements = [ScAddr(4100 + i) for i in range(ScKeynodes.max_rrel_index + 2)]
+        sc_set = ScNumberedSet(self.set_node)
+        await sc_set.add(*elements)
+        generate_mock.assert_awaited_once()
+        resolved = [
+            param.idtf for call in resolve_mock.await_args_list for param in call.args
+        ]
+        self.assertIn(f"rrel_{len(elements)}", resolved)
+
+    @patch("sc_async_kpm.sc_sets.sc_numbered_set.ScKeynodes", new_callable=MagicMock)
+    @patch(
+        "sc_async_kpm.sc_sets.sc_numbered_set.search_by_template",
+        new_callable=AsyncMock,
+    )
+    async def test_get_elements_list(
+        self, search_mock: AsyncMock, keynodes_mock: MagicMock, _: AsyncMock
+    ):
+        keynodes_mock.max_rrel_index = 10
+        keynodes_mock.prefetch_rrel = AsyncMock()
+        keynodes_mock.rrel_ordinal.side_effect = {ScAddr(201): 1, ScAddr(102): 2}.get
         search_mock.return_value = [
             MockScTemplateResult(
                 [self.set_node, ScAddr(11), self.el2, ScAddr(12), ScAddr(102)]
             ),
             MockScTemplateResult(
-                [self.set_node, ScAddr(14), self.el1, ScAddr(15), ScAddr(101)]
+                [self.set_node, ScAddr(14), self.el1, ScAddr(15), ScAddr(201)]
             ),
         ]
         sc_set = ScNumberedSet(self.set_node)
         elements = await sc_set.get_elements_list()
         self.assertEqual(elements, [self.el1, self.el2])
+        keynodes_mock.prefetch_rrel.assert_awaited_once_with(1, 2, generate=False)
+
+    @patch(
+        "sc_async_kpm.sc_sets.sc_numbered_set.get_elements_system_identifiers",
+        new_callable=AsyncMock,
+    )
+    @patch("sc_async_kpm.sc_sets.sc_numbered_set.ScKeynodes", new_callable=MagicMock)
+    @patch(
+        "sc_async_kpm.sc_sets.sc_numbered_set.search_by_template",
+        new_callable=AsyncMock,
+    )
+    async def test_get_elements_list_above_max_rrel(
+        self,
+        search_mock: AsyncMock,
+        keynodes_mock: MagicMock,
+        idtfs_mock: AsyncMock,
+        _: AsyncMock,
+    ):
+        keynodes_mock.max_rrel_index = 1
+        keynodes_mock.prefetch_rrel = AsyncMock()
+        keynodes_mock.rrel_ordinal.side_effect = {ScAddr(301): 1}.get
+        idtfs_mock.return_value = ["rrel_12", "rrel_2"]
+        search_mock.return_value = [
+            MockScTemplateResult([self.set_node, ScAddr(11), self.el3, ScAddr(12), ScAddr(5)]),
+            MockScTemplateResult([self.set_node, ScAddr(14), self.el2, ScAddr(15), ScAddr(900)]),
+            MockScTemplateResult([self.set_node, ScAddr(16), self.el1, ScAddr(17), ScAddr(301)]),
+        ]
+        sc_set = ScNumberedSet(self.set_node)
+        self.assertEqual(await sc_set.get_elements_list(), [self.el1, self.el2, self.el3])
+        idtfs_mock.assert_awaited_once_with(ScAddr(5), ScAddr(900))
+
+        idtfs_mock.return_value = ["nrel_order", "rrel_2"]
+        with self.assertRaises(ValueError):
+            await sc_set.get_elements_list()
 
     @patch("sc_async_kpm.sc_sets.sc_numbered_set.ScKeynodes", new_callable=MagicMock)
     @patch(
@@ -77,12 +148,19 @@ class ScNumberedSetTest(IsolatedAsyncioTestCase):
         sc_set = ScNumberedSet(self.set_node)
         element = await sc_set.get_by_index(0)
         self.assertEqual(element, self.el1)
-        keynodes_mock.rrel_index.assert_awaited_once_with(1)
+        keynodes_mock.rrel_index.assert_awaited_once_with(1, generate=False)
 
         search_mock.return_value = []
         with self.assertRaises(KeyError):
             await sc_set.get_by_index(1)
 
+        # rrel node of the index doesn't exist
+        search_mock.reset_mock()
+        keynodes_mock.rrel_index.return_value = ScAddr(0)
+        with self.assertRaises(KeyError):
+            await sc_set.get_by_index(100)
+        search_mock.assert_not_awaited()
+
     @patch(
         "sc_async_kpm.sc_sets.sc_numbered_set.ScNumberedSet.clear",
         new_callable=AsyncMock,
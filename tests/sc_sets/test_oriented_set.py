@@ -96,7 +96,7 @@ class ScOrientedSetTest(IsolatedAsyncioTestCase):
         "sc_async_kpm.sc_sets.sc_oriented_set.ScOrientedSet._search_next_element_template",
         new_callable=AsyncMock,
     )
-    @patch("sc_async_kpm.sc_sets.sc_oriented_set.ScKeynodes", new_callable=MagicMock)
+    @patch("sc_async_kpm.sc_sets.sc_oriented_set.CommonKeynodes", new_callable=MagicMock)
     async def test_iteration(
         self,
         keynodes_mock: MagicMock,
@@ -104,7 +104,7 @@ class ScOrientedSetTest(IsolatedAsyncioTestCase):
         search_role_mock: AsyncMock,
         _: AsyncMock,
     ):
-        keynodes_mock.get_by_idtf = AsyncMock(return_value=ScAddr(101))
+        keynodes_mock.RREL_ONE = ScAddr(101)
 
         start_res = MagicMock()
         start_res.get.side_effect = [self.el1, ScAddr(11)]
@@ -120,6 +120,7 @@ class ScOrientedSetTest(IsolatedAsyncioTestCase):
         elements = [el async for el in sc_set]
 
         self.assertEqual(elements, [self.el1, self.el2, self.el3])
+        search_role_mock.assert_awaited_once_with(self.set_node, ScAddr(101))
 
     @patch(
         "sc_async_kpm.sc_sets.sc_oriented_set.ScOrientedSet.clear",
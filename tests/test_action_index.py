@@ -0,0 +1,153 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm.sc_action_index import ScActionClassIndex
+
+ACTION = ScAddr(900)
+
+
+@patch("sc_async_kpm.sc_action_index.CommonKeynodes", new_callable=MagicMock)
+@patch("sc_async_kpm.sc_action_index.client", new_callable=MagicMock)
+class ScActionClassIndexTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.class_1, self.class_2 = ScAddr(901), ScAddr(902)
+
+    def mock_client(self, client_mock: MagicMock, keynodes_mock: MagicMock) -> None:
+        keynodes_mock.ACTION = ACTION
+        client_mock.create_elementary_event_subscriptions = AsyncMock(
+            side_effect=lambda *params: [MagicMock() for _ in params]
+        )
+        client_mock.destroy_elementary_event_subscriptions = AsyncMock()
+        client_mock.search_by_template = AsyncMock(return_value=[])
+
+    async def test_track_shares_subscription(
+        self, client_mock: MagicMock, keynodes_mock: MagicMock
+    ):
+        self.mock_client(client_mock, keynodes_mock)
+        await ScActionClassIndex.track(self.class_1)
+        await ScActionClassIndex.track(self.class_1)
+        await ScActionClassIndex.track(self.class_2)
+        self.assertEqual(client_mock.create_elementary_event_subscriptions.await_count, 2)
+        # Action and the first class are subscribed with one request
+        self.assertEqual(
+            len(client_mock.create_elementary_event_subscriptions.await_args_list[0].args), 2
+        )
+        self.assertTrue(ScActionClassIndex.is_tracked(self.class_1))
+        await ScActionClassIndex.untrack(self.class_1)
+        client_mock.destroy_elementary_event_subscriptions.assert_not_awaited()
+        await ScActionClassIndex.untrack(self.class_1)
+        self.assertFalse(ScActionClassIndex.is_tracked(self.class_1))
+        client_mock.destroy_elementary_event_subscriptions.assert_awaited_once()
+        await ScActionClassIndex.untrack(self.class_2)
+        self.assertEqual(client_mock.destroy_elementary_event_subscriptions.await_count, 2)
+        self.assertEqual(
+            len(client_mock.destroy_elementary_event_subscriptions.await_args.args), 2
+        )
+
+    async def test_resubscribe(self, client_mock: MagicMock, keynodes_mock: MagicMock):
+        self.mock_client(client_mock, keynodes_mock)
+        await ScActionClassIndex.track(self.class_1)
+        old_subscriptions = dict(ScActionClassIndex._subscriptions)
+        await ScActionClassIndex.resubscribe()
+        self.assertEqual(client_mock.create_elementary_event_subscriptions.await_count, 2)
+        self.assertEqual(ScActionClassIndex._subscriptions.keys(), old_subscriptions.keys())
+        self.assertNotEqual(ScActionClassIndex._subscriptions, old_subscriptions)
+        await ScActionClassIndex.untrack(self.class_1)
+
+    async def test_forget(self, client_mock: MagicMock, keynodes_mock: MagicMock):
+        self.mock_client(client_mock, keynodes_mock)
+        await ScActionClassIndex.track(self.class_1)
+        ScActionClassIndex.forget()
+        self.assertFalse(ScActionClassIndex.is_tracked(self.class_1))
+        # Subscriptions of the old KB aren't destroyed
+        await ScActionClassIndex.untrack(self.class_1)
+        client_mock.destroy_elementary_event_subscriptions.assert_not_awaited()
+
+    async def test_contains_from_events(self, client_mock: MagicMock, keynodes_mock: MagicMock):
+        self.mock_client(client_mock, keynodes_mock)
+        await ScActionClassIndex.track(self.class_1)
+        await ScActionClassIndex.track(self.class_2)
+        action_node = ScAddr(903)
+        await ScActionClassIndex._on_member(ACTION, ScAddr(0), action_node)
+        await ScActionClassIndex._on_member(self.class_1, ScAddr(0), action_node)
+        self.assertTrue(await ScActionClassIndex.contains(self.class_1, action_node))
+        client_mock.search_by_template.assert_not_awaited()
+        # The entry filled by events can't tell the action isn't in the class
+        self.assertFalse(await ScActionClassIndex.contains(self.class_2, action_node))
+        self.assertFalse(await ScActionClassIndex.contains(self.class_2, action_node))
+        client_mock.search_by_template.assert_awaited_once()
+        await ScActionClassIndex.untrack(self.class_1)
+        await ScActionClassIndex.untrack(self.class_2)
+
+    async def test_contains_before_class_event(
+        self, client_mock: MagicMock, keynodes_mock: MagicMock
+    ):
+        self.mock_client(client_mock, keynodes_mock)
+        await ScActionClassIndex.track(self.class_1)
+        action_node = ScAddr(907)
+        # The event of the action class comes before the event of the class
+        await ScActionClassIndex._on_member(ACTION, ScAddr(0), action_node)
+        client_mock.search_by_template.return_value = [
+            [ACTION, ScAddr(0), action_node],
+            [self.class_1, ScAddr(0), action_node],
+        ]
+        self.assertTrue(await ScActionClassIndex.contains(self.class_1, action_node))
+        client_mock.search_by_template.assert_awaited_once()
+        await ScActionClassIndex._on_member(self.class_1, ScAddr(0), action_node)
+        self.assertTrue(await ScActionClassIndex.contains(self.class_1, action_node))
+        client_mock.search_by_template.assert_awaited_once()
+        await ScActionClassIndex.untrack(self.class_1)
+
+    async def test_contains_lookup(self, client_mock: MagicMock, keynodes_mock: MagicMock):
+        self.mock_client(client_mock, keynodes_mock)
+        await ScActionClassIndex.track(self.class_1)
+        await ScActionClassIndex.track(self.class_2)
+        action_node = ScAddr(904)
+        client_mock.search_by_template.return_value = [
+            [ACTION, ScAddr(0), action_node],
+            [self.class_2, ScAddr(0), action_node],
+            [ScAddr(905), ScAddr(0), action_node],
+        ]
+        self.assertFalse(await ScActionClassIndex.contains(self.class_1, action_node))
+        self.assertTrue(await ScActionClassIndex.contains(self.class_2, action_node))
+        client_mock.search_by_template.assert_awaited_once()
+        await ScActionClassIndex.untrack(self.class_1)
+        await ScActionClassIndex.untrack(self.class_2)
+
+    async def test_concurrent_lookups_coalesced(
+        self, client_mock: MagicMock, keynodes_mock: MagicMock
+    ):
+        self.mock_client(client_mock, keynodes_mock)
+        await ScActionClassIndex.track(self.class_1)
+        await ScActionClassIndex.track(self.class_2)
+        action_node = ScAddr(908)
+        client_mock.search_by_template.return_value = [
+            [ACTION, ScAddr(0), action_node],
+            [self.class_2, ScAddr(0), action_node],
+        ]
+        # Agents of all classes check the new action, it is searched once
+        results = await asyncio.gather(
+            *(
+                ScActionClassIndex.contains(action_class, action_node)
+                for action_class in [self.class_1, self.class_2] * 10
+            )
+        )
+        self.assertEqual(results, [False, True] * 10)
+        client_mock.search_by_template.assert_awaited_once()
+        await ScActionClassIndex.untrack(self.class_1)
+        await ScActionClassIndex.untrack(self.class_2)
+
+    async def test_not_action(self, client_mock: MagicMock, keynodes_mock: MagicMock):
+        self.mock_client(client_mock, keynodes_mock)
+        await ScActionClassIndex.track(self.class_1)
+        action_node = ScAddr(906)
+        await ScActionClassIndex._on_member(self.class_1, ScAddr(0), action_node)
+        self.assertFalse(await ScActionClassIndex.contains(self.class_1, action_node))
+        await ScActionClassIndex.untrack(self.class_1)
+
+    def test_initialization(self, client_mock: MagicMock, keynodes_mock: MagicMock):
+        with self.assertRaises(TypeError):
+            ScActionClassIndex()
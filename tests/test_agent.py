@@ -1,3 +1,5 @@
+import asyncio
+from typing import List
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -6,7 +8,17 @@ from sc_async_client.constants.common import ScEventType
 from sc_async_client.constants.exceptions import InvalidValueError
 from sc_async_client.models import ScAddr, ScEventSubscription
 
-from sc_async_kpm.sc_agent import ScAgent, ScAgentClassic
+from sc_async_kpm.metrics import ScAgentMetrics
+from sc_async_kpm.sc_agent import (
+    ScAgent,
+    ScAgentClassic,
+    drain_agents,
+    register_agents,
+    resubscribe_agents,
+    unregister_agents,
+)
+from sc_async_kpm.sc_dispatcher import ScDispatcher
+from sc_async_kpm.sc_event_batch import ScAgentEvent
 from sc_async_kpm.sc_result import ScResult
 
 
@@ -21,6 +33,18 @@ class _TestAgentClassic(ScAgentClassic):
         return ScResult.OK
 
 
+class _TestBatchAgent(ScAgent):
+    max_batch_size = 10
+    max_batch_wait = 0.01
+
+    async def on_event(self, *args, **kwargs) -> ScResult:
+        return ScResult.ERROR
+
+    async def on_event_batch(self, events: List[ScAgentEvent]) -> List[ScResult]:
+        self.batches.append(events)
+        return [ScResult.OK] * len(events)
+
+
 class ScAgentTest(IsolatedAsyncioTestCase):
     def setUp(self) -> None:
         self.agent_event_element = ScAddr(1)
@@ -90,11 +114,126 @@ class ScAgentTest(IsolatedAsyncioTestCase):
         self.assertIsNone(agent._event)
         destroy_event_mock.assert_awaited_once_with(event)
 
+    @patch("sc_async_kpm.sc_agent.client", new_callable=MagicMock)
+    async def test_register_agents(self, client_mock: MagicMock):
+        client_mock.create_elementary_event_subscriptions = AsyncMock(
+            side_effect=lambda *params: [MagicMock(callback=param.callback) for param in params]
+        )
+        client_mock.destroy_elementary_event_subscriptions = AsyncMock()
+        agents = [_TestAgent(ScAddr(i), self.agent_event_type) for i in range(1, 4)]
+        self.assertEqual(await register_agents(*agents), {})
+        client_mock.create_elementary_event_subscriptions.assert_awaited_once()
+        self.assertTrue(all(agent.is_registered for agent in agents))
+        events = [agent._event for agent in agents]
+        self.assertEqual(await unregister_agents(*agents), {})
+        client_mock.destroy_elementary_event_subscriptions.assert_awaited_once_with(*events)
+        self.assertFalse(any(agent.is_registered for agent in agents))
+
+    @patch("sc_async_kpm.sc_agent.client", new_callable=MagicMock)
+    async def test_resubscribe_agents(self, client_mock: MagicMock):
+        client_mock.create_elementary_event_subscriptions = AsyncMock(
+            side_effect=lambda *params: [MagicMock() for _ in params]
+        )
+        agents = [_TestAgent(ScAddr(i), self.agent_event_type) for i in range(1, 4)]
+        await register_agents(*agents[:2])
+        old_events = [agent._event for agent in agents]
+        await resubscribe_agents(*agents)
+        self.assertEqual(client_mock.create_elementary_event_subscriptions.await_count, 2)
+        self.assertEqual(
+            len(client_mock.create_elementary_event_subscriptions.await_args.args), 2
+        )
+        for agent, old_event in zip(agents[:2], old_events):
+            self.assertIsNot(agent._event, old_event)
+        self.assertFalse(agents[2].is_registered)
+
+    @patch("sc_async_kpm.sc_agent.client", new_callable=MagicMock)
+    async def test_register_agents_failure(self, client_mock: MagicMock):
+        error = ConnectionError()
+
+        agents = [_TestAgent(ScAddr(i), self.agent_event_type) for i in range(1, 4)]
+
+        async def create_events(*params):
+            if len(params) > 1 or params[0].callback.__self__ is agents[1]:
+                raise error
+            return [MagicMock()]
+
+        client_mock.create_elementary_event_subscriptions = AsyncMock(side_effect=create_events)
+        # The failed request is repeated for each agent, so failed agents are known
+        self.assertEqual(await register_agents(*agents), {agents[1]: error})
+        self.assertEqual(client_mock.create_elementary_event_subscriptions.await_count, 4)
+        self.assertEqual([agent.is_registered for agent in agents], [True, False, True])
+
+    async def test_drain(self):
+        release = asyncio.Event()
+        agent = _TestAgent(self.agent_event_element, self.agent_event_type)
+
+        async def on_event(*_) -> ScResult:
+            await release.wait()
+            return ScResult.OK
+
+        agent.on_event = on_event
+        task = asyncio.create_task(agent._dispatch(ScAddr(1), ScAddr(2), ScAddr(3)))
+        await asyncio.sleep(0)
+        self.assertEqual(agent.in_flight, 1)
+        drain = asyncio.create_task(drain_agents(agent, timeout=1))
+        await asyncio.sleep(0)
+        # New events aren't dispatched while draining
+        result = await agent._dispatch(ScAddr(1), ScAddr(2), ScAddr(4))
+        self.assertEqual(result, ScResult.ERROR_INVALID_STATE)
+        release.set()
+        stats = await drain
+        self.assertEqual((stats["finished"], stats["cancelled"], stats["rejected"]), (1, 0, 1))
+        self.assertEqual(await task, ScResult.OK)
+        self.assertEqual(agent.in_flight, 0)
+
+    async def test_drain_timeout(self):
+        agent = _TestAgent(self.agent_event_element, self.agent_event_type)
+
+        async def on_event(*_) -> ScResult:
+            await asyncio.sleep(10)
+            return ScResult.OK
+
+        agent.on_event = on_event
+        task = asyncio.create_task(agent._dispatch(ScAddr(1), ScAddr(2), ScAddr(3)))
+        await asyncio.sleep(0)
+        stats = await drain_agents(agent, timeout=0.01)
+        self.assertEqual((stats["finished"], stats["cancelled"]), (0, 1))
+        # The caller gets an error instead of cancellation
+        self.assertEqual(await task, ScResult.ERROR)
+
     async def test_callback(self):
         agent = await _TestAgent.create(self.agent_event_element, self.agent_event_type)
         result = await agent._callback(ScAddr(1), ScAddr(2), ScAddr(3))
         self.assertEqual(result, ScResult.OK)
 
+    async def test_callback_batch(self):
+        agent = await _TestBatchAgent.create(self.agent_event_element, self.agent_event_type)
+        agent.batches = []
+        results = await asyncio.gather(
+            *(agent._callback(ScAddr(1), ScAddr(2), ScAddr(value)) for value in range(3, 6))
+        )
+        self.assertEqual(results, [ScResult.OK] * 3)
+        self.assertEqual(len(agent.batches), 1)
+        self.assertEqual(agent.batches[0][0], ScAgentEvent(ScAddr(1), ScAddr(2), ScAddr(3)))
+
+    async def test_dispatch(self):
+        agent = await _TestAgent.create(self.agent_event_element, self.agent_event_type)
+        self.assertEqual(await agent._dispatch(ScAddr(1), ScAddr(2), ScAddr(3)), ScResult.OK)
+        dispatcher = MagicMock(spec=ScDispatcher)
+        dispatcher.dispatch = AsyncMock(return_value=ScResult.ERROR_INVALID_STATE)
+        agent.set_dispatcher(dispatcher)
+        result = await agent._dispatch(ScAddr(1), ScAddr(2), ScAddr(3))
+        self.assertEqual(result, ScResult.ERROR_INVALID_STATE)
+        dispatcher.dispatch.assert_awaited_once_with(
+            agent._observed_callback, ScAddr(1), ScAddr(2), ScAddr(3)
+        )
+
+    async def test_dispatch_metrics(self):
+        agent = await _TestAgent.create(ScAddr(71), self.agent_event_type)
+        await agent._dispatch(ScAddr(1), ScAddr(2), ScAddr(3))
+        snapshot = ScAgentMetrics.snapshot()[repr(agent)]
+        self.assertEqual(snapshot["results"]["OK"], snapshot["latency"]["count"])
+
 
 class ScAgentClassicTest(IsolatedAsyncioTestCase):
     def setUp(self) -> None:
@@ -104,17 +243,42 @@ class ScAgentClassicTest(IsolatedAsyncioTestCase):
 
     @patch("sc_async_kpm.sc_agent.ScKeynodes", new_callable=MagicMock)
     async def test_create(self, sc_keynodes_mock: MagicMock):
-        sc_keynodes_mock.resolve = AsyncMock(
-            side_effect=[self.action_class_addr, self.event_element_addr]
+        sc_keynodes_mock.resolve_many = AsyncMock(
+            return_value={
+                self.action_class_name: self.action_class_addr,
+                "action_initiated": self.event_element_addr,
+            }
         )
         agent = await _TestAgentClassic.create(self.action_class_name)
         self.assertEqual(agent._action_class, self.action_class_addr)
         self.assertEqual(agent._event_element, self.event_element_addr)
+        sc_keynodes_mock.resolve_many.assert_awaited_once_with(
+            {
+                self.action_class_name: sc_type.CONST_NODE_CLASS,
+                "action_initiated": sc_type.CONST_NODE_CLASS,
+            }
+        )
+
+    @patch("sc_async_kpm.sc_agent.ScKeynodes", new_callable=MagicMock)
+    async def test_create_with_sc_addr(self, sc_keynodes_mock: MagicMock):
+        sc_keynodes_mock.resolve_many = AsyncMock(
+            return_value={self.action_class_name: self.action_class_addr}
+        )
+        agent = await _TestAgentClassic.create(
+            self.action_class_name, self.event_element_addr
+        )
+        self.assertEqual(agent._event_element, self.event_element_addr)
+        sc_keynodes_mock.resolve_many.assert_awaited_once_with(
+            {self.action_class_name: sc_type.CONST_NODE_CLASS}
+        )
 
     @patch("sc_async_kpm.sc_agent.ScKeynodes", new_callable=MagicMock)
     async def test_create_invalid_event_element(self, sc_keynodes_mock: MagicMock):
-        sc_keynodes_mock.resolve = AsyncMock(
-            side_effect=[self.action_class_addr, ScAddr(0)]
+        sc_keynodes_mock.resolve_many = AsyncMock(
+            return_value={
+                self.action_class_name: self.action_class_addr,
+                "action_initiated": ScAddr(0),
+            }
         )
         with self.assertRaises(InvalidValueError):
             await _TestAgentClassic.create(self.action_class_name)
@@ -124,7 +288,12 @@ class ScAgentClassicTest(IsolatedAsyncioTestCase):
     async def test_callback(
         self, sc_keynodes_mock: MagicMock, check_action_class_mock: AsyncMock
     ):
-        sc_keynodes_mock.resolve = AsyncMock(return_value=self.action_class_addr)
+        sc_keynodes_mock.resolve_many = AsyncMock(
+            return_value={
+                self.action_class_name: self.action_class_addr,
+                "action_initiated": self.event_element_addr,
+            }
+        )
         agent = await _TestAgentClassic.create(self.action_class_name)
 
         check_action_class_mock.return_value = True
@@ -137,3 +306,35 @@ class ScAgentClassicTest(IsolatedAsyncioTestCase):
         result = await agent._callback(ScAddr(1), ScAddr(2), ScAddr(3))
         self.assertEqual(result, ScResult.SKIP)
         check_action_class_mock.assert_awaited_once_with(agent._action_class, ScAddr(3))
+
+    @patch("sc_async_kpm.sc_agent.ScActionClassIndex", new_callable=MagicMock)
+    @patch("sc_async_kpm.sc_agent.check_action_class", new_callable=AsyncMock)
+    @patch("sc_async_kpm.sc_agent.client", new_callable=MagicMock)
+    async def test_callback_with_index(
+        self,
+        client_mock: MagicMock,
+        check_action_class_mock: AsyncMock,
+        index_mock: MagicMock,
+    ):
+        client_mock.create_elementary_event_subscriptions = AsyncMock(return_value=[MagicMock()])
+        client_mock.destroy_elementary_event_subscriptions = AsyncMock()
+        index_mock.track = AsyncMock()
+        index_mock.untrack = AsyncMock()
+        index_mock.is_tracked.return_value = True
+        index_mock.contains = AsyncMock(return_value=False)
+        agent = _TestAgentClassic(
+            self.action_class_name,
+            self.action_class_addr,
+            self.event_element_addr,
+            ScEventType.AFTER_GENERATE_OUTGOING_ARC,
+        )
+        await agent._register()
+        await agent._register()
+        index_mock.track.assert_awaited_once_with(self.action_class_addr)
+        result = await agent._callback(ScAddr(1), ScAddr(2), ScAddr(3))
+        self.assertEqual(result, ScResult.SKIP)
+        index_mock.contains.assert_awaited_once_with(self.action_class_addr, ScAddr(3))
+        check_action_class_mock.assert_not_awaited()
+        await agent._unregister()
+        await agent._unregister()
+        index_mock.untrack.assert_awaited_once_with(self.action_class_addr)
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
+
+from sc_async_client.constants.common import ScEventType
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm.sc_agent import ScAgent
+from sc_async_kpm.sc_compute import ScComputeMixin, ScComputePool, pack
+from sc_async_kpm.sc_result import ScResult
+
+
+def _sum_values(values):
+    return sum(values)
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+
+
+class _ComputeAgent(ScComputeMixin, ScAgent):
+    compute_pool = ScComputePool(max_workers=1)
+
+    async def prepare(self, event_element, event_connector, action_element):
+        return [event_element, action_element]
+
+    @staticmethod
+    def compute(data):
+        return max(data)
+
+    async def apply(self, action_element, result):
+        self.result = result
+        return ScResult.OK
+
+
+class ScComputePoolTest(IsolatedAsyncioTestCase):
+    def test_pack(self):
+        data = {"nodes": [ScAddr(1), ScAddr(2)], ScAddr(3): (ScAddr(4), "text", 5)}
+        self.assertEqual(pack(data), {"nodes": [1, 2], 3: (4, "text", 5)})
+
+    async def test_run(self):
+        pool = ScComputePool(max_workers=1)
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(await pool.run(_sum_values, [ScAddr(1), ScAddr(2)]), 3)
+
+    async def test_timeout(self):
+        pool = ScComputePool(max_workers=1, timeout=0.05)
+        self.addCleanup(pool.shutdown, False)
+        with self.assertRaises(asyncio.TimeoutError):
+            await pool.run(_sleep, 0.5)
+
+    def test_invalid_params(self):
+        with self.assertRaises(ValueError):
+            ScComputePool(max_workers=0)
+        with self.assertRaises(ValueError):
+            ScComputePool(timeout=0)
+
+    async def test_agent(self):
+        self.addCleanup(_ComputeAgent.compute_pool.shutdown)
+        agent = _ComputeAgent(ScAddr(1), ScEventType.AFTER_GENERATE_OUTGOING_ARC)
+        result = await agent.on_event(ScAddr(7), ScAddr(8), ScAddr(9))
+        self.assertEqual(result, ScResult.OK)
+        self.assertEqual(agent.result, 9)
+
+    async def test_agent_timeout(self):
+        agent = _ComputeAgent(ScAddr(1), ScEventType.AFTER_GENERATE_OUTGOING_ARC)
+        agent.compute_pool = ScComputePool()
+        agent.compute_pool.run = AsyncMock(side_effect=asyncio.TimeoutError)
+        result = await agent.on_event(ScAddr(7), ScAddr(8), ScAddr(9))
+        self.assertEqual(result, ScResult.ERROR)
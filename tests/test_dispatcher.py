@@ -0,0 +1,100 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm.sc_dispatcher import OverflowPolicy, ScDispatcher
+from sc_async_kpm.sc_result import ScResult
+
+
+class ScDispatcherTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.release = asyncio.Event()
+        self.started = []
+
+    async def callback(self, event_element: ScAddr, *_) -> ScResult:
+        self.started.append(event_element.value)
+        await self.release.wait()
+        return ScResult.OK
+
+    def dispatch(self, dispatcher: ScDispatcher, *values: int) -> list:
+        return [
+            asyncio.create_task(
+                dispatcher.dispatch(self.callback, ScAddr(value), ScAddr(0), ScAddr(0))
+            )
+            for value in values
+        ]
+
+    async def test_workers_limit(self):
+        dispatcher = ScDispatcher(workers=2, queue_size=10)
+        tasks = self.dispatch(dispatcher, 1, 2, 3, 4)
+        await asyncio.sleep(0)
+        self.assertEqual(self.started, [1, 2])
+        self.assertEqual(dispatcher.in_flight, 2)
+        self.assertEqual(dispatcher.queue_depth, 2)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*tasks), [ScResult.OK] * 4)
+        self.assertEqual(self.started, [1, 2, 3, 4])
+        self.assertEqual(dispatcher.in_flight, 0)
+        self.assertEqual(dispatcher.queue_depth, 0)
+
+    async def test_reject(self):
+        dispatcher = ScDispatcher(workers=1, queue_size=1, overflow=OverflowPolicy.REJECT)
+        tasks = self.dispatch(dispatcher, 1, 2, 3)
+        await asyncio.sleep(0)
+        self.assertTrue(tasks[2].done())
+        self.assertEqual(tasks[2].result(), ScResult.ERROR_INVALID_STATE)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*tasks[:2]), [ScResult.OK] * 2)
+        self.assertEqual(dispatcher.stats()["rejected"], 1)
+
+    async def test_drop_oldest(self):
+        dispatcher = ScDispatcher(workers=1, queue_size=1, overflow=OverflowPolicy.DROP_OLDEST)
+        tasks = self.dispatch(dispatcher, 1, 2, 3)
+        await asyncio.sleep(0)
+        self.release.set()
+        results = await asyncio.gather(*tasks)
+        self.assertEqual(results, [ScResult.OK, ScResult.ERROR_INVALID_STATE, ScResult.OK])
+        self.assertEqual(self.started, [1, 3])
+        self.assertEqual(dispatcher.stats()["dropped"], 1)
+
+    async def test_block(self):
+        dispatcher = ScDispatcher(workers=1, queue_size=1, overflow=OverflowPolicy.BLOCK)
+        tasks = self.dispatch(dispatcher, 1, 2, 3)
+        await asyncio.sleep(0)
+        self.assertEqual(dispatcher.stats()["blocked"], 1)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*tasks), [ScResult.OK] * 3)
+        self.assertEqual(self.started, [1, 2, 3])
+
+    async def test_block_limit(self):
+        dispatcher = ScDispatcher(
+            workers=1, queue_size=1, overflow=OverflowPolicy.BLOCK, max_blocked=1
+        )
+        tasks = self.dispatch(dispatcher, 1, 2, 3, 4)
+        await asyncio.sleep(0)
+        self.assertEqual(dispatcher.stats()["blocked"], 1)
+        self.assertEqual(dispatcher.stats()["rejected"], 1)
+        self.release.set()
+        results = await asyncio.gather(*tasks)
+        self.assertEqual(results, [ScResult.OK] * 3 + [ScResult.ERROR_INVALID_STATE])
+        self.assertEqual(self.started, [1, 2, 3])
+
+    async def test_cancel_queued(self):
+        dispatcher = ScDispatcher(workers=1, queue_size=1)
+        tasks = self.dispatch(dispatcher, 1, 2)
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        await asyncio.sleep(0)
+        self.assertEqual(dispatcher.queue_depth, 0)
+        self.release.set()
+        self.assertEqual(await tasks[0], ScResult.OK)
+        self.assertEqual(dispatcher.in_flight, 0)
+
+    def test_invalid_params(self):
+        with self.assertRaises(ValueError):
+            ScDispatcher(workers=0)
+        with self.assertRaises(ValueError):
+            ScDispatcher(queue_size=-1)
+        with self.assertRaises(ValueError):
+            ScDispatcher(max_blocked=-1)
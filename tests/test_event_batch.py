@@ -0,0 +1,50 @@
+import asyncio
+from logging import getLogger
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
+
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm.sc_event_batch import EventBatcher, ScAgentEvent
+from sc_async_kpm.sc_result import ScResult
+
+
+def _event(value: int) -> ScAgentEvent:
+    return ScAgentEvent(ScAddr(1), ScAddr(2), ScAddr(value))
+
+
+class EventBatcherTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.logger = getLogger(__name__)
+
+    async def test_max_size(self):
+        handler = AsyncMock(side_effect=lambda events: [ScResult.OK] * len(events))
+        batcher = EventBatcher(handler, max_size=3, max_wait=10, logger=self.logger)
+        results = await asyncio.gather(*(batcher.submit(_event(value)) for value in range(6)))
+        self.assertEqual(results, [ScResult.OK] * 6)
+        self.assertEqual(handler.await_count, 2)
+        self.assertEqual(len(handler.await_args.args[0]), 3)
+
+    async def test_max_wait(self):
+        handler = AsyncMock(
+            side_effect=lambda events: [
+                ScResult.OK if event.action_element.value % 2 else ScResult.SKIP
+                for event in events
+            ]
+        )
+        batcher = EventBatcher(handler, max_size=100, max_wait=0.01, logger=self.logger)
+        results = await asyncio.gather(*(batcher.submit(_event(value)) for value in range(3)))
+        self.assertEqual(results, [ScResult.SKIP, ScResult.OK, ScResult.SKIP])
+        handler.assert_awaited_once()
+
+    async def test_handler_error(self):
+        handler = AsyncMock(return_value=[ScResult.OK])
+        batcher = EventBatcher(handler, max_size=2, max_wait=10, logger=self.logger)
+        results = await asyncio.gather(batcher.submit(_event(1)), batcher.submit(_event(2)))
+        self.assertEqual(results, [ScResult.ERROR, ScResult.ERROR])
+
+    def test_invalid_params(self):
+        with self.assertRaises(ValueError):
+            EventBatcher(AsyncMock(), max_size=0, max_wait=1, logger=self.logger)
+        with self.assertRaises(ValueError):
+            EventBatcher(AsyncMock(), max_size=1, max_wait=-1, logger=self.logger)
@@ -0,0 +1,84 @@
+import asyncio
+import json
+from typing import Tuple
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import MagicMock, patch
+
+from sc_async_kpm.metrics import ScAgentMetrics
+from sc_async_kpm.sc_dispatcher import ScDispatcher
+from sc_async_kpm.sc_http import ScHttpEndpoint
+from sc_async_kpm.sc_module import ScModule
+from sc_async_kpm.sc_result import ScResult
+from sc_async_kpm.sc_server import ScServer
+
+
+@patch("sc_async_kpm.sc_server.client", new_callable=MagicMock)
+class ScHttpEndpointTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.server = ScServer("ws://localhost:8090")
+        self.module = ScModule(MagicMock(), MagicMock(), dispatcher=ScDispatcher(workers=2))
+        self.server._modules.add(self.module)
+        self.endpoint = ScHttpEndpoint(self.server, "127.0.0.1", 0)
+        await self.endpoint.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.endpoint.stop()
+        ScAgentMetrics.reset()
+
+    async def request(self, method: str, path: str) -> Tuple[int, str]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.endpoint.port)
+        writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = (await reader.read()).decode()
+        writer.close()
+        head, body = response.split("\r\n\r\n", 1)
+        return int(head.split(" ")[1]), body
+
+    async def test_health(self, client_mock: MagicMock):
+        client_mock.is_connected.return_value = True
+        self.server.is_registered = True
+        status, body = await self.request("GET", "/health")
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            json.loads(body),
+            {
+                "connected": True,
+                "registered": True,
+                "ready": True,
+                "modules": {repr(self.module): 2},
+            },
+        )
+
+    async def test_ready(self, client_mock: MagicMock):
+        client_mock.is_connected.return_value = True
+        status, _ = await self.request("GET", "/ready")
+        self.assertEqual(status, 503)
+        self.server.is_registered = True
+        status, body = await self.request("GET", "/ready?verbose=1")
+        self.assertEqual((status, json.loads(body)), (200, {"ready": True}))
+        # Draining agents don't accept events
+        await self.server.drain()
+        status, _ = await self.request("GET", "/ready")
+        self.assertEqual(status, 503)
+
+    async def test_metrics(self, client_mock: MagicMock):
+        client_mock.is_connected.return_value = True
+        ScAgentMetrics.observe("agent", ScResult.OK, 0.01)
+        status, body = await self.request("GET", "/metrics")
+        self.assertEqual(status, 200)
+        labels = f'{{module="{repr(self.module)}"}}'
+        self.assertIn("sc_server_connected 1\n", body)
+        self.assertIn("sc_server_reconnects_total 0\n", body)
+        self.assertIn(f"sc_module_agents{labels} 2\n", body)
+        self.assertIn(f"sc_dispatcher_queue_depth{labels} 0\n", body)
+        self.assertIn("# TYPE sc_keynodes_hits_total counter\n", body)
+        self.assertIn('sc_keynodes_resolve_seconds_bucket{le="+Inf"}', body)
+        self.assertIn('sc_event_loop_lag_seconds_bucket{le="+Inf"}', body)
+        self.assertIn('sc_agent_results_total{agent="agent",result="OK"} 1\n', body)
+
+    async def test_errors(self, client_mock: MagicMock):
+        status, _ = await self.request("POST", "/health")
+        self.assertEqual(status, 405)
+        status, _ = await self.request("GET", "/unknown")
+        self.assertEqual(status, 404)
+        status, body = await self.request("HEAD", "/metrics")
+        self.assertEqual((status, body), (200, ""))
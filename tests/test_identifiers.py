@@ -3,23 +3,28 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 from sc_async_client.models import ScAddr
 
-from sc_async_kpm.identifiers import _IdentifiersResolver
+from sc_async_kpm.identifiers import CommonKeynodes, _IdentifiersResolver
+from sc_async_kpm.sc_keynodes import ScKeynodesCache
 
 
 class TestIdentifiers(IsolatedAsyncioTestCase):
-    @patch("sc_async_kpm.identifiers.ScKeynodes", new_callable=MagicMock)
+    @patch("sc_async_kpm.sc_keynodes_namespace.ScKeynodes", new_callable=MagicMock)
     async def test_resolve(self, keynodes_mock: MagicMock):
-        keynodes_mock.resolve = AsyncMock(return_value=ScAddr(1))
+        keynodes_mock.cache.return_value = ScKeynodesCache()
+        keynodes_mock.resolve_many = AsyncMock(
+            side_effect=lambda identifiers: dict.fromkeys(identifiers, ScAddr(1))
+        )
 
-        # First call
+        # First call, all identifiers are resolved with one request
         await _IdentifiersResolver.resolve()
         self.assertTrue(_IdentifiersResolver.is_resolved)
-        self.assertGreater(keynodes_mock.resolve.call_count, 0)
+        keynodes_mock.resolve_many.assert_awaited_once()
+        self.assertIn("action", keynodes_mock.resolve_many.call_args.args[0])
+        self.assertEqual(CommonKeynodes.ACTION, ScAddr(1))
 
         # Second call (should be skipped)
-        call_count = keynodes_mock.resolve.call_count
         await _IdentifiersResolver.resolve()
-        self.assertEqual(keynodes_mock.resolve.call_count, call_count)
+        keynodes_mock.resolve_many.assert_awaited_once()
 
         # Reset for another test
         _IdentifiersResolver.is_resolved = False
@@ -6,7 +6,8 @@ from sc_async_client.models import ScAddr
 
 from sc_async_kpm import ScKeynodes
 
-from unittest.mock import AsyncMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 from unittest import IsolatedAsyncioTestCase
 
 
@@ -44,20 +45,300 @@ class KeynodesTests(IsolatedAsyncioTestCase):
         with self.assertRaises(InvalidValueError):
             await ScKeynodes.erase(idtf)
 
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_resolve_many(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.return_value = [ScAddr(6), ScAddr(0)]
+        idtf_1, idtf_2 = "idtf_resolve_many_1", "idtf_resolve_many_2"
+        addrs = await ScKeynodes.resolve_many(
+            {idtf_1: sc_type.CONST_NODE, idtf_2: None}
+        )
+        self.assertEqual(addrs, {idtf_1: ScAddr(6), idtf_2: ScAddr(0)})
+        mock_resolve_keynodes.assert_awaited_once()
+        self.assertEqual(len(mock_resolve_keynodes.call_args.args), 2)
+        # Only the cache miss is sent to the server
+        mock_resolve_keynodes.reset_mock()
+        mock_resolve_keynodes.return_value = [ScAddr(7)]
+        addrs = await ScKeynodes.get_many(idtf_1, idtf_2)
+        self.assertEqual(addrs, {idtf_1: ScAddr(6), idtf_2: ScAddr(7)})
+        mock_resolve_keynodes.assert_awaited_once()
+        self.assertEqual(len(mock_resolve_keynodes.call_args.args), 1)
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_resolve_many_cached(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.return_value = [ScAddr(8)]
+        idtf = "idtf_resolve_many_cached"
+        await ScKeynodes.resolve(idtf, sc_type.CONST_NODE)
+        mock_resolve_keynodes.reset_mock()
+        self.assertEqual(await ScKeynodes.get_many(idtf), {idtf: ScAddr(8)})
+        mock_resolve_keynodes.assert_not_awaited()
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_negative_cache(self, mock_resolve_keynodes):
+        ScKeynodes.set_negative_cache(ttl=60)
+        self.addCleanup(ScKeynodes.set_negative_cache, 0)
+        mock_resolve_keynodes.return_value = [ScAddr(0)]
+        idtf = "idtf_negative_cached"
+        info = ScKeynodes.negative_cache_info()
+        self.assertFalse((await ScKeynodes.get(idtf)).is_valid())
+        self.assertFalse((await ScKeynodes.get(idtf)).is_valid())
+        mock_resolve_keynodes.assert_awaited_once()
+        new_info = ScKeynodes.negative_cache_info()
+        self.assertEqual(new_info["size"], 1)
+        self.assertEqual(new_info["hits"], info["hits"] + 1)
+        self.assertEqual(new_info["saved_requests"], info["saved_requests"] + 1)
+        # Resolving with type invalidates negative entry
+        mock_resolve_keynodes.return_value = [ScAddr(9)]
+        self.assertEqual(await ScKeynodes.resolve(idtf, sc_type.CONST_NODE), ScAddr(9))
+        self.assertEqual(ScKeynodes.negative_cache_info()["size"], 0)
+        self.assertEqual(await ScKeynodes.get(idtf), ScAddr(9))
+        self.assertEqual(mock_resolve_keynodes.await_count, 2)
+
+    @patch("sc_async_kpm.sc_keynodes.time.monotonic")
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_negative_cache_ttl(self, mock_resolve_keynodes, mock_monotonic):
+        ScKeynodes.set_negative_cache(ttl=10, max_size=1)
+        self.addCleanup(ScKeynodes.set_negative_cache, 0)
+        mock_resolve_keynodes.return_value = [ScAddr(0)]
+        mock_monotonic.return_value = 100
+        idtf_1, idtf_2 = "idtf_negative_ttl_1", "idtf_negative_ttl_2"
+        await ScKeynodes.get(idtf_1)
+        mock_monotonic.return_value = 111
+        await ScKeynodes.get(idtf_1)  # Expired
+        self.assertEqual(mock_resolve_keynodes.await_count, 2)
+        await ScKeynodes.get(idtf_2)  # Evicts idtf_1 because of max size
+        await ScKeynodes.get(idtf_1)
+        self.assertEqual(mock_resolve_keynodes.await_count, 4)
+
+    async def test_negative_cache_disabled_by_default(self):
+        with patch(
+            "sc_async_client.client.resolve_keynodes", new_callable=AsyncMock
+        ) as mock_resolve_keynodes:
+            mock_resolve_keynodes.return_value = [ScAddr(0)]
+            await ScKeynodes.get("idtf_negative_disabled")
+            await ScKeynodes.get("idtf_negative_disabled")
+            self.assertEqual(mock_resolve_keynodes.await_count, 2)
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_concurrent_resolves_coalesced(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.side_effect = lambda *params: [
+            ScAddr(index) for index, _ in enumerate(params, 20)
+        ]
+        idtf_1, idtf_2 = "idtf_coalesced_1", "idtf_coalesced_2"
+        addrs = await asyncio.gather(
+            *(ScKeynodes.get_by_idtf(idtf_1) for _ in range(50)),
+            ScKeynodes.get_by_idtf(idtf_2),
+        )
+        mock_resolve_keynodes.assert_awaited_once()
+        self.assertEqual(len(mock_resolve_keynodes.call_args.args), 2)
+        self.assertEqual(set(addrs), {ScAddr(20), ScAddr(21)})
+        self.assertEqual(addrs[0], await ScKeynodes.get_by_idtf(idtf_1))
+        mock_resolve_keynodes.assert_awaited_once()
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_concurrent_resolves_error(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.side_effect = ConnectionError
+        idtf = "idtf_coalesced_error"
+        results = await asyncio.gather(
+            ScKeynodes.get(idtf), ScKeynodes.get(idtf), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+        mock_resolve_keynodes.assert_awaited_once()
+        self.assertEqual(ScKeynodes.cache().in_flight, {})
+        # Failed request isn't remembered
+        mock_resolve_keynodes.side_effect = None
+        mock_resolve_keynodes.return_value = [ScAddr(22)]
+        self.assertEqual(await ScKeynodes.get(idtf), ScAddr(22))
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_short_resolve_response(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.return_value = [ScAddr(23)]
+        idtf_1, idtf_2 = "idtf_short_response_1", "idtf_short_response_2"
+        results = await asyncio.gather(
+            ScKeynodes.get(idtf_1), ScKeynodes.get(idtf_2), return_exceptions=True
+        )
+        mock_resolve_keynodes.assert_awaited_once()
+        # Both waiters fail instead of one hanging forever
+        self.assertTrue(all(isinstance(result, InvalidValueError) for result in results))
+        self.assertEqual(ScKeynodes.cache().in_flight, {})
+        self.assertNotIn(idtf_1, ScKeynodes.snapshot())
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_cancelled_resolve(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.side_effect = asyncio.CancelledError
+        idtf = "idtf_cancelled_resolve"
+        with self.assertRaises(asyncio.CancelledError):
+            await ScKeynodes.get(idtf)
+        self.assertEqual(ScKeynodes.cache().in_flight, {})
+        mock_resolve_keynodes.side_effect = None
+        mock_resolve_keynodes.return_value = [ScAddr(24)]
+        self.assertEqual(await ScKeynodes.get(idtf), ScAddr(24))
+
+    @patch(
+        "sc_async_client.client.destroy_elementary_event_subscriptions",
+        new_callable=AsyncMock,
+    )
+    @patch(
+        "sc_async_client.client.create_elementary_event_subscriptions",
+        new_callable=AsyncMock,
+    )
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_invalidation(self, mock_resolve_keynodes, mock_create, mock_destroy):
+        mock_create.side_effect = lambda *params: [MagicMock() for _ in params]
+        mock_resolve_keynodes.return_value = [ScAddr(30), ScAddr(31)]
+        idtf_1, idtf_2 = "idtf_invalidation_1", "idtf_invalidation_2"
+        await ScKeynodes.get_many(idtf_1, idtf_2)
+        await ScKeynodes.enable_invalidation()
+        mock_create.assert_awaited_once()
+        subscribed = {params.addr for params in mock_create.call_args.args}
+        self.assertTrue({ScAddr(30), ScAddr(31)} <= subscribed)
+        # Keynode erased by another process is evicted
+        await ScKeynodes.cache().on_erase(ScAddr(30), ScAddr(0), ScAddr(0))
+        self.assertNotIn(idtf_1, ScKeynodes.snapshot())
+        self.assertIn(idtf_2, ScKeynodes.snapshot())
+        # New keynodes are subscribed automatically
+        mock_create.reset_mock()
+        mock_resolve_keynodes.return_value = [ScAddr(32)]
+        await ScKeynodes.get(idtf_1)
+        mock_create.assert_awaited_once()
+        self.assertEqual(mock_create.call_args.args[0].addr, ScAddr(32))
+        await ScKeynodes.disable_invalidation()
+        mock_destroy.assert_awaited_once()
+        self.assertEqual(len(mock_destroy.call_args.args), len(subscribed))
+
+    @patch(
+        "sc_async_client.client.destroy_elementary_event_subscriptions",
+        new_callable=AsyncMock,
+    )
+    @patch(
+        "sc_async_client.client.create_elementary_event_subscriptions",
+        new_callable=AsyncMock,
+    )
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_revalidation_keeps_subscriptions_bounded(
+        self, mock_resolve_keynodes, mock_create, mock_destroy
+    ):
+        self.addCleanup(ScKeynodes.cache().clear)
+        mock_create.side_effect = lambda *params: [MagicMock() for _ in params]
+        idtf = "idtf_revalidated_watched"
+        mock_resolve_keynodes.return_value = [ScAddr(33)]
+        await ScKeynodes.get(idtf)
+        await ScKeynodes.enable_invalidation()
+        watched = len(ScKeynodes.cache().watched)
+        for addr in range(34, 44):
+            old_event = ScKeynodes.cache().watched[await ScKeynodes.get(idtf)]
+            mock_resolve_keynodes.return_value = [ScAddr(addr)]
+            await ScKeynodes.revalidate(idtf)
+            # Subscription of the old element is destroyed before watching the new one
+            self.assertEqual(mock_destroy.call_args.args, (old_event,))
+            self.assertEqual(len(ScKeynodes.cache().watched), watched)
+        self.assertIn(ScAddr(43), ScKeynodes.cache().watched)
+        # Evicted keynode isn't watched anymore
+        mock_resolve_keynodes.return_value = [ScAddr(0)]
+        await ScKeynodes.revalidate(idtf)
+        self.assertEqual(len(ScKeynodes.cache().watched), watched - 1)
+        await ScKeynodes.disable_invalidation()
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_cached_idtf(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.return_value = [ScAddr(40)]
+        idtf = "idtf_cached_reverse"
+        self.assertIsNone(ScKeynodes.get_cached_idtf(ScAddr(40)))
+        await ScKeynodes.get(idtf)
+        self.assertEqual(ScKeynodes.get_cached_idtf(ScAddr(40)), idtf)
+
+        # Identifiers of other elements are not remembered by default
+        ScKeynodes.remember_idtf(ScAddr(41), "element_41")
+        self.assertIsNone(ScKeynodes.get_cached_idtf(ScAddr(41)))
+
+        ScKeynodes.set_idtf_cache_size(1)
+        self.addCleanup(ScKeynodes.set_idtf_cache_size, 0)
+        ScKeynodes.remember_idtf(ScAddr(41), "element_41")
+        self.assertEqual(ScKeynodes.get_cached_idtf(ScAddr(41)), "element_41")
+        ScKeynodes.remember_idtf(ScAddr(42), "element_42")
+        self.assertIsNone(ScKeynodes.get_cached_idtf(ScAddr(41)))
+        self.assertEqual(ScKeynodes.get_cached_idtf(ScAddr(42)), "element_42")
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_stats(self, mock_resolve_keynodes):
+        ScKeynodes.reset_stats()
+        mock_resolve_keynodes.return_value = [ScAddr(50)]
+        idtf = "idtf_stats"
+        await ScKeynodes.get(idtf)
+        await ScKeynodes.get(idtf)
+        stats = ScKeynodes.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["network_calls"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertEqual(stats["resolve_latency"]["count"], 1)
+        self.assertGreaterEqual(stats["entries"], 1)
+        ScKeynodes.reset_stats()
+        stats = ScKeynodes.stats()
+        self.assertEqual(stats["hits"], 0)
+        self.assertEqual(stats["network_calls"], 0)
+        self.assertEqual(stats["resolve_latency"]["count"], 0)
+
     async def test_keynodes_initialization(self):
         with self.assertRaises(TypeError):
             ScKeynodes()
 
     @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
     async def test_rrel(self, mock_resolve_keynodes):
+        self.addCleanup(ScKeynodes.cache().clear)
         mock_resolve_keynodes.return_value = [ScAddr(5)]
         rrel_1 = await ScKeynodes.rrel_index(1)
         self.assertTrue(rrel_1.is_valid())
         mock_resolve_keynodes.assert_awaited_once()
 
-    async def test_max_rrel(self):
-        with self.assertRaises(KeyError):
-            await ScKeynodes.rrel_index(ScKeynodes._max_rrel_index + 1)
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_prefetch_rrel(self, mock_resolve_keynodes):
+        self.addCleanup(ScKeynodes.cache().clear)
+        ScKeynodes.set_max_rrel_index(500)
+        self.addCleanup(ScKeynodes.set_max_rrel_index, 10)
+        mock_resolve_keynodes.side_effect = lambda *params: [
+            ScAddr(1000 + int(param.idtf[len("rrel_") :])) for param in params
+        ]
+        rrel_nodes = await ScKeynodes.prefetch_rrel(11, 500)
+        self.assertEqual(len(rrel_nodes), 490)
+        self.assertEqual(rrel_nodes[0], ScAddr(1011))
+        self.assertEqual(rrel_nodes[-1], ScAddr(1500))
+        mock_resolve_keynodes.assert_awaited_once()
+        mock_resolve_keynodes.reset_mock()
+        self.assertEqual(await ScKeynodes.rrel_index(250), ScAddr(1250))
+        self.assertEqual(ScKeynodes.rrel_ordinal(ScAddr(1250)), 250)
+        self.assertIsNone(ScKeynodes.rrel_ordinal(ScAddr(2000)))
+        mock_resolve_keynodes.assert_not_awaited()
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_set_max_rrel(self, mock_resolve_keynodes):
+        self.addCleanup(ScKeynodes.cache().clear)
+        ScKeynodes.set_max_rrel_index(20)
+        self.addCleanup(ScKeynodes.set_max_rrel_index, 10)
+        self.assertEqual(ScKeynodes.max_rrel_index, 20)
+        mock_resolve_keynodes.side_effect = lambda *params: [
+            ScAddr(3000 + int(param.idtf[len("rrel_") :])) for param in params
+        ]
+        rrel_nodes = await ScKeynodes.prefetch_rrel(1, 21)
+        self.assertEqual(rrel_nodes[-1], ScAddr(3021))
+        # Nodes above max rrel index are resolved but not cached in the table
+        self.assertIsNone(ScKeynodes.rrel_ordinal(ScAddr(3021)))
+        with self.assertRaises(ValueError):
+            ScKeynodes.set_max_rrel_index(0)
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_max_rrel(self, mock_resolve_keynodes):
+        self.addCleanup(ScKeynodes.cache().clear)
+        index = ScKeynodes._max_rrel_index + 1
+        mock_resolve_keynodes.return_value = [ScAddr(3100)]
+        self.assertEqual(await ScKeynodes.rrel_index(index), ScAddr(3100))
+        self.assertEqual(mock_resolve_keynodes.call_args.args[0].idtf, f"rrel_{index}")
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_rrel_without_generation(self, mock_resolve_keynodes):
+        self.addCleanup(ScKeynodes.cache().clear)
+        mock_resolve_keynodes.return_value = [ScAddr(0)]
+        self.assertFalse((await ScKeynodes.rrel_index(3200, generate=False)).is_valid())
+        self.assertIsNone(mock_resolve_keynodes.call_args.args[0].type)
 
     async def test_min_rrel(self):
         with self.assertRaises(KeyError):
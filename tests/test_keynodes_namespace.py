@@ -0,0 +1,115 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sc_async_client.constants import sc_type
+from sc_async_client.constants.exceptions import InvalidValueError
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm import Keynode, ScKeynodesCache, ScKeynodesNamespace
+
+
+class _TestKeynodes(ScKeynodesNamespace):
+    TEST_CLASS = Keynode("namespace_test_class", sc_type.CONST_NODE_CLASS)
+    NREL_TEST = Keynode("namespace_nrel_test")
+
+
+class _InheritedTestKeynodes(_TestKeynodes):
+    RREL_TEST = Keynode("namespace_rrel_test", sc_type.CONST_NODE_ROLE)
+
+
+class KeynodesNamespaceTests(IsolatedAsyncioTestCase):
+    def test_not_loaded(self):
+        self.assertFalse(_TestKeynodes.is_loaded())
+        with self.assertRaises(RuntimeError):
+            _ = _TestKeynodes.TEST_CLASS
+
+    def test_initialization(self):
+        with self.assertRaises(TypeError):
+            _TestKeynodes()
+
+    @patch("sc_async_kpm.sc_keynodes_namespace.ScKeynodes", new_callable=MagicMock)
+    async def test_load(self, keynodes_mock: MagicMock):
+        keynodes_mock.cache.return_value = ScKeynodesCache()
+        keynodes_mock.resolve_many = AsyncMock(
+            return_value={
+                "namespace_test_class": ScAddr(1),
+                "namespace_nrel_test": ScAddr(2),
+                "namespace_rrel_test": ScAddr(3),
+            }
+        )
+        await _InheritedTestKeynodes.load()
+        keynodes_mock.resolve_many.assert_awaited_once_with(
+            {
+                "namespace_test_class": sc_type.CONST_NODE_CLASS,
+                "namespace_nrel_test": None,
+                "namespace_rrel_test": sc_type.CONST_NODE_ROLE,
+            }
+        )
+        self.assertTrue(_InheritedTestKeynodes.is_loaded())
+        self.assertEqual(_InheritedTestKeynodes.TEST_CLASS, ScAddr(1))
+        self.assertEqual(_InheritedTestKeynodes.RREL_TEST, ScAddr(3))
+        self.assertFalse(_TestKeynodes.is_loaded())
+
+    @patch("sc_async_kpm.sc_keynodes_namespace.ScKeynodes", new_callable=MagicMock)
+    async def test_find(self, keynodes_mock: MagicMock):
+        keynodes_mock.cache.return_value = ScKeynodesCache()
+        self.assertIsNone(_TestKeynodes.find("namespace_test_class"))
+        keynodes_mock.resolve_many = AsyncMock(
+            return_value={"namespace_test_class": ScAddr(1), "namespace_nrel_test": ScAddr(2)}
+        )
+        await _TestKeynodes.load()
+        self.assertEqual(_TestKeynodes.find("namespace_test_class"), ScAddr(1))
+        self.assertIsNone(_TestKeynodes.find("namespace_rrel_test"))
+
+    @patch("sc_async_kpm.sc_keynodes_namespace.ScKeynodes", new_callable=MagicMock)
+    async def test_load_all(self, keynodes_mock: MagicMock):
+        keynodes_mock.cache.return_value = ScKeynodesCache()
+        keynodes_mock.resolve_many = AsyncMock(
+            side_effect=lambda identifiers: dict.fromkeys(identifiers, ScAddr(4))
+        )
+        await ScKeynodesNamespace.load_all(reload=True)
+        keynodes_mock.resolve_many.assert_awaited_once()
+        self.assertEqual(_TestKeynodes.NREL_TEST, ScAddr(4))
+        self.assertEqual(_InheritedTestKeynodes.NREL_TEST, ScAddr(4))
+        # Loaded namespaces are skipped
+        await ScKeynodesNamespace.load_all()
+        keynodes_mock.resolve_many.assert_awaited_once()
+
+    @patch("sc_async_kpm.sc_keynodes_namespace.ScKeynodes", new_callable=MagicMock)
+    async def test_load_invalid(self, keynodes_mock: MagicMock):
+        keynodes_mock.cache.return_value = ScKeynodesCache()
+        keynodes_mock.resolve_many = AsyncMock(
+            return_value={"namespace_test_class": ScAddr(1), "namespace_nrel_test": ScAddr(0)}
+        )
+        with self.assertRaises(InvalidValueError):
+            await _TestKeynodes.load()
+        self.assertFalse(_TestKeynodes.is_loaded())
+
+    @patch("sc_async_kpm.sc_keynodes_namespace.ScKeynodes", new_callable=MagicMock)
+    async def test_cleared_cache(self, keynodes_mock: MagicMock):
+        cache = ScKeynodesCache()
+        keynodes_mock.cache.return_value = cache
+        keynodes_mock.resolve_many = AsyncMock(
+            return_value={"namespace_test_class": ScAddr(5), "namespace_nrel_test": ScAddr(6)}
+        )
+        await _TestKeynodes.load()
+        self.assertTrue(_TestKeynodes.is_loaded())
+        # Keynodes of another KB are loaded again
+        cache.clear()
+        self.assertFalse(_TestKeynodes.is_loaded())
+
+    @patch("sc_async_kpm.sc_keynodes_namespace.ScKeynodes", new_callable=MagicMock)
+    async def test_get(self, keynodes_mock: MagicMock):
+        cache = ScKeynodesCache()
+        keynodes_mock.cache.return_value = cache
+        keynodes_mock.resolve = AsyncMock(return_value=ScAddr(9))
+        # Not loaded keynode is resolved alone
+        self.assertEqual(await _TestKeynodes.get("TEST_CLASS"), ScAddr(9))
+        keynodes_mock.resolve.assert_awaited_once_with(
+            "namespace_test_class", sc_type.CONST_NODE_CLASS
+        )
+        cache.namespaces[_TestKeynodes] = {"TEST_CLASS": ScAddr(10)}
+        self.assertEqual(await _TestKeynodes.get("TEST_CLASS"), ScAddr(10))
+        keynodes_mock.resolve.assert_awaited_once()
+        with self.assertRaises(AttributeError):
+            await _TestKeynodes.get("UNKNOWN")
@@ -0,0 +1,84 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm import ScKeynodes
+from sc_async_kpm.sc_keynodes_snapshot import ScKeynodesSnapshot
+
+FINGERPRINT = ScAddr(42)
+
+
+class KeynodesSnapshotTests(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "keynodes.json"
+        self.url = "ws://localhost:8090"
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write_snapshot(self, url: str, fingerprint: int, keynodes: dict) -> None:
+        data = {"url": url, "fingerprint": fingerprint, "keynodes": keynodes}
+        self.path.write_text(json.dumps(data), encoding="utf-8")
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_load(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.return_value = [FINGERPRINT]
+        idtf = "idtf_snapshot_loaded"
+        self.write_snapshot(self.url, FINGERPRINT.value, {idtf: 15})
+        snapshot = ScKeynodesSnapshot(self.path)
+        self.assertEqual(await snapshot.load(self.url), 1)
+        mock_resolve_keynodes.assert_awaited_once()  # Only fingerprint
+        self.assertEqual(await ScKeynodes.get_by_idtf(idtf), ScAddr(15))
+        mock_resolve_keynodes.assert_awaited_once()
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_load_another_kb(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.return_value = [FINGERPRINT]
+        self.write_snapshot(self.url, FINGERPRINT.value + 1, {"idtf_snapshot_another_kb": 15})
+        snapshot = ScKeynodesSnapshot(self.path)
+        self.assertEqual(await snapshot.load(self.url), 0)
+        self.write_snapshot("ws://another:8090", FINGERPRINT.value, {"idtf_snapshot_another_kb": 15})
+        self.assertEqual(await snapshot.load(self.url), 0)
+        self.assertNotIn("idtf_snapshot_another_kb", ScKeynodes.snapshot())
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_load_missing_file(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.return_value = [FINGERPRINT]
+        snapshot = ScKeynodesSnapshot(self.path)
+        self.assertEqual(await snapshot.load(self.url), 0)
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_revalidate(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.return_value = [FINGERPRINT]
+        idtf_same, idtf_erased = "idtf_snapshot_same", "idtf_snapshot_erased"
+        self.write_snapshot(self.url, FINGERPRINT.value, {idtf_same: 16, idtf_erased: 17})
+        snapshot = ScKeynodesSnapshot(self.path)
+        await snapshot.load(self.url)
+        mock_resolve_keynodes.reset_mock()
+        mock_resolve_keynodes.return_value = [ScAddr(16), ScAddr(0)]
+        self.assertEqual(await snapshot.revalidate(), {idtf_erased: ScAddr(0)})
+        mock_resolve_keynodes.assert_awaited_once()
+        self.assertEqual(len(mock_resolve_keynodes.call_args.args), 2)
+        self.assertIn(idtf_same, ScKeynodes.snapshot())
+        self.assertNotIn(idtf_erased, ScKeynodes.snapshot())
+
+    @patch("sc_async_client.client.resolve_keynodes", new_callable=AsyncMock)
+    async def test_save(self, mock_resolve_keynodes):
+        mock_resolve_keynodes.return_value = [FINGERPRINT]
+        snapshot = ScKeynodesSnapshot(self.path)
+        snapshot.save(self.url)  # Not loaded, nothing to save
+        self.assertFalse(self.path.exists())
+        await snapshot.load(self.url)
+        mock_resolve_keynodes.return_value = [ScAddr(18)]
+        await ScKeynodes.resolve("idtf_snapshot_saved", None)
+        snapshot.save(self.url)
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        self.assertEqual(data["url"], self.url)
+        self.assertEqual(data["fingerprint"], FINGERPRINT.value)
+        self.assertEqual(data["keynodes"]["idtf_snapshot_saved"], 18)
+        self.assertEqual(list(Path(self.directory.name).iterdir()), [self.path])
@@ -0,0 +1,51 @@
+import asyncio
+import time
+from logging import getLogger
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import MagicMock
+
+from sc_async_kpm.sc_agent import ScAgentAbstract
+from sc_async_kpm.sc_loop_monitor import ScLoopMonitor
+
+
+def blocking_callback(self: ScAgentAbstract, seconds: float) -> None:
+    time.sleep(seconds)
+
+
+class ScLoopMonitorTest(IsolatedAsyncioTestCase):
+    async def test_lag(self):
+        monitor = ScLoopMonitor(interval=0.01, threshold=None)
+        await monitor.start()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        self.assertFalse(monitor.is_running)
+        stats = monitor.stats()
+        self.assertGreater(stats["lag"]["count"], 0)
+        self.assertEqual(stats["stalls"], {})
+        self.assertEqual(monitor.stalls(), [])
+
+    async def test_stall(self):
+        agent = MagicMock(spec=ScAgentAbstract)
+        agent.logger = getLogger("agents.BlockingAgent")
+        monitor = ScLoopMonitor(interval=0.01, threshold=0.05)
+        await monitor.start()
+        try:
+            await asyncio.sleep(0.02)
+            with self.assertLogs("sc_async_kpm.sc_loop_monitor", "WARNING") as logs:
+                blocking_callback(agent, 0.3)
+                await asyncio.sleep(0.02)
+        finally:
+            await monitor.stop()
+        stall = monitor.stalls()[0]
+        self.assertGreaterEqual(stall.lag, 0.2)
+        self.assertEqual(stall.agent, "agents.BlockingAgent")
+        self.assertIn("blocking_callback", stall.stack)
+        self.assertIsNotNone(stall.task)
+        self.assertEqual(monitor.stats()["stalls"], {"agents.BlockingAgent": 1})
+        self.assertIn("agents.BlockingAgent", logs.output[0])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            ScLoopMonitor(interval=0)
+        with self.assertRaises(ValueError):
+            ScLoopMonitor(threshold=0)
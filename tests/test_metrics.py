@@ -0,0 +1,74 @@
+from unittest import TestCase
+
+from sc_async_kpm.metrics import Histogram, ScAgentMetrics, format_labels
+from sc_async_kpm.sc_result import ScResult
+
+
+class HistogramTests(TestCase):
+    def test_observe(self):
+        histogram = Histogram(buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+        self.assertEqual(
+            histogram.snapshot()["buckets"], {"0.1": 2, "1.0": 3, "+Inf": 4}
+        )
+
+    def test_quantile(self):
+        histogram = Histogram(buckets=(0.1, 1))
+        self.assertEqual(histogram.quantile(0.5), 0)
+        for value in (0.05, 0.05, 0.5, 2):
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.75), 1)
+        self.assertEqual(histogram.quantile(1), float("inf"))
+        with self.assertRaises(ValueError):
+            histogram.quantile(2)
+
+    def test_reset(self):
+        histogram = Histogram()
+        histogram.observe(1)
+        histogram.reset()
+        self.assertEqual(histogram.count, 0)
+        self.assertEqual(histogram.snapshot()["buckets"]["+Inf"], 0)
+
+
+class ScAgentMetricsTests(TestCase):
+    def setUp(self) -> None:
+        ScAgentMetrics.reset()
+
+    def tearDown(self) -> None:
+        ScAgentMetrics.reset()
+
+    def test_snapshot(self):
+        ScAgentMetrics.observe("agent", ScResult.OK, 0.002)
+        ScAgentMetrics.observe("agent", ScResult.SKIP, 0.0005)
+        ScAgentMetrics.observe("agent", ScResult.SKIP, 0.0005)
+        ScAgentMetrics.observe("agent", ScResult.ERROR, 0.02)
+        snapshot = ScAgentMetrics.snapshot()["agent"]
+        self.assertEqual(snapshot["results"], {"OK": 1, "SKIP": 2, "ERROR": 1})
+        self.assertEqual(snapshot["skip_rate"], 0.5)
+        self.assertEqual(snapshot["latency"]["count"], 4)
+        self.assertEqual(snapshot["p50"], 0.001)
+
+    def test_disabled(self):
+        ScAgentMetrics.enabled = False
+        self.addCleanup(setattr, ScAgentMetrics, "enabled", True)
+        ScAgentMetrics.observe("agent", ScResult.OK, 0.002)
+        self.assertEqual(ScAgentMetrics.snapshot(), {})
+
+    def test_prometheus(self):
+        ScAgentMetrics.observe('Agent("a")', ScResult.OK, 0.002)
+        text = ScAgentMetrics.to_prometheus()
+        agent = 'agent="Agent(\\"a\\")"'
+        self.assertIn("# TYPE sc_agent_callback_seconds histogram", text)
+        self.assertIn(f'sc_agent_callback_seconds_bucket{{{agent},le="0.0025"}} 1', text)
+        self.assertIn(f"sc_agent_callback_seconds_count{{{agent}}} 1", text)
+        self.assertIn(f'sc_agent_results_total{{{agent},result="OK"}} 1', text)
+        self.assertIn(f"sc_agent_skip_ratio{{{agent}}} 0.0", text)
+        self.assertTrue(text.endswith("\n"))
+
+    def test_format_labels(self):
+        self.assertEqual(format_labels({}), "")
+        self.assertEqual(format_labels({"a": "x\ny"}), '{a="x\\ny"}')
@@ -1,8 +1,20 @@
 from unittest import IsolatedAsyncioTestCase
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from sc_async_kpm.sc_agent import ScAgentAbstract
+from sc_async_client.constants.common import ScEventType
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm.sc_agent import ScAgent, ScAgentAbstract, ScRegistrationError
+from sc_async_kpm.sc_dispatcher import ScDispatcher
 from sc_async_kpm.sc_module import ScModule
+from sc_async_kpm.sc_result import ScResult
+from sc_async_kpm.sc_subscription_hub import ScSubscriptionHub
+
+
+# Concrete agent for testing, underscore to avoid pytest collection
+class _TestAgent(ScAgent):
+    async def on_event(self, *args, **kwargs) -> ScResult:
+        return ScResult.OK
 
 
 class ScModuleTest(IsolatedAsyncioTestCase):
@@ -52,6 +64,17 @@ class ScModuleTest(IsolatedAsyncioTestCase):
         self.agent1._register.assert_awaited_once()
         self.agent2._register.assert_awaited_once()
 
+    async def test_register_failure(self):
+        error = ConnectionError()
+        self.agent1._register.side_effect = error
+        module = ScModule(self.agent1, self.agent2)
+        with self.assertRaises(ScRegistrationError) as context:
+            await module._register()
+        self.assertEqual(context.exception.failures, {self.agent1: error})
+        self.agent2._register.assert_awaited_once()
+        # Registered agents are unregistered with the module
+        self.assertTrue(module._is_registered)
+
     async def test_register_empty(self):
         module = ScModule()
         await module._register()
@@ -64,3 +87,58 @@ class ScModuleTest(IsolatedAsyncioTestCase):
         self.assertFalse(module._is_registered)
         self.agent1._unregister.assert_awaited_once()
         self.agent2._unregister.assert_awaited_once()
+
+    async def test_dispatcher(self):
+        dispatcher = ScDispatcher(workers=2)
+        own_dispatcher = ScDispatcher(workers=1)
+        agent1 = await _TestAgent.create(ScAddr(1), ScEventType.AFTER_GENERATE_OUTGOING_ARC)
+        agent2 = await _TestAgent.create(ScAddr(2), ScEventType.AFTER_GENERATE_OUTGOING_ARC)
+        agent2.set_dispatcher(own_dispatcher)
+        module = ScModule(agent1, dispatcher=dispatcher)
+        self.assertIs(agent1.dispatcher, dispatcher)
+        await module.add_agent(agent2)
+        self.assertIs(agent2.dispatcher, own_dispatcher)
+        await module.remove_agent(agent1)
+        self.assertIsNone(agent1.dispatcher)
+
+    async def test_subscription_hub(self):
+        hub = ScSubscriptionHub()
+        agent1 = await _TestAgent.create(ScAddr(1), ScEventType.AFTER_GENERATE_OUTGOING_ARC)
+        agent2 = await _TestAgent.create(ScAddr(1), ScEventType.AFTER_GENERATE_OUTGOING_ARC)
+        module = ScModule(agent1, agent2, subscription_hub=hub)
+        self.assertIs(agent1.subscription_hub, hub)
+        with patch(
+            "sc_async_kpm.sc_subscription_hub.client", new_callable=MagicMock
+        ) as client_mock:
+            client_mock.create_elementary_event_subscriptions = AsyncMock(
+                return_value=[MagicMock()]
+            )
+            client_mock.destroy_elementary_event_subscriptions = AsyncMock()
+            await module._register()
+            client_mock.create_elementary_event_subscriptions.assert_awaited_once()
+            self.assertIs(agent1._event, agent2._event)
+            await module._unregister()
+            client_mock.destroy_elementary_event_subscriptions.assert_awaited_once()
+        await module.remove_agent(agent1)
+        self.assertIsNone(agent1.subscription_hub)
+
+    async def test_forget(self):
+        hub = ScSubscriptionHub()
+        agent1 = await _TestAgent.create(ScAddr(1), ScEventType.AFTER_GENERATE_OUTGOING_ARC)
+        agent2 = await _TestAgent.create(ScAddr(1), ScEventType.AFTER_GENERATE_OUTGOING_ARC)
+        module = ScModule(agent1, agent2, subscription_hub=hub)
+        with patch(
+            "sc_async_kpm.sc_subscription_hub.client", new_callable=MagicMock
+        ) as client_mock:
+            client_mock.create_elementary_event_subscriptions = AsyncMock(
+                return_value=[MagicMock()]
+            )
+            client_mock.destroy_elementary_event_subscriptions = AsyncMock()
+            await module._register()
+            await module._forget()
+            # Subscriptions of the old KB are dropped without requests
+            client_mock.destroy_elementary_event_subscriptions.assert_not_awaited()
+        self.assertFalse(module._is_registered)
+        self.assertFalse(agent1.is_registered)
+        self.assertFalse(agent2.is_registered)
+        self.assertEqual(hub.stats(), {"subscriptions": 0, "listeners": 0})
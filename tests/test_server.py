@@ -1,8 +1,12 @@
+import asyncio
+import os
+import signal
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from sc_async_kpm.sc_agent import ScRegistrationError
 from sc_async_kpm.sc_module import ScModuleAbstract
-from sc_async_kpm.sc_server import ScServer
+from sc_async_kpm.sc_server import ScKbChangedError, ScServer, ScServerAbstract
 
 
 @patch("sc_async_kpm.sc_server._IdentifiersResolver.resolve", new_callable=AsyncMock)
@@ -14,9 +18,11 @@ class ScServerTest(IsolatedAsyncioTestCase):
         self.module1 = MagicMock(spec=ScModuleAbstract)
         self.module1._register = AsyncMock()
         self.module1._unregister = AsyncMock()
+        self.module1._drain = AsyncMock(return_value={})
         self.module2 = MagicMock(spec=ScModuleAbstract)
         self.module2._register = AsyncMock()
         self.module2._unregister = AsyncMock()
+        self.module2._drain = AsyncMock(return_value={})
 
     async def test_connect_disconnect(
         self, client_mock: MagicMock, id_resolver_mock: AsyncMock
@@ -28,6 +34,72 @@ class ScServerTest(IsolatedAsyncioTestCase):
             id_resolver_mock.assert_awaited_once()
         client_mock.disconnect.assert_awaited_once()
 
+    async def test_connect_another_url(
+        self, client_mock: MagicMock, id_resolver_mock: AsyncMock
+    ):
+        client_mock.connect = AsyncMock()
+        client_mock.disconnect = AsyncMock()
+        client_mock.is_connected.return_value = True
+        other_server = ScServer("ws://replica:8090")
+        async with await self.server.connect():
+            with self.assertRaises(RuntimeError):
+                await other_server.connect()
+            client_mock.connect.assert_awaited_once_with(self.server_url)
+        async with await other_server.connect():
+            client_mock.connect.assert_awaited_with("ws://replica:8090")
+
+    @patch("sc_async_kpm.sc_server.ScKeynodes", new_callable=MagicMock)
+    async def test_connect_another_url_clears_keynodes(
+        self, keynodes_mock: MagicMock, client_mock: MagicMock, id_resolver_mock: AsyncMock
+    ):
+        client_mock.connect = AsyncMock()
+        client_mock.disconnect = AsyncMock()
+        client_mock.is_connected.return_value = False
+        async with await self.server.connect():
+            pass
+        keynodes_mock.cache.return_value.clear.reset_mock()
+        async with await self.server.connect():
+            keynodes_mock.cache.return_value.clear.assert_not_called()
+        async with await ScServer("ws://replica:8090").connect():
+            keynodes_mock.cache.return_value.clear.assert_called_once()
+
+    @patch("sc_async_kpm.sc_server.ScKeynodesSnapshot")
+    async def test_connect_with_keynodes_snapshot(
+        self,
+        snapshot_class_mock: MagicMock,
+        client_mock: MagicMock,
+        id_resolver_mock: AsyncMock,
+    ):
+        client_mock.connect = AsyncMock()
+        client_mock.disconnect = AsyncMock()
+        snapshot_mock = snapshot_class_mock.return_value
+        snapshot_mock.load = AsyncMock()
+        snapshot_mock.revalidate = AsyncMock()
+        server = ScServer(self.server_url, keynodes_snapshot_path="keynodes.json")
+        snapshot_class_mock.assert_called_once_with("keynodes.json")
+        async with await server.connect():
+            snapshot_mock.load.assert_awaited_once_with(self.server_url)
+            id_resolver_mock.assert_awaited_once()
+        snapshot_mock.revalidate.assert_awaited_once()
+        snapshot_mock.save.assert_called_once_with(self.server_url)
+        client_mock.disconnect.assert_awaited_once()
+
+    @patch("sc_async_kpm.sc_server.ScKeynodes", new_callable=MagicMock)
+    async def test_connect_with_keynodes_invalidation(
+        self,
+        keynodes_mock: MagicMock,
+        client_mock: MagicMock,
+        id_resolver_mock: AsyncMock,
+    ):
+        client_mock.connect = AsyncMock()
+        client_mock.disconnect = AsyncMock()
+        keynodes_mock.enable_invalidation = AsyncMock()
+        keynodes_mock.disable_invalidation = AsyncMock()
+        server = ScServer(self.server_url, keynodes_invalidation=True)
+        async with await server.connect():
+            keynodes_mock.enable_invalidation.assert_awaited_once()
+        keynodes_mock.disable_invalidation.assert_awaited_once()
+
     async def test_add_modules(
         self, client_mock: MagicMock, id_resolver_mock: AsyncMock
     ):
@@ -112,9 +184,23 @@ class ScServerTest(IsolatedAsyncioTestCase):
             client_mock.connect.assert_awaited_once_with(self.server_url)
             id_resolver_mock.assert_awaited_once()
             self.module1._register.assert_awaited_once()
+        self.module1._drain.assert_not_awaited()
         self.module1._unregister.assert_awaited_once()
         client_mock.disconnect.assert_awaited_once()
 
+    async def test_start_stop_with_drain(
+        self, client_mock: MagicMock, id_resolver_mock: AsyncMock
+    ):
+        client_mock.is_connected.return_value = True
+        client_mock.connect = AsyncMock()
+        client_mock.disconnect = AsyncMock()
+        server = ScServer(self.server_url, drain=True, drain_timeout=10)
+        await server.add_modules(self.module1)
+        async with await server.start():
+            pass
+        self.module1._drain.assert_awaited_once_with(10)
+        self.module1._unregister.assert_awaited_once()
+
     async def test_register_connection_error(
         self, client_mock: MagicMock, id_resolver_mock: AsyncMock
     ):
@@ -140,3 +226,231 @@ class ScServerTest(IsolatedAsyncioTestCase):
         self.server._modules.add("not a module")
         with self.assertRaises(TypeError):
             await self.server.register_modules()
+
+    async def test_shard(self, client_mock: MagicMock, id_resolver_mock: AsyncMock):
+        module3 = MagicMock(spec=ScModuleAbstract)
+        await self.server.add_modules(self.module1, self.module2, module3)
+        shards = [self.server.shard(index, 2) for index in range(2)]
+        self.assertEqual([len(shard) for shard in shards], [2, 1])
+        self.assertEqual({*shards[0], *shards[1]}, {self.module1, self.module2, module3})
+        self.assertEqual(self.server.shard(0, 2), shards[0])
+
+    async def test_serve_workers_connected(
+        self, client_mock: MagicMock, id_resolver_mock: AsyncMock
+    ):
+        client_mock.is_connected.return_value = True
+        await self.server.add_modules(self.module1)
+        with self.assertRaises(RuntimeError):
+            await self.server.serve(workers=2)
+
+    @patch("sc_async_kpm.sc_server.ScSupervisor")
+    async def test_serve_workers(
+        self, supervisor_class_mock: MagicMock, client_mock: MagicMock, id_resolver_mock: AsyncMock
+    ):
+        client_mock.is_connected.return_value = False
+        client_mock.connect = AsyncMock()
+        client_mock.disconnect = AsyncMock()
+        supervisor_class_mock.return_value.run = AsyncMock()
+        await self.server.add_modules(self.module1, self.module2)
+        await self.server.serve(workers=4, report_interval=1)
+        # Keynodes are resolved once by the supervisor before forking
+        client_mock.connect.assert_awaited_once_with(self.server_url)
+        client_mock.disconnect.assert_awaited_once()
+        _, workers, report_interval = supervisor_class_mock.call_args.args
+        self.assertEqual((workers, report_interval), (2, 1))
+        supervisor_class_mock.return_value.run.assert_awaited_once()
+        self.assertIsNone(self.server.supervisor)
+
+    @patch("sc_async_kpm.sc_server.ScHttpEndpoint")
+    async def test_serve_http(
+        self, endpoint_class_mock: MagicMock, client_mock: MagicMock, id_resolver_mock: AsyncMock
+    ):
+        endpoint_mock = endpoint_class_mock.return_value
+        endpoint_mock.__aenter__ = AsyncMock()
+        endpoint_mock.__aexit__ = AsyncMock()
+        with patch.object(self.server, "_wait_for_signal", new_callable=AsyncMock) as wait_mock:
+            await self.server.serve(http_port=9090)
+        endpoint_class_mock.assert_called_once_with(self.server, "0.0.0.0", 9090)
+        wait_mock.assert_awaited_once()
+        endpoint_mock.__aexit__.assert_awaited_once()
+
+    async def test_serve_sigterm(self, client_mock: MagicMock, id_resolver_mock: AsyncMock):
+        serve_task = asyncio.create_task(self.server.serve())
+        await asyncio.sleep(0.01)
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.wait_for(serve_task, timeout=1)
+
+    async def test_health(self, client_mock: MagicMock, id_resolver_mock: AsyncMock):
+        client_mock.is_connected.return_value = True
+        await self.server.add_modules(self.module1)
+        self.assertFalse(self.server.is_ready)
+        await self.server.register_modules()
+        self.assertTrue(self.server.is_ready)
+        self.assertEqual(
+            self.server.health(),
+            {
+                "connected": True,
+                "registered": True,
+                "ready": True,
+                "modules": {repr(self.module1): None},
+            },
+        )
+        await self.server.drain()
+        self.assertFalse(self.server.is_ready)
+
+    def test_abstract_methods(self, client_mock: MagicMock, id_resolver_mock: AsyncMock):
+        self.assertIn("stop", ScServerAbstract.__abstractmethods__)
+        self.assertNotIn("_finish_startup_profile", ScServerAbstract.__abstractmethods__)
+
+    async def test_startup_profile(self, client_mock: MagicMock, id_resolver_mock: AsyncMock):
+        self.mock_connection(client_mock)
+        await self.server.add_modules(self.module1)
+        with self.assertLogs("sc_async_kpm.sc_server", "INFO") as logs:
+            await self.server.start()
+        profile = self.server.startup_profile
+        self.assertFalse(profile.is_recording)
+        self.assertEqual(
+            [phase.name for phase in profile.phases],
+            ["connect", "resolve identifiers", "register modules"],
+        )
+        self.assertEqual(
+            profile.phases[2].phases[0].name, f"register {repr(self.module1)}"
+        )
+        self.assertIn("imports", profile.to_dict())
+        self.assertEqual(sum("Startup profile" in line for line in logs.output), 1)
+        await self.server.stop()
+        self.assertIs(self.server.startup_profile, profile)
+
+    async def test_register_failure(self, client_mock: MagicMock, id_resolver_mock: AsyncMock):
+        client_mock.is_connected.return_value = True
+        error = ConnectionError()
+        self.module1._register.side_effect = ScRegistrationError({"agent": error})
+        await self.server.add_modules(self.module1, self.module2)
+        with self.assertRaises(ScRegistrationError) as context:
+            await self.server.register_modules()
+        self.assertEqual(context.exception.failures, {"agent": error})
+        self.assertFalse(self.server.is_registered)
+        # Modules are registered all or nothing
+        self.module1._unregister.assert_awaited_once()
+        self.module2._unregister.assert_awaited_once()
+
+    def mock_connection(self, client_mock: MagicMock) -> dict:
+        state = {"connected": False}
+        client_mock.is_connected.side_effect = lambda: state["connected"]
+        client_mock.connect = AsyncMock(side_effect=lambda url: state.update(connected=True))
+        client_mock.disconnect = AsyncMock(side_effect=lambda: state.update(connected=False))
+        return state
+
+    async def wait_reconnects(self, server: ScServer, count: int) -> None:
+        for _ in range(500):
+            if server.connection_stats()["reconnects"] == count:
+                return
+            await asyncio.sleep(0.01)
+        self.fail("Server didn't reconnect")
+
+    @patch("sc_async_kpm.sc_server.ScActionClassIndex.resubscribe", new_callable=AsyncMock)
+    @patch("sc_async_kpm.sc_server.ScKeynodes", new_callable=MagicMock)
+    @patch("sc_async_kpm.sc_server.get_kb_fingerprint", new_callable=AsyncMock)
+    async def test_reconnect(
+        self,
+        fingerprint_mock: AsyncMock,
+        keynodes_mock: MagicMock,
+        index_resubscribe_mock: AsyncMock,
+        client_mock: MagicMock,
+        id_resolver_mock: AsyncMock,
+    ):
+        state = self.mock_connection(client_mock)
+        fingerprint_mock.return_value = 42
+        keynodes_mock.resubscribe = AsyncMock()
+        keynodes_mock.revalidate = AsyncMock()
+        server = ScServer(self.server_url, reconnect=True, reconnect_delay=0.01)
+        server.connection_check_interval = 0.01
+        await server.add_modules(self.module1)
+        async with await server.start():
+            attempts = []
+
+            def connect(url: str) -> None:
+                attempts.append(url)
+                if len(attempts) == 1:
+                    raise ConnectionError()
+                state["connected"] = True
+
+            client_mock.connect.side_effect = connect
+            state["connected"] = False
+            await self.wait_reconnects(server, 1)
+            self.assertEqual(client_mock.connect.await_count, 3)
+            # The same KB keeps the cache of keynodes
+            keynodes_mock.resubscribe.assert_awaited_once()
+            keynodes_mock.revalidate.assert_awaited_once()
+            id_resolver_mock.assert_awaited_once()
+            index_resubscribe_mock.assert_awaited_once()
+            self.module1._resubscribe.assert_awaited_once()
+            stats = server.connection_stats()
+            self.assertGreater(stats["seconds_without_subscriptions"], 0)
+        self.assertIsNone(server._watchdog)
+
+    @patch("sc_async_kpm.sc_server.ScActionClassIndex.resubscribe", new_callable=AsyncMock)
+    @patch("sc_async_kpm.sc_server.ScKeynodes", new_callable=MagicMock)
+    @patch("sc_async_kpm.sc_server.get_kb_fingerprint", new_callable=AsyncMock)
+    async def test_reconnect_another_kb(
+        self,
+        fingerprint_mock: AsyncMock,
+        keynodes_mock: MagicMock,
+        index_resubscribe_mock: AsyncMock,
+        client_mock: MagicMock,
+        id_resolver_mock: AsyncMock,
+    ):
+        state = self.mock_connection(client_mock)
+        fingerprint_mock.side_effect = [42, 43]
+        keynodes_mock.resubscribe = AsyncMock()
+        failures = []
+        server = ScServer(
+            self.server_url, reconnect=True, reconnect_delay=0.01, on_failure=failures.append
+        )
+        server.connection_check_interval = 0.01
+        await server.add_modules(self.module1)
+        async with await server.start():
+            state["connected"] = False
+            with self.assertRaises(ScKbChangedError):
+                await asyncio.wait_for(server.serve(), 5)
+            # Agents keep addresses of the old KB, so nothing is restored
+            keynodes_mock.resubscribe.assert_not_awaited()
+            index_resubscribe_mock.assert_not_awaited()
+            self.module1._resubscribe.assert_not_awaited()
+            id_resolver_mock.assert_awaited_once()
+            # Agents, the action class index and keynodes of the old KB are forgotten
+            self.module1._forget.assert_awaited_once()
+            keynodes_mock.cache.return_value.clear.assert_called_once()
+            self.assertEqual(len(failures), 1)
+            self.assertIs(server.failure, failures[0])
+            self.assertFalse(state["connected"])
+            self.assertFalse(server.is_registered)
+            self.assertFalse(server.is_ready)
+        self.module1._unregister.assert_not_awaited()
+
+    @patch("sc_async_kpm.sc_server.ScKeynodes", new_callable=MagicMock)
+    @patch("sc_async_kpm.sc_server.get_kb_fingerprint", new_callable=AsyncMock)
+    async def test_reconnect_another_kb_without_serve(
+        self,
+        fingerprint_mock: AsyncMock,
+        keynodes_mock: MagicMock,
+        client_mock: MagicMock,
+        id_resolver_mock: AsyncMock,
+    ):
+        state = self.mock_connection(client_mock)
+        fingerprint_mock.side_effect = [42, 43]
+        failure = asyncio.get_running_loop().create_future()
+        server = ScServer(
+            self.server_url,
+            reconnect=True,
+            reconnect_delay=0.01,
+            on_failure=failure.set_result,
+        )
+        server.connection_check_interval = 0.01
+        async with await server.connect():
+            state["connected"] = False
+            self.assertIsInstance(await asyncio.wait_for(failure, 5), ScKbChangedError)
+            # The watchdog finishes without an error nobody retrieves
+            watchdog = server._watchdog
+            await asyncio.wait_for(watchdog, 5)
+            self.assertIsNone(watchdog.exception())
@@ -0,0 +1,54 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from sc_async_client import client
+
+from sc_async_kpm.import_time import get_import_times
+from sc_async_kpm.sc_startup import ScStartupProfile, in_startup_phase, startup_phase
+from sc_async_kpm.tracing import traced_call
+
+
+class ScStartupProfileTest(IsolatedAsyncioTestCase):
+    @patch("sc_async_client.client.search_by_template", new_callable=AsyncMock)
+    async def test_phases(self, search_mock: AsyncMock):
+        profile = ScStartupProfile()
+        profile.begin()
+        try:
+            with startup_phase("connect"):
+                await traced_call(client.search_by_template)
+            with startup_phase("register"):
+                await asyncio.gather(
+                    in_startup_phase("module1", traced_call(client.search_by_template)),
+                    in_startup_phase("module2", traced_call(client.search_by_template)),
+                )
+                await traced_call(client.search_by_template)
+        finally:
+            profile.finish()
+        self.assertFalse(profile.is_recording)
+        self.assertIs(client.search_by_template, search_mock)
+        connect, register = profile.phases
+        self.assertEqual((connect.name, connect.round_trips), ("connect", 1))
+        self.assertEqual((register.name, register.round_trips), ("register", 3))
+        self.assertEqual(
+            [(phase.name, phase.round_trips) for phase in register.phases],
+            [("module1", 1), ("module2", 1)],
+        )
+        result = profile.to_dict()
+        self.assertEqual(result["round_trips"], 4)
+        self.assertIn("sc_async_client", result["imports"])
+        self.assertEqual(result["phases"][1]["phases"][0]["name"], "module1")
+        self.assertIn("\n    module2: ", profile.format())
+
+    @patch("sc_async_client.client.search_by_template", new_callable=AsyncMock)
+    async def test_not_recording(self, search_mock: AsyncMock):
+        with startup_phase("connect") as phase:
+            self.assertIsNone(phase)
+            await traced_call(client.search_by_template)
+        profile = ScStartupProfile()
+        profile.finish()
+        self.assertEqual(profile.to_dict()["round_trips"], 0)
+
+    def test_import_times(self):
+        import_times = get_import_times()
+        self.assertGreater(import_times["sc_async_kpm"], import_times["sc_async_client"])
@@ -0,0 +1,95 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sc_async_client.constants.common import ScEventType
+from sc_async_client.models import ScAddr
+
+from sc_async_kpm.sc_result import ScResult
+from sc_async_kpm.sc_subscription_hub import ScSubscriptionHub
+
+
+@patch("sc_async_kpm.sc_subscription_hub.client", new_callable=MagicMock)
+class ScSubscriptionHubTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.hub = ScSubscriptionHub()
+        self.event_type = ScEventType.AFTER_GENERATE_OUTGOING_ARC
+
+    def mock_client(self, client_mock: MagicMock) -> None:
+        client_mock.create_elementary_event_subscriptions = AsyncMock(
+            side_effect=lambda *params: [MagicMock(callback=params[0].callback)]
+        )
+        client_mock.destroy_elementary_event_subscriptions = AsyncMock()
+
+    async def test_shared_subscription(self, client_mock: MagicMock):
+        self.mock_client(client_mock)
+        listener_1 = AsyncMock(return_value=ScResult.SKIP)
+        listener_2 = AsyncMock(return_value=ScResult.OK)
+        event_1, event_2 = await asyncio.gather(
+            self.hub.subscribe(ScAddr(1), self.event_type, listener_1),
+            self.hub.subscribe(ScAddr(1), self.event_type, listener_2),
+        )
+        self.assertIs(event_1, event_2)
+        client_mock.create_elementary_event_subscriptions.assert_awaited_once()
+        self.assertEqual(self.hub.stats(), {"subscriptions": 1, "listeners": 2})
+
+        result = await event_1.callback(ScAddr(1), ScAddr(2), ScAddr(3))
+        self.assertEqual(result, ScResult.OK)
+        listener_1.assert_awaited_once_with(ScAddr(1), ScAddr(2), ScAddr(3))
+        listener_2.assert_awaited_once_with(ScAddr(1), ScAddr(2), ScAddr(3))
+
+        await self.hub.unsubscribe(ScAddr(1), self.event_type, listener_1)
+        client_mock.destroy_elementary_event_subscriptions.assert_not_awaited()
+        await self.hub.unsubscribe(ScAddr(1), self.event_type, listener_2)
+        client_mock.destroy_elementary_event_subscriptions.assert_awaited_once_with(event_1)
+        self.assertEqual(self.hub.stats(), {"subscriptions": 0, "listeners": 0})
+
+    async def test_distinct_pairs(self, client_mock: MagicMock):
+        self.mock_client(client_mock)
+        listener = AsyncMock(return_value=ScResult.OK)
+        await self.hub.subscribe(ScAddr(1), self.event_type, listener)
+        await self.hub.subscribe(ScAddr(2), self.event_type, listener)
+        await self.hub.subscribe(ScAddr(1), ScEventType.AFTER_GENERATE_INCOMING_ARC, listener)
+        self.assertEqual(client_mock.create_elementary_event_subscriptions.await_count, 3)
+
+    async def test_listener_error(self, client_mock: MagicMock):
+        self.mock_client(client_mock)
+        listener_1 = AsyncMock(side_effect=RuntimeError("listener error"))
+        listener_2 = AsyncMock(return_value=ScResult.SKIP)
+        event = await self.hub.subscribe(ScAddr(1), self.event_type, listener_1)
+        await self.hub.subscribe(ScAddr(1), self.event_type, listener_2)
+        result = await event.callback(ScAddr(1), ScAddr(2), ScAddr(3))
+        self.assertEqual(result, ScResult.ERROR)
+        listener_2.assert_awaited_once()
+
+    async def test_subscription_error(self, client_mock: MagicMock):
+        client_mock.create_elementary_event_subscriptions = AsyncMock(
+            side_effect=ConnectionError()
+        )
+        with self.assertRaises(ConnectionError):
+            await self.hub.subscribe(ScAddr(1), self.event_type, AsyncMock())
+        self.assertEqual(self.hub.stats(), {"subscriptions": 0, "listeners": 0})
+
+    async def test_unsubscribe_unknown(self, client_mock: MagicMock):
+        self.mock_client(client_mock)
+        await self.hub.unsubscribe(ScAddr(1), self.event_type, AsyncMock())
+        client_mock.destroy_elementary_event_subscriptions.assert_not_awaited()
+
+    async def test_resubscribe(self, client_mock: MagicMock):
+        self.mock_client(client_mock)
+        listener = AsyncMock(return_value=ScResult.OK)
+        event_1 = await self.hub.subscribe(ScAddr(1), self.event_type, listener)
+        await self.hub.subscribe(ScAddr(2), self.event_type, listener)
+        client_mock.create_elementary_event_subscriptions.reset_mock()
+        await self.hub.resubscribe()
+        # All shared subscriptions are created again with one request
+        client_mock.create_elementary_event_subscriptions.assert_awaited_once()
+        self.assertEqual(
+            len(client_mock.create_elementary_event_subscriptions.await_args.args), 2
+        )
+        await self.hub.unsubscribe(ScAddr(1), self.event_type, listener)
+        destroyed = client_mock.destroy_elementary_event_subscriptions.await_args.args[0]
+        self.assertIsNot(destroyed, event_1)
+        self.assertEqual(
+            await destroyed.callback(ScAddr(1), ScAddr(2), ScAddr(3)), ScResult.SKIP
+        )
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import signal
+from multiprocessing.connection import Connection
+from unittest import IsolatedAsyncioTestCase
+
+from sc_async_kpm.sc_supervisor import ScSupervisor
+
+
+def report_and_wait(index: int, count: int, reports: Connection) -> None:
+    reports.send({"index": index, "count": count, "pid": os.getpid()})
+    signal.pause()
+
+
+def fail_second(index: int, count: int, reports: Connection) -> None:
+    if index == 1:
+        raise RuntimeError("worker error")
+    report_and_wait(index, count, reports)
+
+
+class ScSupervisorTest(IsolatedAsyncioTestCase):
+    async def wait_reports(self, supervisor: ScSupervisor, count: int) -> None:
+        for _ in range(500):
+            health = supervisor.health()
+            if len(health) == count and all(worker["report"] for worker in health.values()):
+                return
+            await asyncio.sleep(0.01)
+        self.fail("Workers didn't report")
+
+    async def test_run_and_stop(self):
+        supervisor = ScSupervisor(report_and_wait, 2, report_interval=0.1, shutdown_timeout=5)
+        task = asyncio.create_task(supervisor.run())
+        await self.wait_reports(supervisor, 2)
+        health = supervisor.health()
+        self.assertEqual([health[i]["report"]["index"] for i in range(2)], [0, 1])
+        self.assertEqual(health[0]["report"]["pid"], health[0]["pid"])
+        self.assertNotEqual(health[0]["pid"], os.getpid())
+        supervisor.stop()
+        await asyncio.wait_for(task, 5)
+        self.assertFalse(any(worker["alive"] for worker in supervisor.health().values()))
+
+    async def test_worker_failure(self):
+        supervisor = ScSupervisor(fail_second, 2, report_interval=0.1, shutdown_timeout=5)
+        with self.assertRaises(ChildProcessError):
+            await asyncio.wait_for(supervisor.run(), 5)
+        health = supervisor.health()
+        self.assertEqual(health[1]["exitcode"], 1)
+        self.assertFalse(health[0]["alive"])
+
+    def test_invalid_workers(self):
+        with self.assertRaises(ValueError):
+            ScSupervisor(report_and_wait, 0)
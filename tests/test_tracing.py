@@ -0,0 +1,72 @@
+import asyncio
+import io
+import json
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from sc_async_client import client
+
+from sc_async_kpm.tracing import ScTracer, traced_call
+from sc_async_kpm.utils.common_utils import get_link_content_data
+
+
+class ScTracerTest(IsolatedAsyncioTestCase):
+    def tearDown(self) -> None:
+        ScTracer.disable()
+        ScTracer.dump(io.StringIO())
+
+    @patch("sc_async_client.client.search_by_template", new_callable=AsyncMock)
+    async def test_span(self, search_mock: AsyncMock):
+        ScTracer.enable()
+        with ScTracer.span("agent") as span:
+            await traced_call(client.search_by_template, "template", [1, 2])
+            await asyncio.gather(
+                traced_call(client.search_by_template, "template"), asyncio.sleep(0)
+            )
+        await traced_call(client.search_by_template, "template")
+        ScTracer.disable()
+        self.assertIs(client.search_by_template, search_mock)
+        self.assertEqual(search_mock.await_count, 3)
+        self.assertEqual(ScTracer.spans(), [span])
+        self.assertEqual(len(span.calls), 2)
+        self.assertEqual([call.items for call in span.calls], [3, 1])
+
+    async def test_disabled(self):
+        with ScTracer.span("agent") as span:
+            self.assertIsNone(span)
+        self.assertEqual(ScTracer.spans(), [])
+
+    @patch("sc_async_kpm.utils.common_utils.client")
+    async def test_library_calls(self, client_mock):
+        client_mock.get_link_content = AsyncMock(return_value=[AsyncMock(data="content")])
+        ScTracer.enable()
+        with ScTracer.span("agent") as span:
+            self.assertEqual(await get_link_content_data(1), "content")
+        self.assertEqual(len(span.calls), 1)
+
+    @patch("sc_async_client.client.get_link_content", new_callable=AsyncMock)
+    async def test_round_trips_warning(self, _):
+        ScTracer.enable(max_round_trips=1)
+        with self.assertLogs("sc_async_kpm.tracing.ScTracer", "WARNING"):
+            with ScTracer.span("agent"):
+                await traced_call(client.get_link_content, 1)
+                await traced_call(client.get_link_content, 2)
+        ScTracer.disable()
+
+    async def test_dump(self):
+        async def get_link_content(*_):
+            return []
+
+        ScTracer.enable()
+        for name in ("agent_1", "agent_2"):
+            with ScTracer.span(name):
+                await traced_call(get_link_content, 1)
+        ScTracer.disable()
+        output = io.StringIO()
+        self.assertEqual(ScTracer.dump(output), 2)
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([line["name"] for line in lines], ["agent_1", "agent_2"])
+        self.assertEqual(lines[0]["round_trips"], 1)
+        self.assertEqual(lines[0]["calls"][0]["operation"], "get_link_content")
+        self.assertEqual(lines[0]["calls"][0]["items"], 1)
+        self.assertEqual(ScTracer.spans(), [])
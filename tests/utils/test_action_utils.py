@@ -28,16 +28,22 @@ class TestActionUtils(IsolatedAsyncioTestCase):
     ):
         keynodes_mock.get_by_idtf = AsyncMock(return_value=ScAddr(10))
         search_mock.return_value = [ScTemplateResult([], 0)]
-        self.assertTrue(await check_action_class("action_class", ScAddr(2)))
-        search_mock.return_value = []
-        self.assertFalse(await check_action_class("action_class", ScAddr(2)))
+        with patch(
+            "sc_async_kpm.utils.action_utils.CommonKeynodes", new_callable=MagicMock
+        ) as common_mock:
+            common_mock.ACTION = ScAddr(11)
+            common_mock.find.return_value = None
+            self.assertTrue(await check_action_class("action_class", ScAddr(2)))
+            search_mock.return_value = []
+            self.assertFalse(await check_action_class("action_class", ScAddr(2)))
+            keynodes_mock.get_by_idtf.assert_awaited_with("action_class")
 
     async def test_get_action_arguments(
         self, keynodes_mock: MagicMock, search_mock: AsyncMock
     ):
         rrel_1, rrel_2 = ScAddr(101), ScAddr(102)
         arg1, arg2 = ScAddr(201), ScAddr(202)
-        keynodes_mock.rrel_index = AsyncMock(side_effect=[rrel_1, rrel_2])
+        keynodes_mock.prefetch_rrel = AsyncMock(return_value=[rrel_1, rrel_2])
         with patch(
             "sc_async_kpm.utils.action_utils.search_element_by_role_relation",
             new_callable=AsyncMock,
@@ -46,18 +52,21 @@ class TestActionUtils(IsolatedAsyncioTestCase):
             args = await get_action_arguments(ScAddr(1), 2)
             self.assertEqual(args, [arg1, arg2])
             self.assertEqual(search_elem_mock.call_count, 2)
+            keynodes_mock.prefetch_rrel.assert_awaited_once_with(1, 2)
 
     async def test_generate_action_result(
         self, keynodes_mock: MagicMock, search_mock: AsyncMock
     ):
         nrel_result = ScAddr(301)
-        keynodes_mock.get_by_idtf = AsyncMock(return_value=nrel_result)
         with patch(
+            "sc_async_kpm.utils.action_utils.CommonKeynodes", new_callable=MagicMock
+        ) as common_mock, patch(
             "sc_async_kpm.utils.action_utils.ScStructure.create", new_callable=AsyncMock
         ) as create_struct_mock, patch(
             "sc_async_kpm.utils.action_utils.generate_non_role_relation",
             new_callable=AsyncMock,
         ) as gen_rel_mock:
+            common_mock.NREL_RESULT = nrel_result
             struct_mock = MagicMock()
             struct_node = ScAddr(401)
             struct_mock.set_node = struct_node
@@ -74,11 +83,11 @@ class TestActionUtils(IsolatedAsyncioTestCase):
         self, keynodes_mock: MagicMock, search_mock: AsyncMock
     ):
         result_node = ScAddr(401)
-        keynodes_mock.get_by_idtf = AsyncMock()
         search_mock.return_value = [MagicMock(get=MagicMock(return_value=result_node))]
-        self.assertEqual(await get_action_result(ScAddr(1)), result_node)
-        search_mock.return_value = []
-        self.assertEqual(await get_action_result(ScAddr(1)), ScAddr(0))
+        with patch("sc_async_kpm.utils.action_utils.CommonKeynodes", new_callable=MagicMock):
+            self.assertEqual(await get_action_result(ScAddr(1)), result_node)
+            search_mock.return_value = []
+            self.assertEqual(await get_action_result(ScAddr(1)), ScAddr(0))
 
     async def test_generate_action(
         self, keynodes_mock: MagicMock, search_mock: AsyncMock
@@ -101,10 +110,11 @@ class TestActionUtils(IsolatedAsyncioTestCase):
     ):
         rrel_dynamic = ScAddr(100)
         rrel_1, rrel_2 = ScAddr(101), ScAddr(102)
-        keynodes_mock.get_by_idtf = AsyncMock(return_value=rrel_dynamic)
-        keynodes_mock.rrel_index = AsyncMock(side_effect=[rrel_1, rrel_2])
+        keynodes_mock.prefetch_rrel = AsyncMock(return_value=[rrel_1, rrel_2])
 
         with patch(
+            "sc_async_kpm.utils.action_utils.CommonKeynodes", new_callable=MagicMock
+        ) as common_mock, patch(
             "sc_async_kpm.utils.action_utils.generate_node", new_callable=AsyncMock
         ) as gen_node_mock, patch(
             "sc_async_kpm.utils.action_utils.generate_role_relation",
@@ -112,6 +122,7 @@ class TestActionUtils(IsolatedAsyncioTestCase):
         ) as gen_role_mock, patch(
             "sc_async_kpm.utils.action_utils.generate_connector", new_callable=AsyncMock
         ) as gen_conn_mock:
+            common_mock.RREL_DYNAMIC_ARGUMENT = rrel_dynamic
             dynamic_node = ScAddr(500)
             gen_node_mock.return_value = dynamic_node
 
@@ -123,6 +134,7 @@ class TestActionUtils(IsolatedAsyncioTestCase):
 
             gen_node_mock.assert_awaited_once_with(sc_type.CONST_NODE)
             self.assertEqual(gen_role_mock.call_count, 2)
+            gen_role_mock.assert_any_await(action_node, arg2, rrel_2)
             gen_conn_mock.assert_awaited_once_with(
                 sc_type.CONST_TEMP_POS_ARC, dynamic_node, arg1
             )
@@ -148,6 +160,8 @@ class TestActionUtils(IsolatedAsyncioTestCase):
         status_node = ScAddr(10)
         keynodes_mock.get_by_idtf = AsyncMock(return_value=status_node)
         with patch(
+            "sc_async_kpm.utils.action_utils.CommonKeynodes.find", return_value=None
+        ), patch(
             "sc_async_kpm.utils.action_utils.generate_connector", new_callable=AsyncMock
         ) as gen_conn_mock:
             arc = ScAddr(11)
@@ -162,6 +176,22 @@ class TestActionUtils(IsolatedAsyncioTestCase):
                 sc_type.CONST_PERM_POS_ARC, status_node, action_node
             )
 
+    async def test_finish_action_with_loaded_status(
+        self, keynodes_mock: MagicMock, search_mock: AsyncMock
+    ):
+        status_node = ScAddr(10)
+        keynodes_mock.get_by_idtf = AsyncMock()
+        with patch(
+            "sc_async_kpm.utils.action_utils.CommonKeynodes.find", return_value=status_node
+        ) as find_mock, patch(
+            "sc_async_kpm.utils.action_utils.generate_connector", new_callable=AsyncMock
+        ) as gen_conn_mock:
+            action_node = ScAddr(1)
+            await finish_action(action_node, ActionStatus.ACTION_FINISHED)
+            find_mock.assert_called_once_with(ActionStatus.ACTION_FINISHED)
+            keynodes_mock.get_by_idtf.assert_not_awaited()
+            self.assertEqual(gen_conn_mock.await_args.args[1:], (status_node, action_node))
+
     async def test_finish_action_with_status(
         self, keynodes_mock: MagicMock, search_mock: AsyncMock
     ):
@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 from sc_async_client.constants import sc_type
 from sc_async_client.models import ScAddr, ScLinkContent
 
+from sc_async_kpm.sc_keynodes import ScKeynodes
 from sc_async_kpm.utils.common_utils import (
     check_connector,
     erase_connectors,
@@ -14,6 +15,7 @@ from sc_async_kpm.utils.common_utils import (
     generate_non_role_relation,
     generate_role_relation,
     get_element_system_identifier,
+    get_elements_system_identifiers,
     get_link_content_data,
     search_connector,
     search_element_by_non_role_relation,
@@ -98,12 +100,11 @@ class TestCommonUtils(IsolatedAsyncioTestCase):
             ScAddr(0),
         )
 
-    @patch("sc_async_kpm.utils.common_utils.ScKeynodes", new_callable=MagicMock)
+    @patch("sc_async_kpm.utils.common_utils.CommonKeynodes", new_callable=MagicMock)
     async def test_get_element_system_identifier(
         self, keynodes_mock: MagicMock, client_mock: MagicMock
     ):
-        nrel_sys_idtf = ScAddr(10)
-        keynodes_mock.get_by_idtf = AsyncMock(return_value=nrel_sys_idtf)
+        keynodes_mock.NREL_SYSTEM_IDENTIFIER = ScAddr(10)
         link_addr = ScAddr(20)
         idtf = "test_idtf"
         client_mock.search_by_template = AsyncMock(
@@ -111,13 +112,55 @@ class TestCommonUtils(IsolatedAsyncioTestCase):
         )
         client_mock.get_link_content = AsyncMock(return_value=[ScLinkContent(idtf, 0)])
 
-        result = await get_element_system_identifier(ScAddr(1))
+        ScKeynodes.set_idtf_cache_size(16)
+        self.addCleanup(ScKeynodes.set_idtf_cache_size, 0)
+        result = await get_element_system_identifier(ScAddr(7001))
         self.assertEqual(result, idtf)
 
+        # Identifier is cached
+        result = await get_element_system_identifier(ScAddr(7001))
+        self.assertEqual(result, idtf)
+        client_mock.search_by_template.assert_awaited_once()
+
         client_mock.search_by_template.return_value = []
-        result = await get_element_system_identifier(ScAddr(1))
+        result = await get_element_system_identifier(ScAddr(7002))
         self.assertEqual(result, "")
 
+    @patch("sc_async_kpm.utils.common_utils.CommonKeynodes", new_callable=MagicMock)
+    async def test_get_elements_system_identifiers(
+        self, keynodes_mock: MagicMock, client_mock: MagicMock
+    ):
+        keynodes_mock.NREL_SYSTEM_IDENTIFIER = ScAddr(10)
+        found = MagicMock(get=MagicMock(return_value=ScAddr(20)))
+        client_mock.search_by_template = AsyncMock(return_value=[found])
+        client_mock.get_link_content = AsyncMock(
+            return_value=[ScLinkContent("idtf_1", 0), ScLinkContent("idtf_2", 0)]
+        )
+        addr_1, addr_2 = ScAddr(7021), ScAddr(7022)
+        result = await get_elements_system_identifiers(addr_1, addr_2, addr_1)
+        self.assertEqual(result, ["idtf_1", "idtf_2", "idtf_1"])
+        # Links of all elements are searched with one template
+        client_mock.search_by_template.assert_awaited_once()
+        client_mock.get_link_content.assert_awaited_once()
+
+    @patch("sc_async_kpm.utils.common_utils.CommonKeynodes", new_callable=MagicMock)
+    async def test_get_elements_system_identifiers_without_some(
+        self, keynodes_mock: MagicMock, client_mock: MagicMock
+    ):
+        keynodes_mock.NREL_SYSTEM_IDENTIFIER = ScAddr(10)
+        found = MagicMock(get=MagicMock(return_value=ScAddr(20)))
+        client_mock.search_by_template = AsyncMock(side_effect=[[], [found], [], [found]])
+        client_mock.get_link_content = AsyncMock(
+            return_value=[ScLinkContent("idtf_1", 0), ScLinkContent("idtf_3", 0)]
+        )
+        addr_1, addr_2, addr_3 = ScAddr(7011), ScAddr(7012), ScAddr(7013)
+        result = await get_elements_system_identifiers(addr_1, addr_2, addr_3, addr_1)
+        self.assertEqual(result, ["idtf_1", "", "idtf_3", "idtf_1"])
+        # The joint template isn't found, elements are searched separately
+        self.assertEqual(client_mock.search_by_template.await_count, 4)
+        client_mock.get_link_content.assert_awaited_once()
+        self.assertEqual(len(client_mock.get_link_content.call_args.args), 2)
+
     async def test_get_link_content_data(self, client_mock: MagicMock):
         data = "test_content"
         client_mock.get_link_content = AsyncMock(return_value=[ScLinkContent(data, 0)])